@@ -0,0 +1,349 @@
+"""
+Alert engine for the Smart Greenhouse
+Declarative threshold, rate-of-change and rolling z-score rules, evaluated on every sampling
+tick for every zone in one NumPy pass per rule. Rate and z-score rules keep fixed-size ring
+buffers with running statistics, so each sample costs the same however long the window is.
+An alert stays raised (and is not raised again) until its condition has been clear for the
+rule's hold-down time.
+"""
+import logging
+import time
+from abc import ABC, abstractmethod
+from collections import deque
+from datetime import datetime
+
+import numpy as np
+
+from metrics import Counter
+from sim_clock import SYSTEM_CLOCK
+
+logger = logging.getLogger(__name__)
+
+ALERTS_RAISED = Counter("greenhouse_alerts_raised_total", "Alerts raised", ("rule", "severity"))
+
+WARNING = "warning"
+CRITICAL = "critical"
+SEVERITY_ORDER = {CRITICAL: 0, WARNING: 1}
+
+
+class AlertRule(ABC):
+    kind = None
+
+    def __init__(self, name, metric, severity=WARNING, hold_down=300.0):
+        self.name = name
+        self.metric = metric  # Reading key; scalar readings give one site-wide alert, arrays one per zone
+        self.severity = severity
+        self.hold_down = hold_down  # seconds the condition must stay clear before the alert clears
+
+    def to_dict(self):
+        return {"name": self.name, "kind": self.kind, "metric": self.metric, "severity": self.severity,
+                "hold_down": self.hold_down}
+
+    def start(self, width):
+        """Per-rule state for width columns (zones, or 1 for a site-wide reading)"""
+        return None
+
+    @abstractmethod
+    def check(self, state, values):
+        """Update state with one sample per column; returns the columns whose condition holds"""
+
+    @abstractmethod
+    def describe(self, value):
+        """Message for an alert raised at value"""
+
+
+class ThresholdRule(AlertRule):
+    kind = "threshold"
+
+    def __init__(self, name, metric, low=None, high=None, **options):
+        super().__init__(name, metric, **options)
+        self.low = low
+        self.high = high
+
+    def to_dict(self):
+        return dict(super().to_dict(), low=self.low, high=self.high)
+
+    def check(self, state, values):
+        condition = np.zeros(values.shape, dtype=bool)
+        if self.low is not None:
+            condition |= values < self.low
+        if self.high is not None:
+            condition |= values > self.high
+        return condition
+
+    def describe(self, value):
+        if self.low is not None and value < self.low:
+            return f"{self.metric} {value:.2f} below {self.low}"
+        return f"{self.metric} {value:.2f} above {self.high}"
+
+
+class _Ring:
+    """Last window samples per column"""
+    __slots__ = ("samples", "position", "count")
+
+    def __init__(self, window, width):
+        self.samples = np.zeros((window, width))
+        self.position = 0  # Next slot to write, which holds the oldest sample once full
+        self.count = 0
+
+    def push(self, values):
+        """Store values, returning the samples they replace (None while filling)"""
+        window = len(self.samples)
+        evicted = self.samples[self.position].copy() if self.count >= window else None
+        self.samples[self.position] = values
+        self.position = (self.position + 1) % window
+        self.count += 1
+        return evicted
+
+
+class RateRule(AlertRule):
+    """Change over the last window samples (ticks) of at least max_change; direction "rise", "fall" or None"""
+    kind = "rate"
+
+    def __init__(self, name, metric, max_change, window=30, direction=None, **options):
+        super().__init__(name, metric, **options)
+        self.max_change = max_change
+        self.window = window
+        self.direction = direction
+
+    def to_dict(self):
+        return dict(super().to_dict(), max_change=self.max_change, window=self.window, direction=self.direction)
+
+    def start(self, width):
+        return _Ring(self.window, width)
+
+    def check(self, ring, values):
+        oldest = ring.push(values)
+        if oldest is None:
+            return np.zeros(values.shape, dtype=bool)
+        change = values - oldest
+        if self.direction == "rise":
+            return change >= self.max_change
+        if self.direction == "fall":
+            return -change >= self.max_change
+        return np.abs(change) >= self.max_change
+
+    def describe(self, value):
+        return f"{self.metric} changed by {self.max_change} or more within {self.window} samples (now {value:.2f})"
+
+
+class _RollingStats(_Ring):
+    """Ring plus running mean and sum of squared deviations (sliding Welford)"""
+    __slots__ = ("mean", "m2")
+
+    def __init__(self, window, width):
+        super().__init__(window, width)
+        self.mean = np.zeros(width)
+        self.m2 = np.zeros(width)
+
+    def add(self, values):
+        evicted = self.push(values)
+        if evicted is None:
+            delta = values - self.mean
+            self.mean += delta / self.count
+            self.m2 += delta * (values - self.mean)
+        else:
+            window = len(self.samples)
+            delta = values - evicted
+            mean = self.mean + delta / window
+            self.m2 += delta * (values - mean + evicted - self.mean)
+            self.mean = mean
+            if self.count % window == 0:
+                # Recompute from the window now and then so rounding errors cannot accumulate (amortized O(1))
+                self.mean = self.samples.mean(axis=0)
+                self.m2 = ((self.samples - self.mean) ** 2).sum(axis=0)
+
+    def std(self):
+        n = min(self.count, len(self.samples))
+        if n < 2:
+            return np.zeros_like(self.mean)
+        return np.sqrt(np.maximum(self.m2, 0.0) / (n - 1))
+
+
+class ZScoreRule(AlertRule):
+    """A sample at least threshold standard deviations from the mean of the previous window samples"""
+    kind = "zscore"
+
+    def __init__(self, name, metric, window=300, threshold=4.0, min_samples=30, min_std=0.0, **options):
+        super().__init__(name, metric, **options)
+        self.window = window
+        self.threshold = threshold
+        self.min_samples = min_samples
+        self.min_std = min_std  # Floor for the deviation, so a reading that sat still is not an anomaly at once
+
+    def to_dict(self):
+        return dict(super().to_dict(), window=self.window, threshold=self.threshold,
+                    min_samples=self.min_samples, min_std=self.min_std)
+
+    def start(self, width):
+        return _RollingStats(self.window, width)
+
+    def check(self, stats, values):
+        # Scored against the window before the sample joins it, so an outlier cannot mask itself
+        if stats.count >= self.min_samples:
+            score = np.abs(values - stats.mean) / np.maximum(stats.std(), self.min_std or 1e-9)
+            condition = score >= self.threshold
+        else:
+            condition = np.zeros(values.shape, dtype=bool)
+        stats.add(values)
+        return condition
+
+    def describe(self, value):
+        return f"{self.metric} {value:.2f} is {self.threshold} or more standard deviations from its recent mean"
+
+
+# Optimal ranges from SENSOR_ACTUATOR_RELATIONSHIPS.md; extremes the climate loops should never reach are critical
+DEFAULT_RULES = (
+    ThresholdRule("soil_moisture_range", "soil_moisture", low=40, high=60, hold_down=120),
+    ThresholdRule("ph_range", "ph_level", low=6.0, high=6.8),
+    ThresholdRule("nutrients_low", "nutrient_level", low=70),
+    ThresholdRule("temperature_extreme", "temperature", low=10, high=35, severity=CRITICAL),
+    ThresholdRule("co2_extreme", "co2_level", high=1500, severity=CRITICAL),
+    RateRule("temperature_swing", "temperature", max_change=4.0, window=30),
+    RateRule("soil_moisture_drop", "soil_moisture", max_change=10.0, window=30, direction="fall"),
+    ZScoreRule("temperature_anomaly", "temperature", min_std=0.5),
+    ZScoreRule("humidity_anomaly", "humidity", min_std=2.0),
+    ZScoreRule("co2_anomaly", "co2_level", min_std=25.0),
+)
+
+
+class Alert:
+    __slots__ = ("rule", "zone", "value", "message", "raised_at", "last_true")
+
+    def __init__(self, rule, zone, value, raised_at):
+        self.rule = rule
+        self.zone = zone  # None for site-wide readings
+        self.value = value
+        self.message = rule.describe(value)
+        self.raised_at = raised_at  # Unix time
+        self.last_true = raised_at
+
+    def to_dict(self):
+        return {
+            "rule": self.rule.name,
+            "kind": self.rule.kind,
+            "metric": self.rule.metric,
+            "zone": self.zone,
+            "severity": self.rule.severity,
+            "message": self.message,
+            "value": round(self.value, 3),
+            "raised_at": datetime.fromtimestamp(self.raised_at).isoformat(),
+            "last_true": datetime.fromtimestamp(self.last_true).isoformat()
+        }
+
+
+class _RuleState:
+    __slots__ = ("width", "per_zone", "state", "active", "any_active", "clear_since")
+
+    def __init__(self, rule, width, per_zone):
+        self.width = width
+        self.per_zone = per_zone  # One column per zone, or a single site-wide column
+        self.state = rule.start(width)
+        self.active = np.zeros(width, dtype=bool)
+        self.any_active = False
+        # When the condition of an active alert became clear; NaN (no time) while it is not clearing
+        self.clear_since = np.full(width, np.nan)
+
+
+class AlertEngine:
+    def __init__(self, zones, rules=DEFAULT_RULES, clock=SYSTEM_CLOCK, max_events=500):
+        self.zones = list(zones)
+        self.rules = list(rules)
+        self.clock = clock
+        self._states = {}  # rule name -> _RuleState, created on the rule's first sample
+        self._active = {}  # (rule name, column) -> Alert
+        self.events = deque(maxlen=max_events)  # Recent raise/clear events, newest last
+        self.last_latency = 0.0
+
+    def evaluate(self, readings):
+        """Feed one tick of readings ({metric: scalar or per-zone array}); returns the alerts raised"""
+        started = time.perf_counter()
+        now = self.clock.monotonic()
+        timestamp = self.clock.time()
+        raised = []
+        changes = {}  # rule name -> (raised, cleared) counts, for the debug log
+        metric_values = {}  # metric -> (values, per_zone), or None for a sensor not in use
+        for rule in self.rules:
+            if rule.metric not in readings:
+                continue
+            if rule.metric not in metric_values:
+                reading = np.asarray(readings[rule.metric], dtype=float)
+                values = np.atleast_1d(reading)
+                metric_values[rule.metric] = (values, reading.ndim > 0) if np.isfinite(values).any() else None
+            if metric_values[rule.metric] is None:
+                continue  # Sensor not in use
+            values, per_zone = metric_values[rule.metric]
+            rule_state = self._states.get(rule.name)
+            if rule_state is None or rule_state.width != len(values) or rule_state.per_zone != per_zone:
+                rule_state = self._states[rule.name] = _RuleState(rule, len(values), per_zone)
+
+            condition = rule.check(rule_state.state, values)
+            if not rule_state.any_active and not condition.any():
+                continue  # Nothing raised, held or clearing: the common tick
+            new = condition & ~rule_state.active
+            held = rule_state.active & condition
+            clearing = rule_state.active & ~condition
+            # Start the hold-down clock when an active alert's condition first goes clear
+            restarted = clearing & np.isnan(rule_state.clear_since)
+            rule_state.clear_since[restarted] = now
+            rule_state.clear_since[condition] = np.nan
+            cleared = clearing & (now - rule_state.clear_since >= rule.hold_down)
+
+            for column in np.flatnonzero(new).tolist():
+                zone = self.zones[column] if per_zone else None
+                alert = Alert(rule, zone, float(values[column]), timestamp)
+                self._active[(rule.name, column)] = alert
+                raised.append(alert)
+                self.events.append(("raised", alert.to_dict()))
+            if new.any():
+                ALERTS_RAISED.labels(rule.name, rule.severity).inc(int(new.sum()))
+            for column in np.flatnonzero(held).tolist():
+                alert = self._active[(rule.name, column)]
+                alert.value = float(values[column])
+                alert.last_true = timestamp
+            for column in np.flatnonzero(cleared).tolist():
+                alert = self._active.pop((rule.name, column))
+                cleared_at = datetime.fromtimestamp(timestamp).isoformat()
+                self.events.append(("cleared", dict(alert.to_dict(), cleared_at=cleared_at)))
+                rule_state.clear_since[column] = np.nan
+            if new.any() or cleared.any():
+                changes[rule.name] = (int(new.sum()), int(cleared.sum()))
+
+            rule_state.active = (rule_state.active | new) & ~cleared
+            rule_state.any_active = bool(rule_state.active.any())
+        # Raises and clears are kept in events and counted in metrics; the log only gets them at debug level
+        if changes and logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Alerts changed", extra={"raised": {name: counts[0] for name, counts in changes.items()},
+                                                  "cleared": {name: counts[1] for name, counts in changes.items()}})
+        self.last_latency = time.perf_counter() - started
+        return raised
+
+    def active_alerts(self, zone=None, severity=None):
+        """Active alerts, most severe and then oldest first; zone also matches site-wide alerts"""
+        alerts = [
+            alert for alert in list(self._active.values())
+            if (zone is None or alert.zone in (zone, None)) and (severity is None or alert.rule.severity == severity)
+        ]
+        alerts.sort(key=lambda alert: (SEVERITY_ORDER.get(alert.rule.severity, 99), alert.raised_at))
+        return [alert.to_dict() for alert in alerts]
+
+    def recent_events(self, limit=50):
+        """The latest raise/clear events, newest first"""
+        if limit <= 0:
+            return []
+        events = list(self.events)[-limit:]
+        return [dict(event, event=kind) for kind, event in reversed(events)]
+
+    def counts(self):
+        """Active alerts per severity"""
+        counts = {WARNING: 0, CRITICAL: 0}
+        for alert in list(self._active.values()):
+            counts[alert.rule.severity] = counts.get(alert.rule.severity, 0) + 1
+        return counts
+
+    def summary(self):
+        counts = self.counts()
+        return {"active": sum(counts.values()), **counts, "last_latency_ms": round(self.last_latency * 1000, 3)}
+
+    def get_rules(self):
+        return [rule.to_dict() for rule in self.rules]
@@ -1,5 +1,6 @@
-from flask import Flask, render_template, jsonify, request
+from flask import Flask, Response, g, render_template, jsonify, request
 import json
+import logging
 import threading
 import time
 from datetime import datetime
@@ -7,6 +8,16 @@ import os
 
 # Import the greenhouse controller
 from controllers.greenhouse_controller import GreenhouseController
+from metrics import CONTENT_TYPE, REGISTRY, Counter, Histogram
+from sharding import ShardedController, ShardError
+from zone_state import grid_zone_coordinates
+
+logger = logging.getLogger(__name__)
+access_logger = logging.getLogger('greenhouse.access')
+
+REQUEST_DURATION = Histogram('greenhouse_http_request_duration_seconds', 'HTTP request latency', ('route', 'method'))
+REQUESTS = Counter('greenhouse_http_requests_total', 'HTTP requests', ('route', 'method', 'status'))
+STREAMS_REJECTED = Counter('greenhouse_streams_rejected_total', 'Status streams turned away at the stream limit')
 
 # Get the directory of the current file
 basedir = os.path.abspath(os.path.dirname(__file__))
@@ -16,47 +27,158 @@ app = Flask(__name__,
             static_folder=os.path.join(basedir, 'static'),
             static_url_path='/static')
 
-# Initialize the greenhouse controller
-controller = GreenhouseController()
+def create_controller():
+    """Initialize the greenhouse controller from the environment.
+    
+    GREENHOUSE_ROBOTS sets the fleet size, GREENHOUSE_TELEMETRY_DIR enables the persistent
+    telemetry log, GREENHOUSE_DEVICE_CONFIG points at a JSON file that disables or tunes sensors
+    and actuators, GREENHOUSE_ZONES lays out that many zones on a grid and GREENHOUSE_SHARDS > 1
+    splits the zones across that many worker processes. GREENHOUSE_MAX_STREAMS caps the open
+    /api/stream connections (default: GREENHOUSE_THREADS less 16, so requests always have threads).
+    """
+    zone_count = os.environ.get('GREENHOUSE_ZONES')
+    zone_coordinates = grid_zone_coordinates(int(zone_count)) if zone_count else None
+    options = dict(robot_count=int(os.environ.get('GREENHOUSE_ROBOTS', 1)),
+                   telemetry_dir=os.environ.get('GREENHOUSE_TELEMETRY_DIR'),
+                   device_config=os.environ.get('GREENHOUSE_DEVICE_CONFIG'))
+    shard_count = int(os.environ.get('GREENHOUSE_SHARDS', 1))
+    if shard_count > 1:
+        controller = ShardedController(zone_coordinates or grid_zone_coordinates(4), shard_count, **options)
+    else:
+        controller = GreenhouseController(zone_coordinates, **options)
+    default_streams = max(1, int(os.environ.get('GREENHOUSE_THREADS', 64)) - 16)
+    controller.broadcaster.max_clients = int(os.environ.get('GREENHOUSE_MAX_STREAMS', default_streams))
+    return controller
+
+# Shard workers re-import this module as __mp_main__ when it is run directly; they build their own controller
+controller = create_controller() if __name__ != '__mp_main__' else None
+
+@app.before_request
+def start_request_timer():
+    g.request_started = time.perf_counter()
+
+@app.after_request
+def log_request(response):
+    """Add per-request timing to the response and the access log"""
+    duration = time.perf_counter() - g.request_started
+    duration_ms = duration * 1000
+    response.headers['Server-Timing'] = f'app;dur={duration_ms:.2f}'
+    # Label by route pattern, not path, so /api/jobs/<job_id> stays one series
+    route = request.url_rule.rule if request.url_rule is not None else 'unmatched'
+    REQUEST_DURATION.labels(route, request.method).observe(duration)
+    REQUESTS.labels(route, request.method, response.status_code).inc()
+    if access_logger.isEnabledFor(logging.INFO):
+        access_logger.info("request", extra={
+            "method": request.method,
+            "path": request.path,
+            "status": response.status_code,
+            "duration_ms": round(duration_ms, 3),
+            "bytes": response.calculate_content_length()
+        })
+    return response
 
 @app.route('/')
 def index():
     return render_template('index.html')
 
+@app.route('/metrics')
+def metrics():
+    """Prometheus metrics"""
+    return Response(REGISTRY.render(), content_type=CONTENT_TYPE)
+
 @app.route('/api/data')
 def get_data():
     """Get complete greenhouse data"""
     try:
-        # Debugging log
-        print("Fetching robot status...")
-        robot_status = controller.robot.get_status()
-        print("Robot status:", robot_status)
-
-        current_zone = robot_status["current_position"]
-        print("Current zone:", current_zone)
-
-        # Debugging log
-        print("Fetching zone-specific sensor data...")
-        zone_data = controller.get_zone_specific_data(current_zone)
-        print("Zone data:", zone_data)
-
-        # Debugging log
-        print("Fetching complete status...")
-        complete_status = controller.get_complete_status()
-        print("Complete status:", complete_status)
-
-        # Update sensor data with zone-specific values
-        complete_status["sensors"] = zone_data
-        complete_status["zone_sensors"] = {
-            zone: controller.get_zone_specific_data(zone) 
-            for zone in controller.zone_effects.keys()
-        }
-
-        return jsonify(complete_status)
+        # Served from the controller's per-tick snapshot, already encoded; no sensors are read here
+        payload = controller.get_status_payload()
+        
+        gzipped = payload.gzip_body is not None and 'gzip' in request.accept_encodings
+        if payload.is_fresh(request.if_none_match, request.if_modified_since, gzipped):
+            response = Response(status=304)
+        elif gzipped:
+            response = Response(payload.gzip_body, mimetype='application/json')
+            response.headers['Content-Encoding'] = 'gzip'
+        else:
+            response = Response(payload.body, mimetype='application/json')
+        
+        response.set_etag(payload.etag_for(gzipped))
+        response.last_modified = payload.last_modified
+        response.headers['Cache-Control'] = 'no-cache'
+        response.vary.add('Accept-Encoding')
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Serving status", extra={"status_version": payload.version,
+                                                  "status": controller.get_status_snapshot()})
+        return response
     except Exception as e:
-        print("Error in /api/data endpoint:", str(e))
+        logger.exception("Error in /api/data endpoint")
         return jsonify({"error": str(e)}), 500
 
+@app.route('/api/stream')
+def stream_data():
+    """Stream the full status once, then one delta per controller tick (Server-Sent Events)"""
+    client = controller.broadcaster.subscribe()
+    if client is None:
+        # Every stream holds a server thread; past the cap dashboards poll /api/data instead
+        STREAMS_REJECTED.inc()
+        response = jsonify({"success": False, "error": "Too many open streams; poll /api/data instead"})
+        response.headers['Retry-After'] = '60'
+        return response, 503
+    response = Response(controller.broadcaster.stream(client),
+                        mimetype='text/event-stream',
+                        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+    # The generator's own cleanup never runs if the client leaves before the body is started
+    response.call_on_close(lambda: controller.broadcaster.unsubscribe(client))
+    return response
+
+@app.route('/api/history')
+def get_history():
+    """Get recorded readings for one metric and zone (?metric=&zone=&start=&end=&resolution=)"""
+    try:
+        metric = request.args.get('metric')
+        zone = request.args.get('zone')
+        
+        if not metric or not zone:
+            return jsonify({"success": False, "error": "Metric and zone required"}), 400
+        
+        history = controller.get_history(metric, zone,
+                                         start=request.args.get('start', type=float),
+                                         end=request.args.get('end', type=float),
+                                         resolution=request.args.get('resolution'))
+        return jsonify({"success": True, "history": history})
+    except ValueError as e:
+        return jsonify({"success": False, "error": str(e)}), 400
+    except Exception as e:
+        return jsonify({"success": False, "error": str(e)}), 500
+
+@app.route('/api/climate_control', methods=['GET', 'POST'])
+def climate_control():
+    """Get or change automatic climate control ({"enabled": bool, "loops": {name: {"day_band": [low, high], ...}}})"""
+    try:
+        if request.method == 'GET':
+            return jsonify({"success": True, "climate_control": controller.get_climate_control()})
+        
+        data = request.get_json()
+        status = controller.set_climate_control(data.get('enabled'), data.get('loops'))
+        return jsonify({"success": True, "climate_control": status})
+    except (TypeError, ValueError) as e:
+        return jsonify({"success": False, "error": str(e)}), 400
+    except Exception as e:
+        return jsonify({"success": False, "error": str(e)}), 500
+
+@app.route('/api/alerts', methods=['GET'])
+def alerts():
+    """Active alerts (optionally ?zone=...&severity=warning|critical) and recent raise/clear events"""
+    try:
+        success, result = controller.get_alerts(zone=request.args.get('zone'),
+                                                severity=request.args.get('severity'),
+                                                limit=request.args.get('limit', 50, type=int))
+        if not success:
+            return jsonify({"success": False, "error": result}), 400
+        return jsonify({"success": True, "alerts": result})
+    except Exception as e:
+        return jsonify({"success": False, "error": str(e)}), 500
+
 @app.route('/api/toggle_actuator', methods=['POST'])
 def toggle_actuator():
     """Toggle an actuator on/off"""
@@ -81,9 +203,8 @@ def toggle_day_night():
     except Exception as e:
         return jsonify({"success": False, "error": str(e)}), 500
 
-@app.route('/api/move_robot', methods=['POST'])
-def move_robot():
-    """Move robot to a specific zone"""
+def submit_robot_job(operation):
+    """Queue a robot operation for the zone in the request body and answer 202 right away"""
     try:
         data = request.get_json()
         zone = data.get('zone')
@@ -91,55 +212,69 @@ def move_robot():
         if not zone:
             return jsonify({"success": False, "error": "Zone required"}), 400
             
-        success, message = controller.move_robot_to_zone(zone)
-        return jsonify({"success": success, "message": message})
+        job, message = controller.submit_robot_job(operation, zone)
+        if job is None:
+            return jsonify({"success": False, "error": message}), 400
+        return jsonify({"success": True, "message": message, "zone": zone,
+                        "job_id": job.job_id, "status": job.status.value}), 202
     except Exception as e:
         return jsonify({"success": False, "error": str(e)}), 500
 
-@app.route('/api/water_zone', methods=['POST'])
-def water_zone():
-    """Water a specific zone"""
+@app.route('/api/batch_treatments', methods=['POST'])
+def batch_treatments():
+    """Plan a route for a list of {zone, operation} tasks and queue it (or only plan it with dry_run)"""
     try:
         data = request.get_json()
-        zone = data.get('zone')
+        tasks = data.get('tasks')
         
-        if not zone:
-            return jsonify({"success": False, "error": "Zone required"}), 400
-            
-        success, message = controller.water_zone(zone)
-        return jsonify({"success": success, "message": message, "zone": zone})
+        if not tasks:
+            return jsonify({"success": False, "error": "Tasks required"}), 400
+        
+        if data.get('dry_run'):
+            plan = controller.plan_treatments(tasks)
+            return jsonify({"success": True, "plan": plan.to_dict()})
+        
+        job, plan = controller.submit_treatment_plan(tasks)
+        return jsonify({"success": True, "job_id": job.job_id, "status": job.status.value,
+                        "plan": plan.to_dict()}), 202
+    except (KeyError, TypeError, ValueError) as e:
+        return jsonify({"success": False, "error": f"Invalid tasks: {e}"}), 400
     except Exception as e:
         return jsonify({"success": False, "error": str(e)}), 500
 
+@app.route('/api/jobs/<job_id>')
+def get_job(job_id):
+    """Get the status of a queued robot job"""
+    try:
+        job = controller.get_robot_job(job_id)
+    except ShardError as e:
+        return jsonify({"success": False, "error": str(e)}), 503
+    if job is None:
+        return jsonify({"success": False, "error": f"Unknown job: {job_id}"}), 404
+    return jsonify({"success": True, "job": job.to_dict()})
+
+@app.route('/api/move_robot', methods=['POST'])
+def move_robot():
+    """Move robot to a specific zone (queued; returns a job id)"""
+    return submit_robot_job('move')
+
+@app.route('/api/water_zone', methods=['POST'])
+def water_zone():
+    """Water a specific zone (queued; returns a job id)"""
+    return submit_robot_job('water')
+
 @app.route('/api/manure_zone', methods=['POST'])
 def manure_zone():
-    """Apply manure to a specific zone"""
-    try:
-        data = request.get_json()
-        zone = data.get('zone')
-        
-        if not zone:
-            return jsonify({"success": False, "error": "Zone required"}), 400
-            
-        success, message = controller.apply_manure_to_zone(zone)
-        return jsonify({"success": success, "message": message, "zone": zone})
-    except Exception as e:
-        return jsonify({"success": False, "error": str(e)}), 500
+    """Apply manure to a specific zone (queued; returns a job id)"""
+    return submit_robot_job('manure')
 
 @app.route('/api/fertilize_zone', methods=['POST'])
 def fertilize_zone():
-    """Apply fertilizer to a specific zone"""
-    try:
-        data = request.get_json()
-        zone = data.get('zone')
-        
-        if not zone:
-            return jsonify({"success": False, "error": "Zone required"}), 400
-            
-        success, message = controller.apply_fertilizer_to_zone(zone)
-        return jsonify({"success": success, "message": message, "zone": zone})
-    except Exception as e:
-        return jsonify({"success": False, "error": str(e)}), 500
+    """Apply fertilizer to a specific zone (queued; returns a job id)"""
+    return submit_robot_job('fertilizer')
 
 if __name__ == '__main__':
-    app.run(debug=True, host='0.0.0.0', port=5000)
+    # Development server; use wsgi.py with gunicorn in production. FLASK_DEBUG=1 enables the debugger.
+    from logging_setup import configure_logging
+    configure_logging()
+    app.run(debug=os.environ.get('FLASK_DEBUG') == '1', host='0.0.0.0', port=5000, threaded=True)
@@ -0,0 +1,123 @@
+"""
+Concurrency stress test for the Smart Greenhouse
+Hammers the zone state engine and a robot from many threads, checks that no update is
+lost, and reports read throughput while a writer keeps publishing new state
+"""
+import argparse
+import os
+import random
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ros_simulation.rx200_robot import RX200Robot
+from zone_state import EFFECT_TYPES, ZoneStateEngine, grid_zone_coordinates
+
+
+def run_threads(count, target):
+    threads = [threading.Thread(target=target, args=(i,)) for i in range(count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+
+def check_effect_updates(zone_count, thread_count, updates, amount=0.001):
+    """Concurrent applies plus decay sweeps; the final total must equal the sum of all applies"""
+    engine = ZoneStateEngine(grid_zone_coordinates(zone_count))
+    far_future = time.monotonic() + 3600  # Keep every effect in its hold period so decay is a no-op
+    done = threading.Event()
+
+    def decay_loop():
+        while not done.is_set():
+            engine.decay(time.monotonic(), 5)
+
+    def writer(seed):
+        rng = random.Random(seed)
+        for _ in range(updates):
+            engine.apply(rng.choice(engine.zones), rng.choice(EFFECT_TYPES), amount, far_future)
+
+    decay_thread = threading.Thread(target=decay_loop)
+    decay_thread.start()
+    run_threads(thread_count, writer)
+    done.set()
+    decay_thread.join()
+
+    expected = thread_count * updates * amount
+    return expected, float(engine.effects.sum())
+
+
+def check_battery_updates(thread_count, updates, amount=0.001):
+    """Concurrent battery drains; the final level must reflect every drain"""
+    robot = RX200Robot()
+    run_threads(thread_count, lambda i: [robot.drain_battery(amount) for _ in range(updates)])
+    return 100.0 - thread_count * updates * amount, robot.battery_level
+
+
+def read_throughput(zone_count, reader_count, duration):
+    """Reads per second by reader_count threads while one writer keeps applying effects"""
+    engine = ZoneStateEngine(grid_zone_coordinates(zone_count))
+    robot = RX200Robot()
+    done = threading.Event()
+    reads = [0] * reader_count
+
+    def writer():
+        rng = random.Random(0)
+        while not done.is_set():
+            engine.apply(rng.choice(engine.zones), rng.choice(EFFECT_TYPES), 1.0, 0.0)
+            robot.drain_battery(0.0)
+
+    def reader(i):
+        count = 0
+        while not done.is_set():
+            engine.compute_readings(50.0, 50.0, 6.5)
+            robot.get_status()
+            count += 1
+        reads[i] = count
+
+    writer_thread = threading.Thread(target=writer)
+    readers = [threading.Thread(target=reader, args=(i,)) for i in range(reader_count)]
+    writer_thread.start()
+    for thread in readers:
+        thread.start()
+    time.sleep(duration)
+    done.set()
+    for thread in readers + [writer_thread]:
+        thread.join()
+    return sum(reads) / duration
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--zones", type=int, default=1000)
+    parser.add_argument("--threads", type=int, default=16)
+    parser.add_argument("--updates", type=int, default=2000)
+    parser.add_argument("--readers", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--duration", type=float, default=2.0)
+    args = parser.parse_args()
+
+    failed = False
+    expected, actual = check_effect_updates(args.zones, args.threads, args.updates)
+    ok = abs(expected - actual) < 1e-6
+    failed |= not ok
+    print(f"zone effects: expected {expected:.3f}, got {actual:.3f} {'OK' if ok else 'LOST UPDATES'}")
+
+    expected, actual = check_battery_updates(args.threads, args.updates)
+    ok = abs(expected - actual) < 1e-6
+    failed |= not ok
+    print(f"robot battery: expected {expected:.3f}, got {actual:.3f} {'OK' if ok else 'LOST UPDATES'}")
+
+    baseline = None
+    print(f"{'readers':>7} {'reads/s':>10} {'speedup':>8}")
+    for reader_count in args.readers:
+        throughput = read_throughput(args.zones, reader_count, args.duration)
+        baseline = baseline or throughput
+        print(f"{reader_count:>7} {throughput:>10.0f} {throughput / baseline:>7.2f}x")
+
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,52 @@
+"""
+Fleet throughput benchmark for the Smart Greenhouse
+Runs the same batch of watering jobs on fleets of different sizes and reports jobs per second
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ros_simulation.robot_fleet import RobotFleet
+from zone_state import grid_zone_coordinates
+
+
+def run_fleet(robot_count, zones, job_count, seed):
+    """Dispatch job_count watering jobs to a fleet and wait for all of them; returns elapsed seconds"""
+    fleet = RobotFleet(robot_count, zone_coordinates=zones)
+    rng = random.Random(seed)
+    zone_names = list(zones)
+
+    start = time.perf_counter()
+    jobs = [
+        fleet.submit("water", zone, lambda robot, zone=zone: (robot.water_zone(zone), ""))[0]
+        for zone in (rng.choice(zone_names) for _ in range(job_count))
+    ]
+    while not all(job.is_finished() for job in jobs):
+        time.sleep(0.01)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--robots", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--zones", type=int, default=16)
+    parser.add_argument("--jobs", type=int, default=32)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    zones = grid_zone_coordinates(args.zones)
+    baseline = None
+    print(f"{'robots':>6} {'seconds':>8} {'jobs/s':>8} {'speedup':>8}")
+    for robot_count in args.robots:
+        elapsed = run_fleet(robot_count, zones, args.jobs, args.seed)
+        throughput = args.jobs / elapsed
+        baseline = baseline or throughput
+        print(f"{robot_count:>6} {elapsed:>8.2f} {throughput:>8.2f} {throughput / baseline:>7.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""
+Memory footprint benchmark for the Smart Greenhouse
+Builds a controller with many zones and runs sampling ticks, reporting the Python memory
+allocated during a tick (peak and retained), how long a tick takes, the process's resident
+memory and the bytes held by the history rings. The rings grow as rows arrive (raw samples
+fill in an hour, hourly roll-ups in 30 days), so resident memory after a few ticks leaves
+most of them out; their size when full is reported from the allocation, and --fill-raw
+ticks until the raw ring is full before resident memory is measured. Run it before and
+after a change to compare.
+"""
+import argparse
+import gc
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from greenhouse_controller import GreenhouseController
+from zone_state import grid_zone_coordinates
+
+
+def resident_mib():
+    """Current resident set size, from /proc where available"""
+    try:
+        with open("/proc/self/statm") as statm:
+            return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2 ** 20
+    except OSError:
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def tick(controller):
+    """One sampling tick plus encoding its status, as served to pollers"""
+    controller._sample_tick()
+    controller.get_status_payload()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--zones", type=int, default=10000)
+    parser.add_argument("--ticks", type=int, default=20)
+    parser.add_argument("--robots", type=int, default=4)
+    parser.add_argument("--fill-raw", action="store_true",
+                        help="Tick until the raw history ring is full before measuring resident memory")
+    args = parser.parse_args()
+
+    controller = GreenhouseController(zone_coordinates=grid_zone_coordinates(args.zones),
+                                      robot_count=args.robots, start_threads=False)
+    controller.lazy_snapshots = False  # Build and encode the status on every tick
+    raw = controller.history.tiers["raw"]
+    for _ in range(raw.capacity if args.fill_raw else 3):
+        tick(controller)
+    gc.collect()
+    rss = resident_mib()
+
+    started = time.perf_counter()
+    for _ in range(args.ticks):
+        tick(controller)
+    tick_ms = (time.perf_counter() - started) / args.ticks * 1000
+
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    tracemalloc.reset_peak()
+    tick(controller)
+    after, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    print(f"zones:              {args.zones}")
+    print(f"tick:               {tick_ms:.1f} ms")
+    print(f"tick peak alloc:    {(peak - before) / 2 ** 10:.0f} KiB")
+    print(f"tick retained:      {(after - before) / 2 ** 10:.0f} KiB")
+    print(f"resident memory:    {rss:.1f} MiB (raw history ring {raw.size}/{raw.capacity} rows)")
+    print(f"history allocated:  {controller.history.nbytes() / 2 ** 20:.1f} MiB")
+    print(f"history when full:  {controller.history.nbytes(full=True) / 2 ** 20:.1f} MiB")
+
+
+if __name__ == "__main__":
+    main()
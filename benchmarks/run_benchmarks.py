@@ -0,0 +1,208 @@
+"""
+Benchmark suite for the Smart Greenhouse
+Measures the sampling tick, the controller hot paths and the /api/data endpoint (through
+the Flask test client) at several zone counts and numbers of concurrent pollers, reporting
+p50/p99 latency and requests per second. Each zone count gets one controller on virtual time,
+which the app serves in place of the controller it built on import (that one is left idle
+apart from its 4-zone tick every 2 s). Readers are measured while a background thread keeps
+running the real sampling ticks, so every tick reads the sensors that are due and publishes a
+new snapshot. Results are saved as JSON; pass --baseline to compare with an earlier run.
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import threading
+import time
+from datetime import datetime
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import app as greenhouse_app
+from simulation import GreenhouseSimulation
+from zone_state import grid_zone_coordinates
+
+# Targets that advance the simulation themselves: one poller, and no background ticks
+TICK_TARGETS = ("sample_tick",)
+
+
+def make_targets(sim):
+    """Benchmarked operations; each factory returns a per-poller callable doing one request"""
+    controller = sim.controller
+    zones = controller.zone_state.zones
+
+    def sample_tick():
+        # Everything due in one sampling interval: sensor reads, history, climate, alerts, snapshot
+        return lambda: sim.run(controller.sampling_interval)
+
+    def zone_data():
+        rng = random.Random(0)
+        return lambda: controller.get_zone_specific_data(rng.choice(zones))
+
+    def api_data():
+        # Polls like app.js: gzip, revalidating with the last ETag, so unchanged snapshots answer 304
+        client = greenhouse_app.app.test_client()
+        etag = [None]
+
+        def request():
+            headers = {'Accept-Encoding': 'gzip'}
+            if etag[0]:
+                headers['If-None-Match'] = etag[0]
+            response = client.get('/api/data', headers=headers)
+            if response.status_code not in (200, 304):
+                raise RuntimeError(f"HTTP {response.status_code}")
+            etag[0] = response.headers.get('ETag')
+        return request
+
+    return {
+        "sample_tick": sample_tick,
+        "get_all_sensor_data": lambda: controller.get_all_sensor_data,
+        "get_zone_specific_data": zone_data,
+        "get_complete_status": lambda: controller.get_complete_status,
+        "api_data": api_data,
+    }
+
+
+def tick_in_background(sim, interval, stop):
+    """Run one sampling interval of the simulation every interval wall seconds until stop is set"""
+    while not stop.wait(interval):
+        sim.run(sim.controller.sampling_interval)
+
+
+def run_case(make_request, pollers, duration, sim=None, tick_interval=None):
+    """Run pollers threads back-to-back for duration seconds; returns latency and throughput stats.
+
+    With sim, a background thread keeps ticking it every tick_interval wall seconds meanwhile.
+    """
+    latencies = [[] for _ in range(pollers)]
+    errors = [0] * pollers
+    start_barrier = threading.Barrier(pollers + 1)
+    deadline = [None]
+    stop = threading.Event()
+    ticker = None
+    if sim is not None:
+        ticker = threading.Thread(target=tick_in_background, args=(sim, tick_interval, stop), daemon=True)
+
+    def poller(i):
+        request = make_request()
+        timings = latencies[i]
+        start_barrier.wait()
+        while time.perf_counter() < deadline[0]:
+            started = time.perf_counter()
+            try:
+                request()
+            except Exception:
+                errors[i] += 1
+            timings.append(time.perf_counter() - started)
+
+    threads = [threading.Thread(target=poller, args=(i,)) for i in range(pollers)]
+    for thread in threads:
+        thread.start()
+    deadline[0] = time.perf_counter() + duration
+    started = time.perf_counter()
+    if ticker is not None:
+        ticker.start()
+    start_barrier.wait()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+    stop.set()
+    if ticker is not None:
+        ticker.join()
+
+    samples = np.concatenate([np.array(timings) for timings in latencies]) * 1000
+    return {
+        "requests": int(len(samples)),
+        "errors": sum(errors),
+        "p50_ms": round(float(np.percentile(samples, 50)), 4) if len(samples) else None,
+        "p99_ms": round(float(np.percentile(samples, 99)), 4) if len(samples) else None,
+        "mean_ms": round(float(samples.mean()), 4) if len(samples) else None,
+        "requests_per_second": round(len(samples) / elapsed, 1),
+    }
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__)), check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results, baseline_path):
+    """Print p50 and throughput changes against a previous results file"""
+    with open(baseline_path) as baseline_file:
+        baseline = {
+            (row["target"], row["zones"], row["pollers"]): row
+            for row in json.load(baseline_file)["results"]
+        }
+    print(f"\nvs {baseline_path}")
+    print(f"{'target':<24} {'zones':>5} {'pollers':>7} {'p50':>8} {'req/s':>8}")
+    for row in results:
+        old = baseline.get((row["target"], row["zones"], row["pollers"]))
+        if old is None or not old["p50_ms"] or not old["requests_per_second"]:
+            continue
+        print(f"{row['target']:<24} {row['zones']:>5} {row['pollers']:>7} "
+              f"{row['p50_ms'] / old['p50_ms'] - 1:>+7.0%} "
+              f"{row['requests_per_second'] / old['requests_per_second'] - 1:>+7.0%}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--zones", type=int, nargs="+", default=[4, 100, 1000])
+    parser.add_argument("--pollers", type=int, nargs="+", default=[1, 10, 100])
+    parser.add_argument("--targets", nargs="+", default=None, help="Subset of targets to run (default: all)")
+    parser.add_argument("--duration", type=float, default=2.0, help="Seconds per case")
+    parser.add_argument("--tick-interval", type=float, default=0.1,
+                        help="Wall seconds between background sampling ticks while readers are measured")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--output", default=None, help="Results file (default: benchmarks/results/<commit>.json)")
+    parser.add_argument("--baseline", default=None, help="Earlier results file to compare against")
+    args = parser.parse_args()
+
+    commit = git_commit()
+    results = []
+    print(f"{'target':<24} {'zones':>5} {'pollers':>7} {'p50 ms':>9} {'p99 ms':>9} {'req/s':>9} {'errors':>6}")
+    for zone_count in args.zones:
+        sim = GreenhouseSimulation(seed=args.seed, zone_coordinates=grid_zone_coordinates(zone_count))
+        # Publish a snapshot on every tick, as the threaded controller does, rather than on first read
+        sim.controller.lazy_snapshots = False
+        greenhouse_app.controller = sim.controller
+        targets = make_targets(sim)
+        for name in args.targets or targets:
+            ticking = name not in TICK_TARGETS
+            for pollers in args.pollers if ticking else [1]:
+                row = dict(target=name, zones=zone_count, pollers=pollers,
+                           **run_case(targets[name], pollers, args.duration, sim if ticking else None,
+                                      args.tick_interval))
+                results.append(row)
+                print(f"{name:<24} {zone_count:>5} {pollers:>7} {row['p50_ms']:>9.3f} {row['p99_ms']:>9.3f} "
+                      f"{row['requests_per_second']:>9.0f} {row['errors']:>6}")
+
+    output = args.output or os.path.join(os.path.dirname(os.path.abspath(__file__)), "results",
+                                         f"{commit or 'local'}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w") as output_file:
+        json.dump({
+            "commit": commit,
+            "created_at": datetime.now().isoformat(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "duration": args.duration,
+            "seed": args.seed,
+            "results": results,
+        }, output_file, indent=2)
+    print(f"\nSaved {output}")
+
+    if args.baseline:
+        compare(results, args.baseline)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,40 @@
+"""
+Shard scaling benchmark for the Smart Greenhouse
+Runs sampling ticks back to back on every shard at once and reports the aggregate
+zone-ticks per second for each shard count. On a machine with enough cores the rate
+grows with the shard count, since each shard ticks in its own process.
+"""
+import argparse
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sharding import ShardedController
+from zone_state import grid_zone_coordinates
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--zones", type=int, default=4000)
+    parser.add_argument("--shards", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--ticks", type=int, default=50, help="Ticks per shard per measurement")
+    args = parser.parse_args()
+
+    zones = grid_zone_coordinates(args.zones)
+    print(f"{os.cpu_count()} CPUs, {args.zones} zones")
+    print(f"{'shards':>6} {'zone-ticks/s':>13} {'speedup':>8}")
+    baseline = None
+    for shard_count in args.shards:
+        controller = ShardedController(zones, shard_count)
+        try:
+            controller.measure_tick_rate(1)  # Warm-up
+            rate = controller.measure_tick_rate(args.ticks)
+        finally:
+            controller.close()
+        baseline = baseline or rate
+        print(f"{shard_count:>6} {rate:>13.0f} {rate / baseline:>7.2f}x")
+
+
+if __name__ == "__main__":
+    main()
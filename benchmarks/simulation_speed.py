@@ -0,0 +1,57 @@
+"""
+Simulation speed benchmark for the Smart Greenhouse
+Runs the headless virtual-time simulation for a number of simulated days at several zone
+counts, with a watering job per zone every few hours, and reports how many times faster
+than real time it runs. --min-speedup makes it exit with status 1 below that factor.
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from simulation import GreenhouseSimulation
+from zone_state import grid_zone_coordinates
+
+
+def run_simulation(zone_count, days, robots, seed, treatment_interval):
+    """Run days of virtual time; returns (wall seconds, sampling ticks run)"""
+    sim = GreenhouseSimulation(seed=seed, zone_coordinates=grid_zone_coordinates(zone_count), robot_count=robots)
+    zones = sim.controller.zone_state.zones
+    for i, zone in enumerate(zones):
+        sim.every(treatment_interval, lambda controller, zone=zone: controller.submit_robot_job("water", zone),
+                  delay=treatment_interval * (i + 1) / len(zones))
+    started = time.perf_counter()
+    sim.run(days * 86400)
+    elapsed = time.perf_counter() - started
+    return elapsed, int(days * 86400 / sim.controller.sampling_interval)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--zones", type=int, nargs="+", default=[4, 100])
+    parser.add_argument("--days", type=float, default=1.0, help="Simulated days per run")
+    parser.add_argument("--robots", type=int, default=1)
+    parser.add_argument("--treatment-interval", type=float, default=6 * 3600,
+                        help="Virtual seconds between waterings of each zone")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--min-speedup", type=float, default=None,
+                        help="Exit with status 1 if any run is slower than this many times real time")
+    args = parser.parse_args()
+
+    slowest = None
+    print(f"{'zones':>5} {'sim days':>8} {'wall s':>8} {'ticks/s':>9} {'x real time':>12}")
+    for zone_count in args.zones:
+        elapsed, ticks = run_simulation(zone_count, args.days, args.robots, args.seed, args.treatment_interval)
+        speedup = args.days * 86400 / elapsed
+        slowest = speedup if slowest is None else min(slowest, speedup)
+        print(f"{zone_count:>5} {args.days:>8g} {elapsed:>8.2f} {ticks / elapsed:>9.0f} {speedup:>12.0f}")
+
+    if args.min_speedup is not None and slowest < args.min_speedup:
+        print(f"\nSlowest run is {slowest:.0f}x real time, below --min-speedup {args.min_speedup:g}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,505 @@
+"""
+Soak test and load generator for the Smart Greenhouse
+Starts the app locally (or targets --url) and drives it with virtual dashboards that behave
+like static/js/app.js: an /api/stream connection that reconnects after drops, or (--poll-fraction)
+/api/data polled every 2 s with conditional requests. Robot commands go to /api/water_zone and
+/api/move_robot at a fixed rate. The dashboard count steps through --dashboards, one stage
+each. Every sample interval the latency percentiles, error rate, throughput, the server's
+threads (by name) and resident memory are recorded. The report flags thread and memory
+growth and the first stage that broke the latency or error limits.
+
+    python benchmarks/soak_test.py --dashboards 10 50 100 200 --stage-duration 2m
+    python benchmarks/soak_test.py --dashboards 50 --stage-duration 4h --sample-interval 5m
+"""
+import argparse
+import http.client
+import json
+import os
+import platform
+import random
+import re
+import socket
+import subprocess
+import sys
+import threading
+import time
+from collections import deque
+from datetime import datetime
+from urllib.parse import urlsplit
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+POLL_INTERVAL = 2.0  # seconds, as app.js without Server-Sent Events
+STREAM_RETRY = 3.0  # seconds before a dropped stream reconnects, EventSource's usual default
+STREAM_STALL = 10.0  # seconds without a stream event that count as a stall (ticks are 2 s)
+
+
+def parse_duration(text):
+    """Seconds from 90, 90s, 15m or 4h"""
+    match = re.fullmatch(r"(\d+(?:\.\d+)?)([smh]?)", text.strip())
+    if match is None:
+        raise argparse.ArgumentTypeError(f"Invalid duration: {text}")
+    return float(match.group(1)) * {"": 1, "s": 1, "m": 60, "h": 3600}[match.group(2)]
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              cwd=ROOT, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+class Recorder:
+    """Request outcomes from every load thread, drained once per sample interval"""
+
+    def __init__(self):
+        self._samples = deque()
+
+    def record(self, endpoint, latency, outcome):
+        """outcome: ok, rejected (a 400 or 503 the app returns on purpose) or error"""
+        self._samples.append((endpoint, latency, outcome))
+
+    def drain(self):
+        samples = []
+        while self._samples:
+            samples.append(self._samples.popleft())
+        return samples
+
+
+class Dashboard(threading.Thread):
+    """One browser tab running app.js"""
+
+    def __init__(self, host, port, poll, recorder, stop, seed):
+        super().__init__(name="dashboard", daemon=True)
+        self.host = host
+        self.port = port
+        self.poll = poll
+        self.recorder = recorder
+        self.stop = stop
+        self.rng = random.Random(seed)
+
+    def run(self):
+        # Tabs are not opened in lockstep
+        self.stop.wait(self.rng.uniform(0, POLL_INTERVAL))
+        if self.poll:
+            self._poll()
+        else:
+            while not self.stop.is_set():
+                if not self._stream():
+                    # Turned away at the stream limit: app.js polls from then on
+                    self._poll()
+                    return
+                self.stop.wait(STREAM_RETRY)
+
+    def _poll(self):
+        """GET /api/data every 2 s, revalidating with the last ETag like the browser cache does"""
+        connection = http.client.HTTPConnection(self.host, self.port, timeout=30)
+        etag = None
+        next_poll = time.monotonic()
+        while not self.stop.is_set():
+            headers = {"Accept-Encoding": "gzip"}
+            if etag:
+                headers["If-None-Match"] = etag
+            started = time.perf_counter()
+            try:
+                connection.request("GET", "/api/data", headers=headers)
+                response = connection.getresponse()
+                response.read()
+                if response.status in (200, 304):
+                    etag = response.getheader("ETag") or etag
+                    outcome = "ok"
+                else:
+                    outcome = "error"
+            except (OSError, http.client.HTTPException):
+                connection.close()
+                outcome = "error"
+            self.recorder.record("GET /api/data", time.perf_counter() - started, outcome)
+            # Fixed schedule, as setInterval: a slow response does not push the next poll back
+            next_poll += POLL_INTERVAL
+            self.stop.wait(max(next_poll - time.monotonic(), 0.0))
+
+    def _stream(self):
+        """Hold an /api/stream connection; connect latency is the time to the first snapshot.
+
+        Returns False if the server refused the stream (503 at its stream limit).
+        """
+        started = time.perf_counter()
+        connection = http.client.HTTPConnection(self.host, self.port, timeout=STREAM_STALL)
+        try:
+            connection.request("GET", "/api/stream", headers={"Accept": "text/event-stream"})
+            response = connection.getresponse()
+            if response.status == 503:
+                response.read()
+                self.recorder.record("GET /api/stream", time.perf_counter() - started, "rejected")
+                return False
+            if response.status != 200:
+                self.recorder.record("GET /api/stream", time.perf_counter() - started, "error")
+                return True
+            connected = False
+            while not self.stop.is_set():
+                line = response.readline()  # Times out after STREAM_STALL without data
+                if not line:
+                    raise ConnectionError("Stream closed")
+                if line.startswith(b"event: ") and not connected:
+                    connected = True
+                    self.recorder.record("GET /api/stream", time.perf_counter() - started, "ok")
+        except (OSError, http.client.HTTPException):
+            if not self.stop.is_set():
+                self.recorder.record("GET /api/stream", time.perf_counter() - started, "error")
+        finally:
+            connection.close()
+        return True
+
+
+class CommandSender(threading.Thread):
+    """Robot commands at a fixed rate (open loop: a slow server does not slow the sender down)"""
+
+    def __init__(self, host, port, zones, rate, water_fraction, recorder, stop, seed):
+        super().__init__(name="robot-commands", daemon=True)
+        self.host = host
+        self.port = port
+        self.zones = zones
+        self.rate = rate
+        self.water_fraction = water_fraction
+        self.recorder = recorder
+        self.stop = stop
+        self.rng = random.Random(seed)
+
+    def run(self):
+        connection = http.client.HTTPConnection(self.host, self.port, timeout=30)
+        next_send = time.monotonic()
+        while not self.stop.is_set():
+            path = "/api/water_zone" if self.rng.random() < self.water_fraction else "/api/move_robot"
+            body = json.dumps({"zone": self.rng.choice(self.zones)})
+            started = time.perf_counter()
+            try:
+                connection.request("POST", path, body=body, headers={"Content-Type": "application/json"})
+                response = connection.getresponse()
+                response.read()
+                # 400 is the fleet turning a job down (e.g. not enough battery), not a failure
+                outcome = "ok" if response.status < 300 else "rejected" if response.status == 400 else "error"
+            except (OSError, http.client.HTTPException):
+                connection.close()
+                outcome = "error"
+            self.recorder.record(f"POST {path}", time.perf_counter() - started, outcome)
+            next_send += 1.0 / self.rate
+            self.stop.wait(max(next_send - time.monotonic(), 0.0))
+
+
+class ServerProbe:
+    """Server-side gauges: threads from /metrics, resident memory from /proc when the pid is known"""
+
+    def __init__(self, host, port, pid=None):
+        self.host = host
+        self.port = port
+        self.pid = pid
+
+    def sample(self):
+        sample = {"threads": None, "threads_by_name": {}, "robot_queue_depth": None, "rss_mib": self._rss_mib()}
+        connection = http.client.HTTPConnection(self.host, self.port, timeout=30)
+        try:
+            connection.request("GET", "/metrics")
+            text = connection.getresponse().read().decode("utf-8")
+        except (OSError, http.client.HTTPException):
+            return sample
+        finally:
+            connection.close()
+        queue_depth = 0.0
+        for line in text.splitlines():
+            if line.startswith("greenhouse_threads "):
+                sample["threads"] = int(float(line.split()[1]))
+            elif line.startswith("greenhouse_threads_by_name{"):
+                name = re.search(r'name="((?:[^"\\]|\\.)*)"', line).group(1)
+                sample["threads_by_name"][name] = int(float(line.rsplit(" ", 1)[1]))
+            elif line.startswith("greenhouse_robot_queue_depth"):
+                queue_depth += float(line.rsplit(" ", 1)[1])
+                sample["robot_queue_depth"] = int(queue_depth)
+        return sample
+
+    def _rss_mib(self):
+        if self.pid is None:
+            return None
+        try:
+            with open(f"/proc/{self.pid}/status") as status:
+                for line in status:
+                    if line.startswith("VmRSS:"):
+                        return int(line.split()[1]) / 1024
+        except OSError:
+            return None
+        return None
+
+
+def free_port():
+    with socket.socket() as probe:
+        probe.bind(("127.0.0.1", 0))
+        return probe.getsockname()[1]
+
+
+def start_server(server, port, zones, robots, log_path):
+    """Run the app in a child process; returns the process once it answers /api/data"""
+    env = dict(os.environ, GREENHOUSE_ZONES=str(zones), GREENHOUSE_ROBOTS=str(robots),
+               GREENHOUSE_LOG_LEVEL=os.environ.get("GREENHOUSE_LOG_LEVEL", "WARNING"))
+    if server == "gunicorn":
+        env["GREENHOUSE_BIND"] = f"127.0.0.1:{port}"
+        command = [sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py", "wsgi:app"]
+    else:
+        command = [sys.executable, "-c",
+                   "from logging_setup import configure_logging; configure_logging(); import app; "
+                   f"app.app.run(host='127.0.0.1', port={port}, threaded=True)"]
+    with open(log_path, "ab") as log:
+        process = subprocess.Popen(command, cwd=ROOT, env=env, stdout=log, stderr=subprocess.STDOUT)
+    deadline = time.monotonic() + 120
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"Server exited with status {process.returncode}")
+        try:
+            connection = http.client.HTTPConnection("127.0.0.1", port, timeout=5)
+            connection.request("GET", "/api/data")
+            if connection.getresponse().status == 200:
+                return process
+        except OSError:
+            pass
+        time.sleep(0.5)
+    process.terminate()
+    raise RuntimeError("Server did not start within 120 s")
+
+
+def fetch_zones(host, port):
+    connection = http.client.HTTPConnection(host, port, timeout=30)
+    connection.request("GET", "/api/data")
+    return list(json.loads(connection.getresponse().read())["zone_sensors"])
+
+
+def summarize(samples, elapsed):
+    """Latency percentiles and outcome counts over one window, overall and per endpoint"""
+    def stats(rows):
+        latencies = np.array([latency for _, latency, _ in rows]) * 1000
+        errors = sum(1 for _, _, outcome in rows if outcome == "error")
+        return {
+            "requests": len(rows),
+            "requests_per_second": round(len(rows) / elapsed, 2) if elapsed > 0 else None,
+            "errors": errors,
+            "rejected": sum(1 for _, _, outcome in rows if outcome == "rejected"),
+            "error_rate": round(errors / len(rows), 4) if rows else 0.0,
+            "p50_ms": round(float(np.percentile(latencies, 50)), 2) if len(rows) else None,
+            "p95_ms": round(float(np.percentile(latencies, 95)), 2) if len(rows) else None,
+            "p99_ms": round(float(np.percentile(latencies, 99)), 2) if len(rows) else None,
+            "max_ms": round(float(latencies.max()), 2) if len(rows) else None
+        }
+
+    by_endpoint = {}
+    for row in samples:
+        by_endpoint.setdefault(row[0], []).append(row)
+    return dict(stats(samples), endpoints={endpoint: stats(rows) for endpoint, rows in sorted(by_endpoint.items())})
+
+
+def slope_per_hour(points):
+    """Least-squares growth per hour of [(elapsed seconds, value)], or None with too few points"""
+    points = [(t, value) for t, value in points if value is not None]
+    if len(points) < 3 or points[-1][0] - points[0][0] <= 0:
+        return None
+    times, values = np.array(points, dtype=float).T
+    return float(np.polyfit(times / 3600, values, 1)[0])
+
+
+def analyze(windows, stages, args):
+    """Leaks (threads and memory that keep growing) and the first stage past the limits"""
+    # Growth is measured over the final stage only, since every dashboard holds server resources
+    # of its own; its first window is skipped while dashboards connect and the server warms up
+    final = [window for window in windows if window["dashboards"] == windows[-1]["dashboards"]][1:] if windows else []
+    span = final[-1]["elapsed"] - final[0]["elapsed"] if len(final) > 1 else 0.0
+    judged = span >= args.min_leak_span
+
+    thread_growth = {}
+    names = set().union(*(window["server"]["threads_by_name"] for window in windows))
+    for name in sorted(names):
+        counts = [window["server"]["threads_by_name"].get(name, 0) for window in windows]
+        growth = slope_per_hour([(window["elapsed"], window["server"]["threads_by_name"].get(name, 0))
+                                 for window in final])
+        thread_growth[name] = {"first": counts[0], "last": counts[-1], "peak": max(counts),
+                               "per_hour": round(growth, 2) if growth is not None else None}
+    rss_growth = slope_per_hour([(window["elapsed"], window["server"]["rss_mib"]) for window in final])
+
+    leaks = []
+    if judged:
+        leaks = [
+            f"threads {name!r}: {growth['first']} -> {growth['last']} ({growth['per_hour']:+.1f}/h)"
+            for name, growth in thread_growth.items()
+            if growth["per_hour"] is not None and growth["per_hour"] > args.thread_growth_limit
+        ]
+        if rss_growth is not None and rss_growth > args.rss_growth_limit:
+            leaks.append(f"resident memory {rss_growth:+.1f} MiB/h")
+
+    saturation = None
+    for stage in stages:
+        summary = stage["summary"]
+        reasons = []
+        if summary["p99_ms"] is not None and summary["p99_ms"] > args.slo_ms:
+            reasons.append(f"p99 {summary['p99_ms']:.0f} ms > {args.slo_ms:.0f} ms")
+        if summary["error_rate"] > args.max_error_rate:
+            reasons.append(f"error rate {summary['error_rate']:.1%} > {args.max_error_rate:.1%}")
+        if reasons:
+            saturation = {"dashboards": stage["dashboards"], "reasons": reasons}
+            break
+    return {
+        "thread_growth": thread_growth,
+        "rss_growth_mib_per_hour": round(rss_growth, 2) if rss_growth is not None else None,
+        "leak_span_seconds": round(span, 1),
+        "leaks": leaks if judged else None,
+        "saturation": saturation
+    }
+
+
+def show(value, width, precision=None):
+    """Right-aligned column; "-" for values that were not measured"""
+    if value is None:
+        return "-".rjust(width)
+    return f"{value:>{width}.{precision}f}" if precision is not None else f"{value:>{width}}"
+
+
+def print_window(window):
+    summary = window["summary"]
+    server = window["server"]
+    print(f"{window['elapsed']:>8.0f} {window['dashboards']:>6} {summary['requests_per_second']:>8.1f} "
+          f"{show(summary['p50_ms'], 8, 1)} {show(summary['p95_ms'], 8, 1)} {show(summary['p99_ms'], 8, 1)} "
+          f"{summary['error_rate']:>7.2%} {show(server['threads'], 7)} {show(server['rss_mib'], 8, 1)} "
+          f"{show(server['robot_queue_depth'], 6)}", flush=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default=None, help="Target a running instance instead of starting one")
+    parser.add_argument("--pid", type=int, default=None, help="Server pid for resident memory (with --url)")
+    parser.add_argument("--server", choices=("flask", "gunicorn"), default="flask")
+    parser.add_argument("--server-log", default=os.devnull, help="File for the started server's output")
+    parser.add_argument("--zones", type=int, default=100)
+    parser.add_argument("--robots", type=int, default=2)
+    parser.add_argument("--dashboards", type=int, nargs="+", default=[10, 50, 100],
+                        help="Dashboard count per stage; dashboards are added between stages")
+    parser.add_argument("--poll-fraction", type=float, default=0.0,
+                        help="Share of dashboards polling /api/data instead of holding /api/stream")
+    parser.add_argument("--commands-per-second", type=float, default=1.0)
+    parser.add_argument("--water-fraction", type=float, default=0.5, help="Share of commands that water")
+    parser.add_argument("--stage-duration", type=parse_duration, default=60.0, help="e.g. 90, 15m, 4h")
+    parser.add_argument("--sample-interval", type=parse_duration, default=10.0)
+    parser.add_argument("--slo-ms", type=float, default=500.0, help="p99 latency limit for saturation")
+    parser.add_argument("--max-error-rate", type=float, default=0.01)
+    parser.add_argument("--thread-growth-limit", type=float, default=1.0, help="Threads per hour flagged as a leak")
+    parser.add_argument("--rss-growth-limit", type=float, default=5.0, help="MiB per hour flagged as a leak")
+    parser.add_argument("--min-leak-span", type=parse_duration, default=600.0,
+                        help="Final-stage time needed before growth is called a leak")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--output", default=None,
+                        help="Report file (default: benchmarks/results/soak-<commit>-<time>.json)")
+    args = parser.parse_args()
+
+    process = None
+    if args.url:
+        target = urlsplit(args.url)
+        host, port, pid = target.hostname, target.port or 80, args.pid
+    else:
+        host, port = "127.0.0.1", free_port()
+        process = start_server(args.server, port, args.zones, args.robots, args.server_log)
+        pid = process.pid
+
+    recorder = Recorder()
+    probe = ServerProbe(host, port, pid)
+    stop = threading.Event()
+    rng = random.Random(args.seed)
+    dashboards = []
+    windows = []
+    stages = []
+    try:
+        zones = fetch_zones(host, port)
+        if args.commands_per_second > 0:
+            CommandSender(host, port, zones, args.commands_per_second, args.water_fraction, recorder, stop,
+                          args.seed).start()
+
+        print(f"{'time s':>8} {'dash':>6} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} "
+              f"{'errors':>7} {'threads':>7} {'RSS MiB':>8} {'queue':>6}")
+        started = time.monotonic()
+        for stage_dashboards in args.dashboards:
+            while len(dashboards) < stage_dashboards:
+                dashboard = Dashboard(host, port, rng.random() < args.poll_fraction, recorder, stop, rng.random())
+                dashboard.start()
+                dashboards.append(dashboard)
+
+            stage_started = window_started = time.monotonic()
+            stage_samples = []
+            while time.monotonic() - stage_started < args.stage_duration:
+                time.sleep(min(args.sample_interval, args.stage_duration - (time.monotonic() - stage_started)))
+                now = time.monotonic()
+                samples = recorder.drain()
+                stage_samples.extend(samples)
+                window = {
+                    "elapsed": round(now - started, 1),
+                    "dashboards": stage_dashboards,
+                    "summary": summarize(samples, now - window_started),
+                    "server": probe.sample()
+                }
+                windows.append(window)
+                print_window(window)
+                window_started = now
+            stages.append({
+                "dashboards": stage_dashboards,
+                "summary": summarize(stage_samples, time.monotonic() - stage_started)
+            })
+    except KeyboardInterrupt:
+        print("Interrupted; reporting what was recorded")
+    finally:
+        stop.set()
+        if process is not None:
+            process.terminate()
+            try:
+                process.wait(timeout=15)
+            except subprocess.TimeoutExpired:
+                process.kill()
+
+    analysis = analyze(windows, stages, args)
+    print(f"\n{'dash':>6} {'req/s':>8} {'p50 ms':>8} {'p99 ms':>8} {'errors':>7} {'rejected':>8}")
+    for stage in stages:
+        summary = stage["summary"]
+        print(f"{stage['dashboards']:>6} {summary['requests_per_second'] or 0:>8.1f} {summary['p50_ms'] or 0:>8.1f} "
+              f"{summary['p99_ms'] or 0:>8.1f} {summary['error_rate']:>7.2%} {summary['rejected']:>8}")
+    if analysis["saturation"]:
+        print(f"Saturated at {analysis['saturation']['dashboards']} dashboards: "
+              f"{', '.join(analysis['saturation']['reasons'])}")
+    else:
+        print(f"No stage exceeded p99 {args.slo_ms:.0f} ms or {args.max_error_rate:.1%} errors")
+    print("\nServer threads by name (first -> last, peak, growth per hour in the final stage):")
+    for name, growth in analysis["thread_growth"].items():
+        per_hour = f"{growth['per_hour']:+.1f}" if growth["per_hour"] is not None else "-"
+        print(f"  {name:<40} {growth['first']:>4} -> {growth['last']:<4} peak {growth['peak']:<4} {per_hour}")
+    if analysis["rss_growth_mib_per_hour"] is not None:
+        print(f"Resident memory growth: {analysis['rss_growth_mib_per_hour']:+.1f} MiB/h")
+    if analysis["leaks"] is None:
+        print(f"Leaks: not judged, the final stage ran {analysis['leak_span_seconds']:.0f} s "
+              f"(--min-leak-span {args.min_leak_span:.0f} s)")
+    else:
+        print("Leaks: " + ("; ".join(analysis["leaks"]) if analysis["leaks"] else "none detected"))
+
+    commit = git_commit()
+    output = args.output or os.path.join(ROOT, "benchmarks", "results",
+                                         f"soak-{commit or 'local'}-{datetime.now():%Y%m%d-%H%M%S}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w") as output_file:
+        json.dump({
+            "commit": commit,
+            "created_at": datetime.now().isoformat(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "settings": {key: value for key, value in vars(args).items() if key != "output"},
+            "stages": stages,
+            "windows": windows,
+            "analysis": analysis
+        }, output_file, indent=2)
+    print(f"\nSaved {output}")
+    sys.exit(1 if analysis["leaks"] else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,180 @@
+"""
+Closed-loop climate control for the Smart Greenhouse
+Hysteresis loops compare readings against day/night setpoint bands and drive the actuators,
+with minimum on/off times so nothing chatters. All loops over all zones are evaluated in one
+batched NumPy pass per sampling tick.
+"""
+import time
+
+import numpy as np
+
+
+class ControlLoop:
+    def __init__(self, name, metric, day_band, night_band=None, low_actuator=None, high_actuator=None,
+                 hysteresis=0.0, min_on_time=30.0, min_off_time=30.0):
+        self.name = name
+        self.metric = metric
+        self.day_band = tuple(day_band)  # (low, high) setpoints
+        self.night_band = tuple(night_band or day_band)
+        self.low_actuator = low_actuator  # Switched on below the band
+        self.high_actuator = high_actuator  # Switched on above the band
+        self.hysteresis = hysteresis  # How far back inside the band a reading must get to switch off
+        self.min_on_time = min_on_time  # seconds
+        self.min_off_time = min_off_time  # seconds
+
+    def to_dict(self):
+        return {
+            "name": self.name,
+            "metric": self.metric,
+            "day_band": list(self.day_band),
+            "night_band": list(self.night_band),
+            "low_actuator": self.low_actuator,
+            "high_actuator": self.high_actuator,
+            "hysteresis": self.hysteresis,
+            "min_on_time": self.min_on_time,
+            "min_off_time": self.min_off_time
+        }
+
+
+# Optimal ranges from SENSOR_ACTUATOR_RELATIONSHIPS.md
+DEFAULT_LOOPS = (
+    ControlLoop("temperature", "temperature", (22, 28), (16, 20),
+                low_actuator="heater", high_actuator="cooling_fan", hysteresis=0.5),
+    ControlLoop("humidity", "humidity", (60, 80), (65, 85),
+                low_actuator="humidifier", high_actuator="dehumidifier", hysteresis=2.0),
+    ControlLoop("co2", "co2_level", (350, 800), (300, 500),
+                low_actuator="co2_injector", hysteresis=25.0),
+    ControlLoop("soil_moisture", "soil_moisture", (40, 60),
+                low_actuator="irrigation", hysteresis=2.0, min_off_time=60.0),
+)
+
+
+class ClimateController:
+    def __init__(self, zone_count, loops=DEFAULT_LOOPS, manual_override_time=300.0, clock=time.monotonic):
+        self.loops = [ControlLoop(**loop.to_dict()) for loop in loops]
+        self.loop_index = {loop.name: i for i, loop in enumerate(self.loops)}
+        self.zone_count = zone_count
+        self.manual_override_time = manual_override_time  # seconds a manual toggle takes precedence
+        self.enabled = True
+        self._clock = clock
+
+        shape = (len(self.loops), zone_count)
+        self._readings = np.zeros(shape)
+        self._low_on = np.zeros(shape, dtype=bool)
+        self._high_on = np.zeros(shape, dtype=bool)
+        self._in_band_ticks = np.zeros(shape, dtype=np.int64)  # Evaluations with the reading inside the band
+        self.evaluations = 0
+        self._rebuild_setpoints()
+
+        self._last_switch = {}  # actuator -> time of its last switch
+        self._manual_until = {}  # actuator -> end of its manual override
+        self.last_latency = 0.0  # seconds spent in the last evaluation
+        self.max_latency = 0.0
+
+    def _rebuild_setpoints(self):
+        """Pack the loop settings into (loops x 1) arrays for batched evaluation"""
+        def column(values):
+            return np.array(values, dtype=float)[:, None]
+
+        self._day_low = column([loop.day_band[0] for loop in self.loops])
+        self._day_high = column([loop.day_band[1] for loop in self.loops])
+        self._night_low = column([loop.night_band[0] for loop in self.loops])
+        self._night_high = column([loop.night_band[1] for loop in self.loops])
+        self._hysteresis = column([loop.hysteresis for loop in self.loops])
+        self._has_low = column([loop.low_actuator is not None for loop in self.loops]).astype(bool)
+        self._has_high = column([loop.high_actuator is not None for loop in self.loops]).astype(bool)
+
+    def configure(self, name, **settings):
+        """Change a loop's setpoints or timings (day_band, night_band, hysteresis, min_on_time, min_off_time)"""
+        if name not in self.loop_index:
+            raise ValueError(f"Invalid control loop: {name}. Valid loops are: {list(self.loop_index)}")
+        loop = self.loops[self.loop_index[name]]
+        for key, value in settings.items():
+            if key not in ("day_band", "night_band", "hysteresis", "min_on_time", "min_off_time"):
+                raise ValueError(f"Invalid setting: {key}")
+            if key.endswith("_band"):
+                low, high = value
+                if low > high:
+                    raise ValueError(f"Invalid {key}: {value}")
+                value = (float(low), float(high))
+            setattr(loop, key, value)
+        self._rebuild_setpoints()
+        return loop
+
+    def active_bands(self, is_day):
+        """{metric: (low, high)} setpoints currently in force"""
+        return {loop.metric: loop.day_band if is_day else loop.night_band for loop in self.loops}
+
+    def note_manual_switch(self, actuator):
+        """A manual toggle pauses automatic control of that actuator for a while"""
+        now = self._clock()
+        self._manual_until[actuator] = now + self.manual_override_time
+        self._last_switch[actuator] = now
+
+    def evaluate(self, readings, is_day, actuator_states, extra_demand=None):
+        """Run every loop for every zone; returns {actuator: desired state} for actuators to switch.
+
+        readings maps each metric to a scalar or a per-zone array; actuator_states maps each
+        actuator to whether it is on. extra_demand is ({loop: bool}, {loop: bool}) of low and high
+        demand from zones evaluated elsewhere (shards), added to this controller's own.
+        """
+        started = time.perf_counter()
+        now = self._clock()
+
+        for i, loop in enumerate(self.loops):
+            self._readings[i] = readings[loop.metric]
+        low = self._day_low if is_day else self._night_low
+        high = self._day_high if is_day else self._night_high
+
+        # Hysteresis: switch on outside the band, off once back inside by the hysteresis margin
+        self._low_on = self._has_low & np.where(self._low_on, self._readings < low + self._hysteresis,
+                                                self._readings < low)
+        self._high_on = self._has_high & np.where(self._high_on, self._readings > high - self._hysteresis,
+                                                  self._readings > high)
+        self._in_band_ticks += (self._readings >= low) & (self._readings <= high)
+        self.evaluations += 1
+        low_demand = self._low_on.any(axis=1).tolist()
+        high_demand = self._high_on.any(axis=1).tolist()
+        if extra_demand is not None:
+            extra_low, extra_high = extra_demand
+            low_demand = [demand or extra_low.get(loop.name, False) for demand, loop in zip(low_demand, self.loops)]
+            high_demand = [demand or extra_high.get(loop.name, False) for demand, loop in zip(high_demand, self.loops)]
+
+        commands = {}
+        if self.enabled:
+            for i, loop in enumerate(self.loops):
+                for actuator, demand in ((loop.low_actuator, low_demand[i]), (loop.high_actuator, high_demand[i])):
+                    if actuator not in actuator_states or actuator_states[actuator] == demand:
+                        continue
+                    if now < self._manual_until.get(actuator, 0.0):
+                        continue
+                    hold = loop.min_on_time if actuator_states.get(actuator) else loop.min_off_time
+                    if now - self._last_switch.get(actuator, -hold) < hold:
+                        continue
+                    commands[actuator] = demand
+                    self._last_switch[actuator] = now
+
+        self.last_latency = time.perf_counter() - started
+        self.max_latency = max(self.max_latency, self.last_latency)
+        return commands
+
+    def in_band_fraction(self):
+        """{loop: fraction of evaluations (averaged over zones) with the reading inside the active band}"""
+        if not self.evaluations:
+            return {loop.name: 0.0 for loop in self.loops}
+        fractions = self._in_band_ticks.mean(axis=1) / self.evaluations
+        return dict(zip(self.loop_index, fractions.tolist()))
+
+    def get_status(self):
+        """Loop settings, current demand and evaluation latency"""
+        return {
+            "enabled": self.enabled,
+            "last_latency_ms": round(self.last_latency * 1000, 3),
+            "max_latency_ms": round(self.max_latency * 1000, 3),
+            "loops": [
+                dict(loop.to_dict(),
+                     low_demand_zones=int(self._low_on[i].sum()),
+                     high_demand_zones=int(self._high_on[i].sum()))
+                for i, loop in enumerate(self.loops)
+            ]
+        }
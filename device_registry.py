@@ -0,0 +1,166 @@
+"""
+Device registry for the Smart Greenhouse
+Sensors and actuators are declared as driver specs ("module:Class" plus how to read them
+and how often). Drivers are imported and instantiated on first use and looked up through an
+index built once, so adding a device means adding one spec. Until an actuator's driver is
+created, its status comes from the spec (off), so listing actuators starts no devices.
+"""
+import importlib
+import json
+import threading
+
+SENSOR = "sensor"
+ACTUATOR = "actuator"
+
+
+def light_category(lux):
+    """Convert a lux value to a category"""
+    if lux < 10000:
+        return "Low"
+    elif 10000 <= lux <= 40000:
+        return "Medium"
+    else:
+        return "High"
+
+
+class DeviceSpec:
+    def __init__(self, name, kind, driver, read=None, refresh_seconds=0.0, enabled=True,
+                 min_refresh_seconds=None, change_tolerance=0.0):
+        self.name = name  # Reading key for sensors, actuator name for actuators
+        self.kind = kind
+        self.driver = driver  # "package.module:ClassName"
+        # Sensors: read(sensor, controller, readings) returns the reading; readings holds those
+        # taken earlier in the same sweep, in declaration order
+        self.read = read
+        # Sampling period bounds: refresh_seconds while readings are steady, min_refresh_seconds while
+        # they move by change_tolerance or more (or sit within it of a setpoint bound); 0 reads every sweep
+        self.refresh_seconds = refresh_seconds
+        self.min_refresh_seconds = refresh_seconds if min_refresh_seconds is None else min_refresh_seconds
+        self.change_tolerance = change_tolerance
+        self.enabled = enabled
+
+    def to_dict(self):
+        return {
+            "name": self.name,
+            "kind": self.kind,
+            "driver": self.driver,
+            "refresh_seconds": self.refresh_seconds,
+            "min_refresh_seconds": self.min_refresh_seconds,
+            "change_tolerance": self.change_tolerance,
+            "enabled": self.enabled
+        }
+
+
+def _on(controller, actuator):
+    return controller.actuator_on(actuator)
+
+
+DEFAULT_DEVICES = (
+    # Sensors, in sweep order (humidity depends on the temperature read just before it).
+    # Fast-moving climate readings drop to one read per 2 s sampling tick when they need attention.
+    DeviceSpec("temperature", SENSOR, "sensors.temperature_sensor:TemperatureSensor",
+               read=lambda sensor, c, readings: sensor.read_temperature(
+                   c.is_day, _on(c, "heater"), _on(c, "cooling_fan")),
+               refresh_seconds=10, min_refresh_seconds=2, change_tolerance=0.5),
+    DeviceSpec("humidity", SENSOR, "sensors.humidity_sensor:HumiditySensor",
+               read=lambda sensor, c, readings: sensor.read_humidity(
+                   c.is_day, readings.get("temperature"), _on(c, "humidifier"), _on(c, "dehumidifier")),
+               refresh_seconds=10, min_refresh_seconds=2, change_tolerance=2.0),
+    DeviceSpec("soil_moisture", SENSOR, "sensors.soil_moisture_sensor:SoilMoistureSensor",
+               read=lambda sensor, c, readings: sensor.read_moisture(irrigation_active=_on(c, "irrigation")),
+               refresh_seconds=30, min_refresh_seconds=2, change_tolerance=2.0),
+    DeviceSpec("light_intensity", SENSOR, "sensors.light_sensor:LightSensor",
+               read=lambda sensor, c, readings: light_category(sensor.read_lux(c.is_day, _on(c, "lights"))),
+               refresh_seconds=10, min_refresh_seconds=2),
+    # NDIR CO2 cells and wet-chemistry probes are slow and pH/nutrients drift over hours
+    DeviceSpec("co2_level", SENSOR, "sensors.co2_sensor:CO2Sensor",
+               read=lambda sensor, c, readings: sensor.read_co2(c.is_day, _on(c, "lights"), _on(c, "co2_injector")),
+               refresh_seconds=30, min_refresh_seconds=10, change_tolerance=25.0),
+    DeviceSpec("ph_level", SENSOR, "sensors.ph_sensor:PHSensor",
+               read=lambda sensor, c, readings: sensor.read_ph(),
+               refresh_seconds=600, min_refresh_seconds=60, change_tolerance=0.1),
+    DeviceSpec("nutrient_level", SENSOR, "sensors.nutrient_sensor:NutrientSensor",
+               read=lambda sensor, c, readings: sensor.read_nutrient_level(),
+               refresh_seconds=600, min_refresh_seconds=60, change_tolerance=2.0),
+
+    # Actuators
+    DeviceSpec("heater", ACTUATOR, "actuators.heater:Heater"),
+    DeviceSpec("cooling_fan", ACTUATOR, "actuators.cooling_fan:CoolingFan"),
+    DeviceSpec("humidifier", ACTUATOR, "actuators.humidifier:Humidifier"),
+    DeviceSpec("dehumidifier", ACTUATOR, "actuators.dehumidifier:Dehumidifier"),
+    DeviceSpec("irrigation", ACTUATOR, "actuators.irrigation:IrrigationSystem"),
+    DeviceSpec("lights", ACTUATOR, "actuators.lights:GrowLights"),
+    DeviceSpec("co2_injector", ACTUATOR, "actuators.co2_injector:CO2Injector"),
+    DeviceSpec("nutrient_pump", ACTUATOR, "actuators.nutrient_pump:NutrientPump"),
+)
+
+
+def load_device_config(path):
+    """Read a JSON device config: {"devices": {name: {"enabled", "driver", "refresh_seconds",
+    "min_refresh_seconds", "change_tolerance"}}}"""
+    with open(path) as config_file:
+        return json.load(config_file)
+
+
+class DeviceRegistry:
+    def __init__(self, specs=DEFAULT_DEVICES, config=None):
+        overrides = (config or {}).get("devices", {})
+        unknown = set(overrides) - {spec.name for spec in specs}
+        if unknown:
+            raise ValueError(f"Unknown devices in config: {sorted(unknown)}")
+
+        # Prebuilt index of enabled devices, in declaration order
+        self.specs = {}
+        for spec in specs:
+            settings = overrides.get(spec.name, {})
+            spec = DeviceSpec(spec.name, spec.kind, settings.get("driver", spec.driver), spec.read,
+                              settings.get("refresh_seconds", spec.refresh_seconds),
+                              settings.get("enabled", spec.enabled),
+                              settings.get("min_refresh_seconds", spec.min_refresh_seconds),
+                              settings.get("change_tolerance", spec.change_tolerance))
+            if spec.enabled:
+                self.specs[spec.name] = spec
+        self.sensors = [spec for spec in self.specs.values() if spec.kind == SENSOR]
+        self.actuator_names = [spec.name for spec in self.specs.values() if spec.kind == ACTUATOR]
+
+        self._instances = {}
+        self._lock = threading.Lock()
+
+    def __contains__(self, name):
+        return name in self.specs
+
+    def get(self, name):
+        """The driver instance for a device, imported and created on first use"""
+        device = self._instances.get(name)
+        if device is None:
+            spec = self.specs[name]  # KeyError for unknown or disabled devices
+            with self._lock:
+                device = self._instances.get(name)
+                if device is None:
+                    module_name, class_name = spec.driver.split(":")
+                    device = getattr(importlib.import_module(module_name), class_name)()
+                    self._instances[name] = device
+        return device
+
+    def actuator(self, name):
+        """An actuator driver, or None if there is no such (enabled) actuator"""
+        spec = self.specs.get(name)
+        if spec is None or spec.kind != ACTUATOR:
+            return None
+        return self.get(name)
+
+    def created(self, name):
+        """The driver instance if it has been created, else None; never creates one"""
+        return self._instances.get(name)
+
+    def actuator_status(self, name):
+        """An actuator's driver status; a driver not created yet has never been switched, so it is off"""
+        device = self._instances.get(name)
+        return device.get_status() if device is not None else {"is_on": False}
+
+    def loaded(self):
+        """Names of the devices whose drivers have been created"""
+        return list(self._instances)
+
+    def describe(self):
+        return [dict(spec.to_dict(), loaded=spec.name in self._instances) for spec in self.specs.values()]
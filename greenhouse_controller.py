@@ -2,251 +2,639 @@
 Main Controller for Smart Greenhouse Simulation
 This controller integrates all sensors, actuators, and the RX200 robot
 """
-import time
 import threading
 import json
+import logging
+import re
+import time
 from datetime import datetime
 
-# Import sensor modules
-from sensors.temperature_sensor import TemperatureSensor
-from sensors.humidity_sensor import HumiditySensor
-from sensors.soil_moisture_sensor import SoilMoistureSensor
-from sensors.light_sensor import LightSensor
-from sensors.co2_sensor import CO2Sensor
-from sensors.ph_sensor import PHSensor
-from sensors.nutrient_sensor import NutrientSensor
-
-# Import actuator modules
-from actuators.heater import Heater
-from actuators.cooling_fan import CoolingFan
-from actuators.humidifier import Humidifier
-from actuators.dehumidifier import Dehumidifier
-from actuators.irrigation import IrrigationSystem
-from actuators.lights import GrowLights
-from actuators.co2_injector import CO2Injector
-from actuators.nutrient_pump import NutrientPump
+import numpy as np
 
 # Import ROS simulation
-from ros_simulation.rx200_robot import RX200Robot
+from ros_simulation.robot_fleet import RobotFleet
+from ros_simulation.task_planner import plan_treatments
+
+from alert_engine import SEVERITY_ORDER, AlertEngine
+from climate_control import ClimateController
+from device_registry import DeviceRegistry, load_device_config
+from history_store import HistoryStore
+from metrics import REGISTRY, Counter, Histogram
+from records import SensorReadings, ZoneTable
+from sensor_sampler import SensorSampler
+from sim_clock import SYSTEM_CLOCK, run_steps
+from status_broadcaster import StatusBroadcaster
+from status_payload import StatusPayload
+from telemetry_log import TelemetryLog
+from timer_scheduler import TimerScheduler
+from zone_state import EFFECT_INDEX, EFFECT_TYPES, ZoneEffectsView, ZoneStateEngine
+
+logger = logging.getLogger(__name__)
+
+SWEEP_DURATION = Histogram("greenhouse_sensor_sweep_duration_seconds",
+                           "Time to read every sensor and compute zone readings", ("kind",))
+SNAPSHOT_DURATION = Histogram("greenhouse_snapshot_publish_duration_seconds",
+                              "Time to build, encode and broadcast a status snapshot")
+ACTUATOR_SWITCHES = Counter("greenhouse_actuator_switches_total", "Actuator switch commands", ("actuator", "source"))
+
+# Readings that treatment effects change per zone, in compute_readings order
+ZONE_METRICS = ("soil_moisture", "nutrient_level", "ph_level")
+
+
+def _threads_by_name():
+    """{(name,): live threads}, numbering stripped: "Thread-7 (_worker)" counts as "Thread (_worker)" """
+    counts = {}
+    for thread in threading.enumerate():
+        key = (re.sub(r"-\d+", "", thread.name),)
+        counts[key] = counts.get(key, 0) + 1
+    return counts
+
 
 class GreenhouseController:
-    def __init__(self):
-        # Initialize sensors
-        self.temperature_sensor = TemperatureSensor()
-        self.humidity_sensor = HumiditySensor()
-        self.soil_moisture_sensor = SoilMoistureSensor()
-        self.light_sensor = LightSensor()
-        self.co2_sensor = CO2Sensor()
-        self.ph_sensor = PHSensor()
-        self.nutrient_sensor = NutrientSensor()
+    def __init__(self, zone_coordinates=None, robot_count=1, telemetry_dir=None, clock=SYSTEM_CLOCK,
+                 start_threads=True, device_config=None, robot_id_start=1):
+        # All timing goes through the clock; without threads, every periodic job is a scheduler timer
+        # and the caller drives time (see simulation.py)
+        self.clock = clock
+        self.start_threads = start_threads
+        
+        # Sensors and actuators are declared in device_registry.py (optionally overridden by a JSON
+        # config); each driver is created when it is first read or switched, never at start-up
+        if isinstance(device_config, str):
+            device_config = load_device_config(device_config)
+        self.devices = DeviceRegistry(config=device_config)
+        
+        # One scheduler owns every delayed job: effect decay, robot recharges and, without threads, sampling
+        self.effect_scheduler = TimerScheduler(clock=clock.monotonic, start_thread=start_threads)
+        
+        # Initialize the robot fleet; each robot runs its jobs one at a time on its own queue and
+        # is recharged from the scheduler when idle drain takes it low
+        self.fleet = RobotFleet(robot_count, zone_coordinates=zone_coordinates, clock=clock,
+                                time_scale=0.1 if start_threads else 1.0, start_threads=start_threads,
+                                scheduler=self.effect_scheduler, robot_id_start=robot_id_start)
+        self.robot = self.fleet.robots[0]  # Primary robot shown on the dashboard
+        self._robot_operations = {
+            "move": self._move_steps,
+            "water": self._water_steps,
+            "manure": self._manure_steps,
+            "fertilizer": self._fertilizer_steps
+        }
         
-        # Initialize actuators
-        self.heater = Heater()
-        self.cooling_fan = CoolingFan()
-        self.humidifier = Humidifier()
-        self.dehumidifier = Dehumidifier()
-        self.irrigation = IrrigationSystem()
-        self.lights = GrowLights()
-        self.co2_injector = CO2Injector()
-        self.nutrient_pump = NutrientPump()
+        # Serializes actuator and setting changes (read-modify-write toggles); readers use the snapshot
+        self._state_lock = threading.Lock()
         
-        # Initialize robot
-        self.robot = RX200Robot()
+        # Actuator duty cycles: accumulated on-time plus the start of the current on period.
+        # Every actuator starts off; its driver is only created when it is first switched
+        self._actuator_on_seconds = dict.fromkeys(self.devices.actuator_names, 0.0)
+        self._actuator_on_since = dict.fromkeys(self.devices.actuator_names)
         
         # Greenhouse settings
         self.is_day = True
         self.day_start = 6
         self.day_end = 18
-        self.zone_effects = {
-            "A": {"watering": 0, "manure": 0, "fertilizer": 0},
-            "B": {"watering": 0, "manure": 0, "fertilizer": 0},
-            "C": {"watering": 0, "manure": 0, "fertilizer": 0},
-            "D": {"watering": 0, "manure": 0, "fertilizer": 0}
-        }
+        
+        # Zone effects live in NumPy arrays, one row per zone; zone_effects is a dict-like view
+        self.zone_state = ZoneStateEngine(self.robot.zone_coordinates.keys())
+        self.zone_effects = ZoneEffectsView(self.zone_state)
+        
+        # Bounded per-zone history of every numeric reading, sampled once per tick
+        self.history = HistoryStore(self.zone_state.zones)
+        
+        # Hysteresis loops that drive the climate actuators on every sampling tick
+        self.climate = ClimateController(len(self.zone_state.zones), clock=clock.monotonic)
+        
+        # Per-sensor adaptive sampling; sampling tightens near the active climate setpoints
+        self.sampler = SensorSampler(self.devices.sensors, clock, bands=lambda: self.climate.active_bands(self.is_day))
+        # Site-wide readings pushed by a sharding coordinator (SensorReadings); when set, sweeps use them
+        # instead of reading devices
+        self.site_readings = None
+        
+        # Threshold, rate-of-change and anomaly alerts, evaluated on every sampling tick
+        self.alerts = AlertEngine(self.zone_state.zones, clock=clock)
+        
+        # Optional append-only telemetry log; replaying it restores the state of the previous run
+        self.telemetry = None
+        if telemetry_dir:
+            self.telemetry = TelemetryLog(
+                telemetry_dir,
+                zones=self.zone_state.zones,
+                metrics=self.history.metrics,
+                effect_types=EFFECT_TYPES,
+                actuators=self.devices.actuator_names,
+                robot_ids=[robot.robot_id for robot in self.fleet.robots],
+                clock=clock
+            )
+        
+        # One scheduler owns the decay of every zone effect, applied to all zones at once
+        self.effect_decay_delay = 30  # seconds before an effect starts to decay
+        self.effect_decay_interval = 5  # seconds between decay steps
+        self.effect_decay_step = 5
+        self.treatment_amounts = {"watering": 20, "manure": 15, "fertilizer": 25}  # Effect added per application
+        self.effect_scheduler.schedule("zone_decay", self.effect_decay_interval, self._decay_effects)
+        
+        if self.telemetry is not None:
+            self._restore_from_telemetry()
+        
+        # Latest status snapshot, rebuilt once per sampling tick
+        self.sampling_interval = 2  # seconds
+        self._snapshot = None
+        self._payload = None
+        self.compress_payload = True
+        # Without threads (simulation) nobody polls between ticks, so snapshots are only built when read
+        self.lazy_snapshots = not start_threads
+        self._last_sweep = None  # (base_data, zone_readings) of the latest sensor sweep
+        self._snapshot_stale = False
+        self.broadcaster = StatusBroadcaster()
+        self._snapshot_lock = threading.Lock()
+        # The first snapshot has no readings yet, so building it starts no sensor; the first tick fills it in
+        self._last_sweep = self._empty_sweep()
+        self._snapshot_stale = True
+        if not self.lazy_snapshots:
+            self._publish_if_stale()
+        
+        self._register_metrics()
         
         # Start background thread for sensor updates
-        self.sensor_thread = threading.Thread(target=self._update_sensors_continuously, daemon=True)
-        self.sensor_thread.start()
+        self.sensor_thread = None
+        if start_threads:
+            self.sensor_thread = threading.Thread(target=self._update_sensors_continuously, daemon=True)
+            self.sensor_thread.start()
+        else:
+            self.effect_scheduler.schedule("sensor_tick", self.sampling_interval, self._sample_tick)
         
+    def _register_metrics(self):
+        """Expose controller state read at scrape time; the latest controller replaces earlier ones"""
+        fleet = self.fleet
+        REGISTRY.register_callback("greenhouse_threads", "Live threads in the process", threading.active_count)
+        REGISTRY.register_callback("greenhouse_threads_by_name", "Live threads by name, numbering stripped",
+                                   _threads_by_name, labelnames=("name",))
+        REGISTRY.register_callback("greenhouse_robot_battery_percent", "Robot battery level", lambda: {
+            (robot.robot_id,): robot.battery_level for robot in fleet.robots
+        }, labelnames=("robot_id",))
+        REGISTRY.register_callback("greenhouse_robot_queue_depth", "Robot jobs waiting to run", lambda: {
+            (robot_id,): job_queue.pending_count() for robot_id, job_queue in fleet.job_queues.items()
+        }, labelnames=("robot_id",))
+        REGISTRY.register_callback("greenhouse_actuator_on", "Whether an actuator is on", lambda: {
+            (name,): float(status["is_on"]) for name, status in self.get_all_actuator_status().items()
+        }, labelnames=("actuator",))
+        REGISTRY.register_callback("greenhouse_actuator_on_seconds_total", "Time actuators have spent on",
+                                   self._actuator_on_time, kind="counter", labelnames=("actuator",))
+        REGISTRY.register_callback("greenhouse_pending_timers", "Armed scheduler timers",
+                                   self.effect_scheduler.pending_count)
+        REGISTRY.register_callback("greenhouse_decaying_effects", "Zone effects still above zero",
+                                   self.zone_state.active_count)
+        REGISTRY.register_callback("greenhouse_active_alerts", "Alerts currently raised", lambda: {
+            (severity,): float(count) for severity, count in self.alerts.counts().items()
+        }, labelnames=("severity",))
+    
+    def get_actuator_on_seconds(self):
+        """{actuator: seconds on so far}, including the current on period"""
+        now = self.clock.monotonic()
+        return {
+            name: total + (now - self._actuator_on_since[name] if self._actuator_on_since[name] is not None else 0.0)
+            for name, total in self._actuator_on_seconds.items()
+        }
+    
+    def _actuator_on_time(self):
+        return {(name,): seconds for name, seconds in self.get_actuator_on_seconds().items()}
+    
     def _update_sensors_continuously(self):
-        """Background thread to continuously update sensor values"""
+        """Background thread that samples the sensors and publishes a snapshot every tick, starting right away"""
         while True:
-            time.sleep(2)  # Update every 2 seconds
-            # Sensors update automatically in their read methods
-            pass
-    
-    def _get_light_category(self, lux):
-        """Convert lux value to a category."""
-        if lux < 10000:
-            return "Low"
-        elif 10000 <= lux <= 40000:
-            return "Medium"
-        else:
-            return "High"
-
+            self._sample_tick()
+            self.clock.sleep(self.sampling_interval)
     
-    def get_all_sensor_data(self):
-        """Get data from all sensors"""
-        # Get current temperature
-        temperature = self.temperature_sensor.read_temperature(self.is_day, self.heater.is_on, self.cooling_fan.is_on)
-
+    def _sample_tick(self, key=None):
+        """Sample the sensors, publish a snapshot and flush telemetry; returns the sampling interval"""
+        try:
+            # Idle drain is only settled by operations, so bring the published battery levels up to date
+            for robot in self.fleet.robots:
+                robot.settle_battery()
+            self._refresh_snapshot(tick=True)
+            if self.telemetry is not None:
+                timestamp = self.clock.time()
+                for robot in self.fleet.robots:
+                    self.telemetry.log_robot(timestamp, robot.robot_id, robot.battery_level)
+                self.telemetry.flush()
+        except Exception:
+            logger.exception("Error refreshing status snapshot")
+        return self.sampling_interval
+    
+    def _refresh_snapshot(self, tick=False):
+        """Rebuild the status snapshot and publish it for readers"""
+        with self._snapshot_lock:
+            if self.lazy_snapshots:
+                # Reuse the last sweep between ticks so reading the status never changes a simulated run
+                if tick or self._last_sweep is None:
+                    self._last_sweep = self._sweep(tick)
+                self._snapshot_stale = True
+                return
+            self._last_sweep = self._sweep(tick)
+            self._publish_snapshot()
+    
+    def _publish_snapshot(self):
+        """Build, encode and broadcast a snapshot of the latest sweep; called with the snapshot lock held"""
+        started = time.perf_counter()
+        snapshot = self._build_snapshot(*self._last_sweep)
+        previous = self._payload
+        self._payload = StatusPayload.encode(snapshot, previous, compress=self.compress_payload)
+        self._snapshot = snapshot
+        self._snapshot_stale = False
+        if self._payload is not previous:
+            self.broadcaster.publish(snapshot, self._payload.version)
+        SNAPSHOT_DURATION.observe(time.perf_counter() - started)
+    
+    def _publish_if_stale(self):
+        if self._snapshot_stale:
+            with self._snapshot_lock:
+                if self._snapshot_stale:
+                    self._publish_snapshot()
+    
+    def _sweep(self, tick=False):
+        """Read every sensor once and apply zone effects; returns (base_data, zone_readings).
+        
+        On a sampling tick the readings are also recorded and fed to the climate control loops.
+        """
+        started = time.perf_counter()
+        base_data = self._read_sensors()
+        zone_readings = self.zone_state.compute_readings(*self._zone_inputs(base_data))
+        SWEEP_DURATION.labels("tick" if tick else "refresh").observe(time.perf_counter() - started)
+        if tick:
+            readings = self._tick_readings(base_data, *zone_readings)
+            self._record_history(readings)
+            self._run_climate_control(readings)
+            self.alerts.evaluate(readings)
+        return base_data, zone_readings
+    
+    def _empty_sweep(self):
+        """A sweep with no sensor readings, as (base_data, zone_readings)"""
+        base_data = SensorReadings()
+        return base_data, self.zone_state.compute_readings(*self._zone_inputs(base_data))
+    
+    def _build_snapshot(self, base_data, zone_readings):
+        """Build the complete status from a sensor sweep.
+        
+        Per-zone sections are compact tables over the sweep's arrays; they become dicts only
+        when the snapshot is encoded as JSON.
+        """
+        robot_status = self.robot.get_status()
+        
+        # Only sensors that are in use get per-zone values
+        zone_sensors = ZoneTable(self.zone_state.zones, base_data, [
+            (metric, readings) for metric, readings in zip(ZONE_METRICS, zone_readings) if metric in base_data
+        ])
+        current_row = self.zone_state.index.get(robot_status["current_position"])
+        
+        return {
+            "sensors": zone_sensors.row(current_row) if current_row is not None else base_data.to_dict(),
+            "zone_sensors": zone_sensors,
+            "actuators": self.get_all_actuator_status(),
+            "robot": robot_status,
+            "robot_jobs": {"pending": self.fleet.pending_count()},
+            "fleet": self.fleet.get_status(),
+            "settings": {
+                "is_day": self.is_day,
+                "day_start": self.day_start,
+                "day_end": self.day_end
+            },
+            "zone_effects": self.zone_state.effects_table(),
+            "scheduler": {
+                "pending_timers": self.effect_scheduler.pending_count(),
+                "decaying_effects": self.zone_state.active_count()
+            },
+            "climate_control": self.climate.get_status(),
+            "sampling_periods": self.sampler.get_status(),
+            "alerts": self.alerts.summary()
+        }
+    
+    def _tick_readings(self, base_data, moisture, nutrients, ph):
+        """Numeric readings of one tick: scalars shared by all zones, arrays for per-zone metrics"""
         return {
-            "temperature": temperature,
-            "humidity": self.humidity_sensor.read_humidity(self.is_day, temperature, self.humidifier.is_on, self.dehumidifier.is_on),
-            "soil_moisture": self.soil_moisture_sensor.read_moisture(irrigation_active=self.irrigation.is_on),
-            "light_intensity": self._get_light_category(self.light_sensor.read_lux(self.is_day, self.lights.is_on)),
-            "co2_level": self.co2_sensor.read_co2(self.is_day, self.lights.is_on, self.co2_injector.is_on),
-            "ph_level": self.ph_sensor.read_ph(),
-            "nutrient_level": self.nutrient_sensor.read_nutrient_level()
+            "temperature": base_data.get("temperature", np.nan),
+            "humidity": base_data.get("humidity", np.nan),
+            "soil_moisture": moisture,
+            "co2_level": base_data.get("co2_level", np.nan),
+            "ph_level": ph,
+            "nutrient_level": nutrients
+        }
+    
+    def _record_history(self, readings):
+        """Record one tick of readings for every zone"""
+        timestamp = self.clock.time()
+        self.history.record(timestamp, readings)
+        if self.telemetry is not None:
+            self.telemetry.log_samples(timestamp, readings)
+    
+    def _run_climate_control(self, readings):
+        """Evaluate every control loop and switch the actuators it asks for"""
+        actuator_states = {name: status["is_on"] for name, status in self.get_all_actuator_status().items()}
+        for actuator_name, state in self.climate.evaluate(readings, self.is_day, actuator_states).items():
+            self.toggle_actuator(actuator_name, state, refresh=False, manual=False)
+    
+    def get_climate_control(self):
+        """Climate control settings and loop states"""
+        return self.climate.get_status()
+    
+    def set_climate_control(self, enabled=None, loops=None):
+        """Enable/disable automatic climate control and update loop settings ({loop: {setting: value}})"""
+        if enabled is not None:
+            self.climate.enabled = bool(enabled)
+        for name, settings in (loops or {}).items():
+            self.climate.configure(name, **settings)
+        self._refresh_snapshot()
+        return self.climate.get_status()
+    
+    def get_alerts(self, zone=None, severity=None, limit=50):
+        """Active alerts (optionally for one zone or severity), recent raise/clear events and the rules"""
+        if zone is not None and zone not in self.zone_state.index:
+            return False, f"Invalid zone: {zone}"
+        if severity is not None and severity not in SEVERITY_ORDER:
+            return False, f"Invalid severity: {severity}"
+        return True, {
+            "active": self.alerts.active_alerts(zone, severity),
+            "events": self.alerts.recent_events(limit),
+            "rules": self.alerts.get_rules(),
+            "summary": self.alerts.summary()
         }
+    
+    def _restore_from_telemetry(self):
+        """Restore zone effects, actuators, settings, robots and history from the telemetry log"""
+        state = self.telemetry.replay(self.history)
+        
+        decay_start = self.clock.monotonic() + self.effect_decay_delay
+        for zone, effects in state["zone_effects"].items():
+            if zone in self.zone_state.index:
+                for effect_type, value in effects.items():
+                    self.zone_state.restore(zone, effect_type, value, decay_start)
+        
+        for actuator_name, is_on in state["actuators"].items():
+            self.toggle_actuator(actuator_name, is_on, refresh=False, manual=False)
+        
+        self.is_day = state["settings"].get("is_day", self.is_day)
+        
+        for robot in self.fleet.robots:
+            robot.restore_state(**state["robots"].get(robot.robot_id, {}))
+        self.fleet.schedule_charges()
+    
+    def _log_robot(self, robot):
+        """Log a robot's battery and the operation it just completed"""
+        status = robot.get_status_record()
+        if self.telemetry is not None and status.last_operation:
+            self.telemetry.log_robot(self.clock.time(), robot.robot_id, status.battery_level,
+                                     status.last_operation.operation, status.last_operation.zone)
+    
+    def get_history(self, metric, zone, start=None, end=None, resolution=None):
+        """Range query over recorded readings; start/end are Unix timestamps (default: the last hour)"""
+        end = self.clock.time() if end is None else end
+        start = end - 3600 if start is None else start
+        return self.history.query(metric, zone, start, end, resolution)
+    
+    def get_status_snapshot(self):
+        """Get the latest status snapshot without reading any sensors.
+        
+        The snapshot is replaced, never modified, so callers must treat it as read-only.
+        """
+        self._publish_if_stale()
+        return self._snapshot
+    
+    def get_status_payload(self):
+        """Get the latest snapshot pre-serialized as JSON, with its version and ETag"""
+        self._publish_if_stale()
+        return self._payload
+    
+    def get_all_sensor_data(self):
+        """Get data from all sensors in use; each sensor is only read when its sampling period is up"""
+        return self._read_sensors().to_dict()
+    
+    def _read_sensors(self):
+        """Sensor readings as a SensorReadings record"""
+        if self.site_readings is not None:
+            return self.site_readings
+        data = SensorReadings()
+        for spec in self.devices.sensors:
+            data[spec.name] = self.sampler.read(
+                spec.name, lambda spec=spec: spec.read(self.devices.get(spec.name), self, data))
+        return data
 
 
     
     def get_zone_specific_data(self, zone):
         """Get sensor data specific to a zone with applied effects"""
-        # Get base data with irrigation status
-        base_data = self.get_all_sensor_data()
-        
-        # Apply zone-specific effects
-        effects = self.zone_effects.get(zone, {"watering": 0, "manure": 0, "fertilizer": 0})
+        return self._apply_zone_effects(self._read_sensors(), zone)
+    
+    def _apply_zone_effects(self, base_data, zone):
+        """Apply a zone's treatment effects to a sensor sweep without reading the sensors again"""
+        zone_data = base_data.to_dict()
+        if zone not in self.zone_state.index:
+            return zone_data
         
-        # Modify soil moisture based on watering to keep in optimal range (40-60%)
-        if effects["watering"] > 0:
-            # Ensure soil moisture stays in optimal range (40-60%)
-            optimal_min, optimal_max = (40, 60)
-            # Read moisture with optimal flag to keep in range
-            base_data["soil_moisture"] = self.soil_moisture_sensor.read_moisture(irrigation_active=self.irrigation.is_on)
-            # Apply additional boost from watering effect
-            boost = (effects["watering"] / 100.0) * 20  # Up to 20% boost
-            base_data["soil_moisture"] = min(optimal_max, base_data["soil_moisture"] + boost)
-
-            
-        # Modify nutrient level based on fertilizer
-        if effects["fertilizer"] > 0 or effects["manure"] > 0:
-            # Get the base nutrient level (which is already degrading)
-            base_nutrient_level = base_data["nutrient_level"]
-            
-            # Apply temporary boost from fertilizer/manure effects
-            fertilizer_boost = (effects["fertilizer"] / 100.0) * 20  # Up to 20% boost
-            manure_boost = (effects["manure"] / 100.0) * 15  # Up to 15% boost
-            total_boost = fertilizer_boost + manure_boost
-            
-            # The final level is the base plus the boost, capped at 95%
-            base_data["nutrient_level"] = min(95, base_nutrient_level + total_boost)
-            
-        # Modify pH level based on manure to keep in optimal range (6.0-6.8)
-        if effects["manure"] > 0:
-            # Apply boost from manure effect
-            boost = (effects["manure"] / 100.0) * 0.8  # Up to 0.8 pH boost
-            base_data["ph_level"] = max(6.0, min(6.8, base_data["ph_level"] + boost))
-            
-        return base_data
+        row = self.zone_state.index[zone]
+        zone_readings = self.zone_state.compute_readings(*self._zone_inputs(base_data), rows=slice(row, row + 1))
+        for metric, readings in zip(ZONE_METRICS, zone_readings):
+            if metric in base_data:
+                zone_data[metric] = float(readings[0])
+        return zone_data
+    
+    @staticmethod
+    def _zone_inputs(base_data):
+        """Base readings for compute_readings; NaN for sensors that are not in use"""
+        return tuple(base_data.get(metric, np.nan) for metric in ZONE_METRICS)
 
     
     def get_all_actuator_status(self):
         """Get status of all actuators"""
-        return {
-            "heater": self.heater.get_status(),
-            "cooling_fan": self.cooling_fan.get_status(),
-            "humidifier": self.humidifier.get_status(),
-            "dehumidifier": self.dehumidifier.get_status(),
-            "irrigation": self.irrigation.get_status(),
-            "lights": self.lights.get_status(),
-            "co2_injector": self.co2_injector.get_status(),
-            "nutrient_pump": self.nutrient_pump.get_status()
-        }
+        return {name: self.devices.actuator_status(name) for name in self.devices.actuator_names}
     
-    def toggle_actuator(self, actuator_name, state=None):
-        """Toggle or set state of an actuator"""
-        actuators = {
-            "heater": self.heater,
-            "cooling_fan": self.cooling_fan,
-            "humidifier": self.humidifier,
-            "dehumidifier": self.dehumidifier,
-            "irrigation": self.irrigation,
-            "lights": self.lights,
-            "co2_injector": self.co2_injector,
-            "nutrient_pump": self.nutrient_pump
-        }
-        
-        if actuator_name not in actuators:
+    def actuator_on(self, actuator_name):
+        """Whether an actuator is on; actuators that are not in use, or never switched, count as off"""
+        actuator = self.devices.created(actuator_name)
+        return actuator is not None and actuator.is_on
+    
+    def toggle_actuator(self, actuator_name, state=None, refresh=True, manual=True):
+        """Toggle or set state of an actuator; a manual switch pauses automatic control of it"""
+        actuator = self.devices.actuator(actuator_name)
+        if actuator is None:
             return False, f"Invalid actuator: {actuator_name}"
-            
-        actuator = actuators[actuator_name]
         
-        if state is None:
-            # Toggle state
-            if actuator.is_on:
-                actuator.turn_off()
+        with self._state_lock:
+            if state is None:
+                # Toggle state
+                if actuator.is_on:
+                    actuator.turn_off()
+                else:
+                    actuator.turn_on()
             else:
-                actuator.turn_on()
-        else:
-            # Set specific state
-            if state:
-                actuator.turn_on()
-            else:
-                actuator.turn_off()
-                
-        return True, f"{actuator_name} {'turned on' if actuator.is_on else 'turned off'}"
+                # Set specific state
+                if state:
+                    actuator.turn_on()
+                else:
+                    actuator.turn_off()
+            is_on = actuator.is_on
+            self._track_duty_cycle(actuator_name, is_on)
+            ACTUATOR_SWITCHES.labels(actuator_name, "manual" if manual else "auto").inc()
+            
+            if manual:
+                self.climate.note_manual_switch(actuator_name)
+            if self.telemetry is not None:
+                self.telemetry.log_actuator(self.clock.time(), actuator_name, is_on)
+        if refresh:
+            self._refresh_snapshot()
+        return True, f"{actuator_name} {'turned on' if is_on else 'turned off'}"
+    
+    def _track_duty_cycle(self, actuator_name, is_on):
+        """Account an actuator's on-time; called with the state lock held"""
+        now = self.clock.monotonic()
+        since = self._actuator_on_since[actuator_name]
+        if is_on and since is None:
+            self._actuator_on_since[actuator_name] = now
+        elif not is_on and since is not None:
+            self._actuator_on_seconds[actuator_name] += now - since
+            self._actuator_on_since[actuator_name] = None
     
-    def move_robot_to_zone(self, zone):
-        """Move robot to specified zone"""
+    def move_robot_to_zone(self, zone, robot=None):
+        """Move robot to specified zone (with the given robot, or the primary one)"""
+        return run_steps(self._move_steps(zone, robot or self.robot), self.clock)
+    
+    def _move_steps(self, zone, robot):
+        """Steps of move_robot_to_zone(); the robot's work yields its duration instead of sleeping"""
         try:
-            success = self.robot.move_to_zone(zone)
+            success = yield from robot.move_steps(zone)
+            if success:
+                self._log_robot(robot)
+            self._refresh_snapshot()
             return success, f"Robot moved to zone {zone}" if success else "Failed to move robot"
         except ValueError as e:
             return False, str(e)
     
-    def water_zone(self, zone):
-        """Water specified zone"""
+    def water_zone(self, zone, robot=None):
+        """Water specified zone (with the given robot, or the primary one)"""
+        return run_steps(self._water_steps(zone, robot or self.robot), self.clock)
+    
+    def _water_steps(self, zone, robot):
+        """Steps of water_zone()"""
         try:
-            success = self.robot.water_zone(zone)
+            success = yield from robot.water_steps(zone)
             if success:
                 # Apply watering effect to zone
-                self.zone_effects[zone]["watering"] = min(100, self.zone_effects[zone]["watering"] + 20)
-                # Start decay timer
-                threading.Thread(target=self._decay_effect, args=(zone, "watering"), daemon=True).start()
+                self._log_robot(robot)
+                self._apply_effect(zone, "watering", self.treatment_amounts["watering"])
+                self._refresh_snapshot()
             return success, f"Watered zone {zone}" if success else "Failed to water zone"
         except ValueError as e:
             return False, str(e)
     
-    def apply_manure_to_zone(self, zone):
-        """Apply manure to specified zone"""
+    def apply_manure_to_zone(self, zone, robot=None):
+        """Apply manure to specified zone (with the given robot, or the primary one)"""
+        return run_steps(self._manure_steps(zone, robot or self.robot), self.clock)
+    
+    def _manure_steps(self, zone, robot):
+        """Steps of apply_manure_to_zone()"""
         try:
-            success = self.robot.apply_manure(zone)
+            success = yield from robot.manure_steps(zone)
             if success:
                 # Apply manure effect to zone
-                self.zone_effects[zone]["manure"] = min(100, self.zone_effects[zone]["manure"] + 15)
-                # Start decay timer
-                threading.Thread(target=self._decay_effect, args=(zone, "manure"), daemon=True).start()
+                self._log_robot(robot)
+                self._apply_effect(zone, "manure", self.treatment_amounts["manure"])
+                self._refresh_snapshot()
             return success, f"Applied manure to zone {zone}" if success else "Failed to apply manure"
         except ValueError as e:
             return False, str(e)
     
-    def apply_fertilizer_to_zone(self, zone):
-        """Apply fertilizer to specified zone"""
+    def apply_fertilizer_to_zone(self, zone, robot=None):
+        """Apply fertilizer to specified zone (with the given robot, or the primary one)"""
+        return run_steps(self._fertilizer_steps(zone, robot or self.robot), self.clock)
+    
+    def _fertilizer_steps(self, zone, robot):
+        """Steps of apply_fertilizer_to_zone()"""
         try:
-            success = self.robot.apply_fertilizer(zone)
+            success = yield from robot.fertilizer_steps(zone)
             if success:
                 # Apply fertilizer effect to zone
-                self.zone_effects[zone]["fertilizer"] = min(100, self.zone_effects[zone]["fertilizer"] + 25)
-                # Start decay timer
-                threading.Thread(target=self._decay_effect, args=(zone, "fertilizer"), daemon=True).start()
+                self._log_robot(robot)
+                self._apply_effect(zone, "fertilizer", self.treatment_amounts["fertilizer"])
+                self._refresh_snapshot()
             return success, f"Applied fertilizer to zone {zone}" if success else "Failed to apply fertilizer"
         except ValueError as e:
             return False, str(e)
     
-    def _decay_effect(self, zone, effect_type):
-        """Decay the effect of operations over time"""
-        time.sleep(30)  # Wait 30 seconds before starting decay
-        while self.zone_effects[zone][effect_type] > 0:
-            time.sleep(5)  # Decay every 5 seconds
-            self.zone_effects[zone][effect_type] = max(0, self.zone_effects[zone][effect_type] - 5)
+    def _apply_effect(self, zone, effect_type, amount):
+        """Add a treatment effect to a zone; a new application restarts its hold period before decay"""
+        # The write and its log record are paired under the engine lock, so the log keeps write order
+        with self.zone_state.lock:
+            value = self.zone_state.apply(zone, effect_type, amount, self.clock.monotonic() + self.effect_decay_delay)
+            if self.telemetry is not None:
+                self.telemetry.log_effects(self.clock.time(), [self.zone_state.index[zone]], [EFFECT_INDEX[effect_type]], [value])
+    
+    def _decay_effects(self, key):
+        """Decay every zone effect past its hold period by one step; runs every decay interval"""
+        with self.zone_state.lock:
+            decayed = self.zone_state.decay(self.clock.monotonic(), self.effect_decay_step)
+            if self.telemetry is not None and decayed.any():
+                rows, columns = np.nonzero(decayed)
+                self.telemetry.log_effects(self.clock.time(), rows, columns, self.zone_state.effects[rows, columns])
+        return self.effect_decay_interval
+    
+    def submit_robot_job(self, operation, zone):
+        """Queue a robot operation on a zone; returns (job, message), with job None if rejected"""
+        if operation not in self._robot_operations:
+            return None, f"Invalid operation: {operation}"
+        if zone not in self.robot.zone_coordinates:
+            return None, f"Invalid zone: {zone}"
+        
+        handler = self._robot_operations[operation]
+        try:
+            job, robot = self.fleet.submit(operation, zone, lambda robot: handler(zone, robot))
+        except ValueError as e:
+            return None, str(e)
+        return job, f"Queued {operation} for zone {zone} on {robot.robot_id}"
+    
+    def plan_treatments(self, tasks, robot=None):
+        """Plan a route for a batch of {"zone", "operation"} tasks from where a robot's queued jobs leave it.
+        
+        Without a robot, the one the fleet would dispatch to the first task's zone is used.
+        Recharges are planned in from the battery those jobs leave it.
+        """
+        if robot is None:
+            robot = self.fleet.select_robot(tasks[0]["zone"], tasks[0]["operation"]) if tasks else self.robot
+        return plan_treatments(tasks, robot.zone_coordinates, self.fleet.planned_position(robot),
+                               energy_model=self.fleet.energy, battery_level=self.fleet.planned_battery(robot))
+    
+    def submit_treatment_plan(self, tasks):
+        """Plan a batch of treatments and queue the whole round as one robot job; returns (job, plan)"""
+        robot = self.fleet.select_robot(tasks[0]["zone"], tasks[0]["operation"]) if tasks else self.robot
+        plan = self.plan_treatments(tasks, robot)
+        # The plan charges on the way as needed, so the fleet only accounts for the net battery change
+        job, _ = self.fleet.submit("plan", None, lambda robot: self._treatment_plan_steps(plan, robot), robot=robot,
+                                   cost=max(self.fleet.planned_battery(robot) - plan.final_battery, 0.0),
+                                   end_zone=plan.visits[-1][0] if plan.visits else None)
+        return job, plan
+    
+    def _treatment_plan_steps(self, plan, robot):
+        """Visit each planned zone in order, recharging at the planned stops, and apply its operations"""
+        failures = []
+        for zone, operations in plan.visits:
+            if zone in plan.charge_stops:
+                yield from robot.charge_steps()
+            for operation in operations:
+                success, message = yield from self._robot_operations[operation](zone, robot)
+                if not success:
+                    failures.append(message)
+        if failures:
+            return False, "; ".join(failures)
+        return True, f"Completed {len(plan.visits)} zone visits"
+    
+    def get_robot_job(self, job_id):
+        """Get a queued robot job by id"""
+        return self.fleet.get_job(job_id)
     
     def toggle_day_night(self):
         """Toggle between day and night mode"""
-        self.is_day = not self.is_day
-        return self.is_day, f"Switched to {'day' if self.is_day else 'night'} mode"
+        with self._state_lock:
+            self.is_day = is_day = not self.is_day
+            if self.telemetry is not None:
+                self.telemetry.log_setting(self.clock.time(), "is_day", is_day)
+        self._refresh_snapshot()
+        return is_day, f"Switched to {'day' if is_day else 'night'} mode"
     
     def get_complete_status(self):
         """Get complete status of greenhouse system"""
@@ -254,12 +642,18 @@ class GreenhouseController:
             "sensors": self.get_all_sensor_data(),
             "actuators": self.get_all_actuator_status(),
             "robot": self.robot.get_status(),
+            "fleet": self.fleet.get_status(),
             "settings": {
                 "is_day": self.is_day,
                 "day_start": self.day_start,
                 "day_end": self.day_end
             },
-            "zone_effects": self.zone_effects
+            "zone_effects": self.zone_state.effects_as_dict(),
+            "scheduler": {
+                "pending_timers": self.effect_scheduler.pending_count(),
+                "decaying_effects": self.zone_state.active_count()
+            },
+            "climate_control": self.climate.get_status()
         }
 
 if __name__ == "__main__":
@@ -0,0 +1,23 @@
+"""
+Gunicorn settings for the Smart Greenhouse
+The controller owns the sensors, robots and their threads, so it must live in exactly one
+process: one worker serves every request from its thread pool. Status reads are served from
+the pre-encoded snapshot and robot work runs on the job queues, so handlers never hold a
+thread for long; only /api/stream clients keep one thread each. Those are capped at
+GREENHOUSE_MAX_STREAMS (default: 16 fewer than the threads), and dashboards past the cap
+get a 503 and poll /api/data instead.
+"""
+import os
+
+bind = os.environ.get("GREENHOUSE_BIND", "0.0.0.0:5000")
+workers = 1
+worker_class = "gthread"
+threads = int(os.environ.get("GREENHOUSE_THREADS", 64))
+timeout = 60
+graceful_timeout = 10
+keepalive = 5
+
+# Gunicorn's own logs go to stderr; the app logs JSON lines through its queue handler
+accesslog = None
+errorlog = "-"
+loglevel = os.environ.get("GREENHOUSE_LOG_LEVEL", "info").lower()
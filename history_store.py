@@ -0,0 +1,203 @@
+"""
+Time-series history for the Smart Greenhouse
+Every metric is kept in fixed-size, array-backed float32 ring buffers, with 1-minute and
+1-hour min/mean/max roll-ups, so memory stays bounded for any uptime. Site-wide metrics
+(one sensor for the whole greenhouse) are stored once per tick, per-zone metrics once per
+zone, and each ring only grows to its capacity as rows arrive.
+"""
+import threading
+
+import numpy as np
+
+# Numeric readings recorded each tick; SITE_METRICS are read once for the whole site
+METRICS = ("temperature", "humidity", "soil_moisture", "co2_level", "ph_level", "nutrient_level")
+SITE_METRICS = ("temperature", "humidity", "co2_level")
+
+RESOLUTIONS = ("raw", "minute", "hour")
+BUCKET_SECONDS = {"minute": 60, "hour": 3600}
+
+
+class RingTier:
+    """One retention tier: a timestamp ring plus one (capacity x columns) float32 ring per field.
+
+    Rows are allocated in doubling chunks up to capacity, so a tier that has only seen a few
+    buckets (the hour tier of a fresh start) holds only a few rows.
+    """
+
+    def __init__(self, capacity, width, fields, initial_rows=64):
+        self.capacity = capacity
+        self.width = width
+        allocated = min(capacity, initial_rows)
+        self.timestamps = np.zeros(allocated)
+        self.fields = {field: np.zeros((allocated, width), dtype=np.float32) for field in fields}
+        self.head = 0  # Next row to write
+        self.size = 0
+
+    def _grow(self):
+        """Double the allocated rows (the ring has not wrapped yet, so rows are in order)"""
+        allocated = min(self.capacity, 2 * len(self.timestamps))
+        self.timestamps = np.resize(self.timestamps, allocated)
+        for field, data in self.fields.items():
+            grown = np.zeros((allocated, self.width), dtype=np.float32)
+            grown[:self.size] = data[:self.size]
+            self.fields[field] = grown
+
+    def append(self, timestamp, **rows):
+        if self.head == len(self.timestamps) and self.size < self.capacity:
+            self._grow()
+        self.timestamps[self.head] = timestamp
+        for field, row in rows.items():
+            self.fields[field][self.head] = row
+        self.head = (self.head + 1) % self.capacity
+        self.size = min(self.size + 1, self.capacity)
+
+    def nbytes(self, full=False):
+        """Bytes allocated now, or once the ring has grown to its capacity"""
+        if full:
+            return self.capacity * (self.timestamps.itemsize + self.width * np.float32().itemsize * len(self.fields))
+        return self.timestamps.nbytes + sum(data.nbytes for data in self.fields.values())
+
+    def oldest(self):
+        """Timestamp of the oldest retained row, or None when empty"""
+        if self.size == 0:
+            return None
+        return self.timestamps[self.head if self.size == self.capacity else 0]
+
+    def _segments(self):
+        """Row ranges in chronological order; each one is sorted by timestamp"""
+        if self.size < self.capacity:
+            return [(0, self.size)]
+        return [(self.head, self.capacity), (0, self.head)]
+
+    def query(self, column, start, end):
+        """Timestamps and per-field values in [start, end], copying only the matching rows"""
+        timestamps, values = [], {field: [] for field in self.fields}
+        for first, last in self._segments():
+            segment = self.timestamps[first:last]
+            lo = first + int(np.searchsorted(segment, start, side="left"))
+            hi = first + int(np.searchsorted(segment, end, side="right"))
+            if lo >= hi:
+                continue
+            timestamps.append(self.timestamps[lo:hi])
+            for field, data in self.fields.items():
+                values[field].append(data[lo:hi, column])
+
+        def join_values(parts):
+            if not parts:
+                return []
+            # Round off float32 noise; NaN (sensor not in use) becomes null in JSON
+            joined = np.concatenate(parts).astype(np.float64).round(4)
+            return [None if value != value else value for value in joined.tolist()]
+
+        joined_timestamps = np.concatenate(timestamps).tolist() if timestamps else []
+        return joined_timestamps, {field: join_values(parts) for field, parts in values.items()}
+
+
+class _Rollup:
+    """Running min/sum/max/count for the bucket currently being filled"""
+
+    def __init__(self, shape):
+        self.shape = shape
+        self.bucket = None
+        self.reset()
+
+    def reset(self):
+        self.minimum = np.full(self.shape, np.inf)
+        self.maximum = np.full(self.shape, -np.inf)
+        self.total = np.zeros(self.shape)
+        self.count = 0
+
+    def add(self, minimum, mean, maximum, count):
+        np.minimum(self.minimum, minimum, out=self.minimum)
+        np.maximum(self.maximum, maximum, out=self.maximum)
+        self.total += mean * count
+        self.count += count
+
+
+class HistoryStore:
+    def __init__(self, zones, metrics=METRICS, site_metrics=SITE_METRICS, raw_capacity=1800, minute_capacity=1440,
+                 hour_capacity=720):
+        self.zones = list(zones)
+        self.metrics = tuple(metrics)
+        self.site_metrics = tuple(metric for metric in self.metrics if metric in site_metrics)
+        self.zone_metrics = tuple(metric for metric in self.metrics if metric not in site_metrics)
+        self.zone_index = {zone: i for i, zone in enumerate(self.zones)}
+        self.metric_index = {metric: i for i, metric in enumerate(self.metrics)}
+        # Row layout: one column per site-wide metric, then one block of zone columns per per-zone metric
+        self._site_columns = {metric: i for i, metric in enumerate(self.site_metrics)}
+        self._zone_offsets = {
+            metric: len(self.site_metrics) + i * len(self.zones) for i, metric in enumerate(self.zone_metrics)
+        }
+        width = len(self.site_metrics) + len(self.zone_metrics) * len(self.zones)
+
+        # Defaults: 1 hour of 2 s samples, 1 day of minutes, 30 days of hours
+        self.tiers = {
+            "raw": RingTier(raw_capacity, width, fields=("value",)),
+            "minute": RingTier(minute_capacity, width, fields=("min", "mean", "max")),
+            "hour": RingTier(hour_capacity, width, fields=("min", "mean", "max")),
+        }
+        self._rollups = {"minute": _Rollup(width), "hour": _Rollup(width)}
+        self._row = np.zeros(width)
+        self._lock = threading.Lock()
+
+    def _column(self, metric, zone):
+        if metric in self._site_columns:
+            return self._site_columns[metric]
+        return self._zone_offsets[metric] + self.zone_index[zone]
+
+    def record(self, timestamp, readings):
+        """Record one tick: a scalar for each site-wide metric and a per-zone array (or scalar) for the rest"""
+        with self._lock:
+            row = self._row
+            for metric, column in self._site_columns.items():
+                row[column] = readings[metric]
+            zone_count = len(self.zones)
+            for metric, offset in self._zone_offsets.items():
+                row[offset:offset + zone_count] = readings[metric]
+            self.tiers["raw"].append(timestamp, value=row)
+            self._roll_up("minute", timestamp, row, row, row, 1)
+
+    def _roll_up(self, resolution, timestamp, minimum, mean, maximum, count):
+        """Fold a sample into its bucket, flushing the previous bucket to its tier first"""
+        rollup = self._rollups[resolution]
+        bucket = int(timestamp // BUCKET_SECONDS[resolution])
+        if rollup.bucket is not None and bucket != rollup.bucket and rollup.count:
+            bucket_start = rollup.bucket * BUCKET_SECONDS[resolution]
+            bucket_mean = rollup.total / rollup.count
+            self.tiers[resolution].append(bucket_start, min=rollup.minimum, mean=bucket_mean, max=rollup.maximum)
+            if resolution == "minute":
+                self._roll_up("hour", bucket_start, rollup.minimum, bucket_mean, rollup.maximum, rollup.count)
+            rollup.reset()
+        rollup.bucket = bucket
+        rollup.add(minimum, mean, maximum, count)
+
+    def nbytes(self, full=False):
+        """Bytes allocated for the rings, roll-ups and the row buffer; with full, once every ring is full"""
+        rollups = sum(rollup.minimum.nbytes * 3 for rollup in self._rollups.values())
+        return sum(tier.nbytes(full) for tier in self.tiers.values()) + rollups + self._row.nbytes
+
+    def choose_resolution(self, start):
+        """Finest tier that still holds data from start (a tier that never wrapped holds everything)"""
+        for resolution in RESOLUTIONS[:-1]:
+            tier = self.tiers[resolution]
+            if tier.size < tier.capacity or tier.oldest() <= start:
+                return resolution
+        return RESOLUTIONS[-1]
+
+    def query(self, metric, zone, start, end, resolution=None):
+        """Range query for one metric of one zone (site-wide metrics give the same series for every zone)"""
+        if metric not in self.metric_index:
+            raise ValueError(f"Invalid metric: {metric}. Valid metrics are: {list(self.metrics)}")
+        if zone not in self.zone_index:
+            raise ValueError(f"Invalid zone: {zone}")
+        if resolution is None:
+            resolution = self.choose_resolution(start)
+        if resolution not in self.tiers:
+            raise ValueError(f"Invalid resolution: {resolution}. Valid resolutions are: {list(RESOLUTIONS)}")
+
+        with self._lock:
+            timestamps, values = self.tiers[resolution].query(self._column(metric, zone), start, end)
+
+        result = {"metric": metric, "zone": zone, "resolution": resolution, "timestamps": timestamps}
+        result.update(values)
+        return result
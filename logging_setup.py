@@ -0,0 +1,85 @@
+"""
+Logging setup for the Smart Greenhouse
+Leveled, structured (one JSON object per line) logging. Records are handed to a queue and
+written by a listener thread, so request and control threads never block on log I/O.
+"""
+import atexit
+import copy
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import sys
+from datetime import datetime, timezone
+
+# Attributes every LogRecord has; anything else was passed through extra= and is logged as a field
+_RECORD_ATTRIBUTES = set(vars(logging.makeLogRecord({}))) | {"message", "asctime", "taskName"}
+
+
+def _json_default(value):
+    """Records log as their dict form, anything else as its string"""
+    to_dict = getattr(value, "to_dict", None)
+    return to_dict() if to_dict is not None else str(value)
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record):
+        entry = {
+            "time": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRIBUTES:
+                entry[key] = value
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            entry["exception"] = record.exc_text
+        return json.dumps(entry, default=_json_default)
+
+
+class _QueueHandler(logging.handlers.QueueHandler):
+    """Resolves the message and traceback on the logging thread, leaving formatting to the listener"""
+
+    def prepare(self, record):
+        record = copy.copy(record)
+        record.message = record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+_listener = None
+
+
+def configure_logging(level=None, stream=None, structured=None):
+    """Route all logging through a non-blocking queue handler; safe to call more than once.
+
+    level defaults to GREENHOUSE_LOG_LEVEL (INFO); GREENHOUSE_LOG_FORMAT=text switches to plain lines.
+    """
+    global _listener
+    if _listener is not None:
+        return _listener
+
+    level = level or os.environ.get("GREENHOUSE_LOG_LEVEL", "INFO").upper()
+    if structured is None:
+        structured = os.environ.get("GREENHOUSE_LOG_FORMAT", "json") != "text"
+
+    output = logging.StreamHandler(stream or sys.stderr)
+    output.setFormatter(JsonFormatter() if structured else
+                        logging.Formatter("%(asctime)s %(levelname)s %(name)s: %(message)s"))
+
+    log_queue = queue.SimpleQueue()
+    root = logging.getLogger()
+    root.handlers[:] = [_QueueHandler(log_queue)]
+    root.setLevel(level)
+
+    _listener = logging.handlers.QueueListener(log_queue, output, respect_handler_level=True)
+    _listener.start()
+    atexit.register(_listener.stop)  # Drain queued records on shutdown
+    return _listener
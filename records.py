@@ -0,0 +1,273 @@
+"""
+Compact records for the Smart Greenhouse
+Sensor readings, robot operations and robot statuses are __slots__ records, and per-zone
+tables only reference the NumPy arrays they were computed in. They are converted to plain
+dicts at the JSON boundary (json_default), never while the controller works with them.
+Per-zone sections merged from shards stay as the JSON the shards encoded (EncodedZones).
+"""
+import json
+from datetime import datetime
+
+import numpy as np
+
+SENSOR_FIELDS = ("temperature", "humidity", "soil_moisture", "light_intensity", "co2_level", "ph_level",
+                 "nutrient_level")
+_SENSOR_FIELD_SET = frozenset(SENSOR_FIELDS)
+
+_MISSING = object()
+
+
+def json_default(value):
+    """json.dumps hook: records serialize through their to_dict()"""
+    to_dict = getattr(value, "to_dict", None)
+    if to_dict is None:
+        raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+    return to_dict()
+
+
+class SensorReadings:
+    """One reading per sensor in use; sensors beyond the built-in ones go to extra"""
+    __slots__ = SENSOR_FIELDS + ("extra",)
+
+    def __init__(self):
+        for name in SENSOR_FIELDS:
+            setattr(self, name, _MISSING)
+        self.extra = None
+
+    def __setitem__(self, name, value):
+        if name in _SENSOR_FIELD_SET:
+            setattr(self, name, value)
+        else:
+            if self.extra is None:
+                self.extra = {}
+            self.extra[name] = value
+
+    def get(self, name, default=None):
+        if name in _SENSOR_FIELD_SET:
+            value = getattr(self, name)
+        else:
+            value = self.extra.get(name, _MISSING) if self.extra else _MISSING
+        return default if value is _MISSING else value
+
+    def __contains__(self, name):
+        return self.get(name, _MISSING) is not _MISSING
+
+    def items(self):
+        for name in SENSOR_FIELDS:
+            value = getattr(self, name)
+            if value is not _MISSING:
+                yield name, value
+        if self.extra:
+            yield from self.extra.items()
+
+    def to_dict(self):
+        return dict(self.items())
+
+
+class RobotOperation:
+    """A completed robot operation; timestamp is Unix time"""
+    __slots__ = ("operation", "zone", "timestamp")
+
+    def __init__(self, operation, zone, timestamp):
+        self.operation = operation
+        self.zone = zone
+        self.timestamp = timestamp
+
+    def to_dict(self):
+        return {
+            "operation": self.operation,
+            "zone": self.zone,
+            "timestamp": datetime.fromtimestamp(self.timestamp).isoformat()
+        }
+
+
+class RobotStatus:
+    """Immutable published robot status; its dict form is built on first use and reused"""
+    __slots__ = ("robot_id", "current_position", "state", "zone_coordinates", "battery_level", "last_operation",
+                 "is_active", "_dict")
+
+    def __init__(self, robot_id, current_position, state, zone_coordinates, battery_level, last_operation,
+                 is_active):
+        self.robot_id = robot_id
+        self.current_position = current_position
+        self.state = state  # RobotState
+        self.zone_coordinates = zone_coordinates
+        self.battery_level = battery_level
+        self.last_operation = last_operation  # RobotOperation or None
+        self.is_active = is_active
+        self._dict = None
+
+    def to_dict(self):
+        status = self._dict
+        if status is None:
+            status = self._dict = {
+                "robot_id": self.robot_id,
+                "current_position": self.current_position,
+                "state": self.state.value,
+                "zone_coordinates": self.zone_coordinates,
+                "battery_level": round(self.battery_level, 1),
+                "last_operation": self.last_operation.to_dict() if self.last_operation else None,
+                "is_active": self.is_active
+            }
+        return status
+
+
+class ZoneTable:
+    """Per-zone sensor readings: the shared readings plus per-zone columns.
+
+    Serializes as {zone: {sensor: value}}; diff() compares columns in NumPy and only
+    builds entries for the zones that changed. Shared readings are compared separately
+    (shared_diff()), so a site-wide change is sent once rather than once per zone.
+    """
+    __slots__ = ("zones", "base", "columns")
+
+    def __init__(self, zones, base, columns):
+        self.zones = zones  # Zone names, in row order
+        self.base = base  # SensorReadings shared by every zone
+        self.columns = tuple(columns)  # ((sensor, ndarray with one value per zone), ...)
+
+    def row(self, zone_index):
+        readings = self.base.to_dict()
+        for name, values in self.columns:
+            readings[name] = float(values[zone_index])
+        return readings
+
+    def to_dict(self):
+        base = self.base.to_dict()
+        columns = [(name, values.tolist()) for name, values in self.columns]
+        table = {}
+        for i, zone in enumerate(self.zones):
+            readings = dict(base)
+            for name, values in columns:
+                readings[name] = values[i]
+            table[zone] = readings
+        return table
+
+    def _comparable(self, old):
+        return isinstance(old, ZoneTable) and old.zones == self.zones and \
+            [name for name, _ in old.columns] == [name for name, _ in self.columns]
+
+    def diff(self, old):
+        """{zone: {sensor: new value}} for each per-zone reading that changed (everything if the layout did)"""
+        if not self._comparable(old):
+            return self.to_dict()
+        changed = [
+            (name, new, new != previous)
+            for (name, new), (_, previous) in zip(self.columns, old.columns)
+            if new is not previous
+        ]
+        changed = [(name, new, mask) for name, new, mask in changed if mask.any()]
+        if not changed:
+            return {}
+        delta = {}
+        for i in np.flatnonzero(np.logical_or.reduce([mask for _, _, mask in changed])).tolist():
+            delta[self.zones[i]] = {name: float(values[i]) for name, values, mask in changed if mask[i]}
+        return delta
+
+    def shared_diff(self, old):
+        """{sensor: new value} for the shared readings that differ from old; they apply to every zone.
+
+        Readings with a per-zone column are left to diff(), so they never overwrite the zone values.
+        """
+        if not self._comparable(old):
+            return {}  # diff() sends the whole table, shared readings included
+        columns = {name for name, _ in self.columns}
+        shared = {
+            name: value for name, value in self.base.items()
+            if name not in columns and old.base.get(name, _MISSING) != value
+        }
+        for name, _ in old.base.items():
+            if name not in self.base and name not in columns:
+                shared[name] = None
+        return shared
+
+
+class EffectsTable:
+    """Zone effects as a reference to the engine's (copy-on-write) array; serializes as {zone: {effect: value}}"""
+    __slots__ = ("zones", "effect_types", "values")
+
+    def __init__(self, zones, effect_types, values):
+        self.zones = zones
+        self.effect_types = effect_types
+        self.values = values  # (zones, effect types) array, never modified in place
+
+    def to_dict(self):
+        return {zone: dict(zip(self.effect_types, row)) for zone, row in zip(self.zones, self.values.tolist())}
+
+    def diff(self, old):
+        """{zone: {effect: new value}} for every effect that differs from old"""
+        if not isinstance(old, EffectsTable) or old.zones != self.zones or old.values.shape != self.values.shape:
+            return self.to_dict()
+        if old.values is self.values:
+            return {}
+        changed = old.values != self.values
+        delta = {}
+        for row in np.flatnonzero(changed.any(axis=1)).tolist():
+            delta[self.zones[row]] = {
+                self.effect_types[column]: float(self.values[row, column])
+                for column in np.flatnonzero(changed[row]).tolist()
+            }
+        return delta
+
+
+class EncodedZones:
+    """A per-zone section assembled from JSON fragments encoded elsewhere, one per shard.
+
+    Each fragment is the inside of a {zone: {...}} object. encoded() splices them without
+    decoding; only to_dict() and diff() (SSE clients) decode, each fragment at most once.
+    shared holds the readings every zone carries, so diff() leaves them to shared_diff().
+    """
+    __slots__ = ("fragments", "shared", "_decoded")
+
+    def __init__(self, fragments, shared=None):
+        self.fragments = tuple(fragments)  # bytes; an unchanged shard passes the same object again
+        self.shared = shared  # {sensor: value} shared by every zone, or None
+        self._decoded = [None] * len(self.fragments)
+
+    def encoded(self):
+        return b"{" + b",".join(fragment for fragment in self.fragments if fragment) + b"}"
+
+    def _part(self, i):
+        part = self._decoded[i]
+        if part is None:
+            part = self._decoded[i] = json.loads(b"{" + self.fragments[i] + b"}")
+        return part
+
+    def to_dict(self):
+        zones = {}
+        for i in range(len(self.fragments)):
+            zones.update(self._part(i))
+        return zones
+
+    def _comparable(self, old):
+        return isinstance(old, EncodedZones) and len(old.fragments) == len(self.fragments)
+
+    def diff(self, old):
+        """{zone: {key: new value}} for the zones of changed fragments, shared readings left out"""
+        if not self._comparable(old):
+            return self.to_dict()
+        shared = self.shared or {}
+        delta = {}
+        for i, (fragment, previous) in enumerate(zip(self.fragments, old.fragments)):
+            if fragment is previous or fragment == previous:
+                continue
+            before = old._part(i)
+            for zone, values in self._part(i).items():
+                old_values = before.get(zone)
+                if old_values is None:
+                    delta[zone] = values
+                    continue
+                changed = {key: value for key, value in values.items()
+                           if key not in shared and old_values.get(key, _MISSING) != value}
+                if changed:
+                    delta[zone] = changed
+        return delta
+
+    def shared_diff(self, old):
+        """{sensor: new value} for the shared readings that differ from old"""
+        if self.shared is None or not self._comparable(old) or old.shared is None:
+            return {}
+        shared = {name: value for name, value in self.shared.items() if old.shared.get(name, _MISSING) != value}
+        for name in old.shared.keys() - self.shared.keys():
+            shared[name] = None
+        return shared
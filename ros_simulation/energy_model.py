@@ -0,0 +1,59 @@
+"""
+Energy Model for the RX200 Robot
+Battery use (percentage points) as a function of distance travelled, the treatments
+performed and time spent idle, plus charging time. Robots settle their battery from it
+when an operation starts or finishes, so no thread has to poll the battery.
+"""
+
+
+class EnergyModel:
+    def __init__(self, per_distance=0.02, operation_costs=None, idle_rate=0.001, charge_rate=0.5,
+                 capacity=100.0, reserve=10.0):
+        self.per_distance = per_distance  # Per coordinate unit travelled
+        # Per treatment, excluding travel: pumping water, augering manure, dosing fertilizer
+        self.operation_costs = dict(operation_costs) if operation_costs else {
+            "water": 0.5,
+            "manure": 1.0,
+            "fertilizer": 0.5
+        }
+        self.idle_rate = idle_rate  # Per second spent idle (electronics on standby)
+        self.charge_rate = charge_rate  # Per second on the charger
+        self.capacity = capacity
+        self.reserve = reserve  # Never plan work that would leave less than this
+
+    def move_cost(self, distance):
+        return distance * self.per_distance
+
+    def operation_cost(self, operation):
+        """Cost of a treatment at the robot's position; operations without a cost (move) are free"""
+        return self.operation_costs.get(operation, 0.0)
+
+    def idle_cost(self, seconds):
+        return max(seconds, 0.0) * self.idle_rate
+
+    def job_cost(self, distance, operations=()):
+        """Cost of travelling distance and then performing operations"""
+        return self.move_cost(distance) + sum(self.operation_cost(operation) for operation in operations)
+
+    def charge_time(self, level):
+        """Seconds to charge from level to full"""
+        return max(self.capacity - level, 0.0) / self.charge_rate
+
+    def idle_time_until(self, level, threshold):
+        """Seconds an idle robot takes to drain from level to threshold"""
+        if self.idle_rate <= 0:
+            return None
+        return max(level - threshold, 0.0) / self.idle_rate
+
+    def to_dict(self):
+        return {
+            "per_distance": self.per_distance,
+            "operation_costs": dict(self.operation_costs),
+            "idle_rate": self.idle_rate,
+            "charge_rate": self.charge_rate,
+            "capacity": self.capacity,
+            "reserve": self.reserve
+        }
+
+
+DEFAULT_ENERGY_MODEL = EnergyModel()
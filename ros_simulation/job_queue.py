@@ -0,0 +1,189 @@
+"""
+Robot Job Queue for the Smart Greenhouse
+Robot operations are queued and run one at a time on a dedicated executor thread,
+so API requests return immediately and never race on the robot's state. Without the
+thread, a job that is a step generator is driven by a TimerScheduler instead: each delay
+it yields becomes a timer, so the jobs of several robots overlap in virtual time.
+"""
+import inspect
+import queue
+import threading
+import uuid
+from collections import OrderedDict, deque
+from datetime import datetime
+from enum import Enum
+
+from metrics import Counter, Histogram
+from sim_clock import SYSTEM_CLOCK, run_steps
+
+JOBS = Counter("greenhouse_robot_jobs_total", "Robot jobs finished", ("operation", "status"))
+JOB_DURATION = Histogram("greenhouse_robot_job_duration_seconds", "Time robot jobs spent running", ("operation",))
+JOB_WAIT = Histogram("greenhouse_robot_job_wait_seconds", "Time robot jobs spent queued", ("operation",))
+
+class JobStatus(Enum):
+    QUEUED = "queued"
+    RUNNING = "running"
+    SUCCEEDED = "succeeded"
+    FAILED = "failed"
+
+class RobotJob:
+    def __init__(self, operation, zone, action, submitted_at=None):
+        self.job_id = uuid.uuid4().hex
+        self.operation = operation
+        self.zone = zone
+        self.action = action  # Callable returning (success, message), or a step generator that returns it
+        self.status = JobStatus.QUEUED
+        self.message = None
+        self.submitted_at = submitted_at or datetime.now().isoformat()
+        self.started_at = None
+        self.finished_at = None
+        self.queued_at = None  # Clock reading when queued, for the wait-time metric
+
+    def is_finished(self):
+        return self.status in (JobStatus.SUCCEEDED, JobStatus.FAILED)
+
+    def to_dict(self):
+        return {
+            "job_id": self.job_id,
+            "operation": self.operation,
+            "zone": self.zone,
+            "status": self.status.value,
+            "message": self.message,
+            "submitted_at": self.submitted_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at
+        }
+
+class RobotJobQueue:
+    def __init__(self, name="robot", max_history=1000, clock=SYSTEM_CLOCK, start_thread=True, scheduler=None):
+        self.name = name
+        self.max_history = max_history  # Finished jobs kept for status queries
+        self.clock = clock
+        self.scheduler = scheduler  # Resumes step jobs when there is no executor thread
+        self._running = None  # (job, steps, started) of the step job the scheduler is driving
+        self._queue = queue.Queue()
+        self._jobs = OrderedDict()
+        self._finished = deque()  # Ids of finished jobs, oldest first; the only ones trimming may drop
+        self._lock = threading.Lock()
+
+        # Start the executor thread; without it, queued jobs run when run_pending() is called
+        self.executor_thread = None
+        if start_thread:
+            self.executor_thread = threading.Thread(target=self._run_jobs, name=f"{name}-jobs", daemon=True)
+            self.executor_thread.start()
+
+    def _now(self):
+        return datetime.fromtimestamp(self.clock.time()).isoformat()
+
+    def submit(self, operation, zone, action):
+        """Queue an operation and return its job without waiting for it"""
+        job = RobotJob(operation, zone, action, self._now())
+        job.queued_at = self.clock.monotonic()
+        with self._lock:
+            self._jobs[job.job_id] = job
+            self._trim_history()
+        self._queue.put(job)
+        return job
+
+    def get_job(self, job_id):
+        """Get a job by id, or None if unknown or expired"""
+        return self._jobs.get(job_id)
+
+    def pending_count(self):
+        """Number of jobs waiting to run"""
+        return self._queue.qsize()
+
+    def _trim_history(self):
+        """Forget the oldest finished jobs beyond max_history"""
+        while len(self._jobs) > self.max_history and self._finished:
+            del self._jobs[self._finished.popleft()]
+
+    def run_pending(self):
+        """Start queued jobs on the calling thread (when there is no executor thread); returns the count started.
+
+        Without a scheduler every job runs to completion here, sleeping through its steps. With one,
+        a step job runs up to its first delay and the scheduler resumes it; the next job starts
+        when it finishes.
+        """
+        count = 0
+        while self._running is None:
+            try:
+                job = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            count += 1
+            if self.scheduler is None:
+                self._run_job(job)
+            else:
+                self._start_job(job)
+        return count
+
+    def _run_jobs(self):
+        """Executor thread: runs queued jobs one at a time"""
+        while True:
+            self._run_job(self._queue.get())
+
+    def _begin_job(self, job):
+        started = self.clock.monotonic()
+        JOB_WAIT.labels(job.operation).observe(started - job.queued_at)
+        job.status = JobStatus.RUNNING
+        job.started_at = self._now()
+        return started
+
+    def _run_job(self, job):
+        started = self._begin_job(job)
+        try:
+            result = job.action()
+            if inspect.isgenerator(result):
+                result = run_steps(result, self.clock)
+            self._finish_job(job, started, result)
+        except Exception as e:
+            self._finish_job(job, started, error=e)
+
+    def _start_job(self, job):
+        """Start a job the scheduler drives"""
+        started = self._begin_job(job)
+        try:
+            result = job.action()
+        except Exception as e:
+            self._finish_job(job, started, error=e)
+            return
+        if inspect.isgenerator(result):
+            self._running = (job, result, started)
+            self._advance()
+        else:
+            self._finish_job(job, started, result)
+
+    def _advance(self):
+        """Run the current step job up to its next delay and arm a timer for it, or finish it"""
+        job, steps, started = self._running
+        try:
+            delay = next(steps)
+        except StopIteration as stop:
+            self._running = None
+            self._finish_job(job, started, stop.value)
+        except Exception as e:
+            self._running = None
+            self._finish_job(job, started, error=e)
+        else:
+            self.scheduler.schedule(("robot_job", self.name), delay, self._resume)
+
+    def _resume(self, key):
+        """Timer: the current step job's delay is over; once it finishes, the next queued job starts"""
+        self._advance()
+        self.run_pending()
+
+    def _finish_job(self, job, started, result=None, error=None):
+        if error is None:
+            success, job.message = result
+            job.status = JobStatus.SUCCEEDED if success else JobStatus.FAILED
+        else:
+            job.message = str(error)
+            job.status = JobStatus.FAILED
+        job.finished_at = self._now()
+        job.action = None
+        with self._lock:
+            self._finished.append(job.job_id)
+            self._trim_history()
+        JOB_DURATION.labels(job.operation).observe(self.clock.monotonic() - started)
+        JOBS.labels(job.operation, job.status.value).inc()
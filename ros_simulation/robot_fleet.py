@@ -0,0 +1,204 @@
+"""
+Robot Fleet for the Smart Greenhouse
+Holds several RX200 robots, each with its own job queue, and dispatches every job
+to the nearest idle robot whose battery can finish it. Jobs the battery cannot finish
+are deferred behind a recharge, and idle robots are recharged before they run low.
+Without threads, the scheduler drives every robot's jobs, so robots work side by side
+in virtual time.
+"""
+import inspect
+import threading
+
+from ros_simulation.energy_model import DEFAULT_ENERGY_MODEL
+from ros_simulation.job_queue import RobotJobQueue
+from ros_simulation.rx200_robot import RX200Robot
+from sim_clock import SYSTEM_CLOCK
+
+def _charge(robot):
+    """Job action: charge the robot to full"""
+    yield from robot.charge_steps()
+    return True, f"Charged {robot.robot_id}"
+
+class RobotFleet:
+    def __init__(self, robot_count=1, zone_coordinates=None, clock=SYSTEM_CLOCK, time_scale=0.1,
+                 start_threads=True, energy_model=DEFAULT_ENERGY_MODEL, charge_threshold=40.0, scheduler=None,
+                 robot_id_start=1):
+        if robot_count < 1:
+            raise ValueError("A fleet needs at least one robot")
+        self.energy = energy_model
+        self.charge_threshold = charge_threshold  # Idle robots below this level are recharged
+        self.scheduler = scheduler  # TimerScheduler that wakes idle robots when they reach the threshold
+        self.robots = [
+            RX200Robot(robot_id=f"rx200_{robot_id_start + i:03d}", zone_coordinates=zone_coordinates, clock=clock,
+                       time_scale=time_scale, energy_model=energy_model)
+            for i in range(robot_count)
+        ]
+        self.job_queues = {
+            robot.robot_id: RobotJobQueue(robot.robot_id, clock=clock, start_thread=start_threads,
+                                          scheduler=None if start_threads else scheduler)
+            for robot in self.robots
+        }
+        self._robots = {robot.robot_id: robot for robot in self.robots}
+        self._outstanding = {robot.robot_id: 0 for robot in self.robots}  # Queued or running jobs
+        # Expected battery and position once the outstanding jobs are done
+        self._planned_battery = {}
+        self._planned_position = {}
+        self._lock = threading.Lock()
+        self.schedule_charges()
+
+    @property
+    def zone_coordinates(self):
+        return self.robots[0].zone_coordinates
+
+    def select_robot(self, zone, operation=None):
+        """Pick the least busy robot that can do the job without recharging, nearest first"""
+        with self._lock:
+            return self._select_robot_locked(zone, operation)[0]
+
+    def planned_battery(self, robot):
+        """Battery the robot is expected to have once its outstanding jobs are done"""
+        with self._lock:
+            return self._planned_battery_locked(robot)
+
+    def planned_position(self, robot):
+        """Zone the robot is expected to be in once its outstanding jobs are done"""
+        with self._lock:
+            return self._planned_position_locked(robot)
+
+    def _planned_battery_locked(self, robot):
+        if self._outstanding[robot.robot_id] == 0:
+            return robot.estimated_battery()
+        return self._planned_battery[robot.robot_id]
+
+    def _planned_position_locked(self, robot):
+        if self._outstanding[robot.robot_id] == 0:
+            return robot.current_position
+        return self._planned_position[robot.robot_id]
+
+    def _job_cost_locked(self, robot, zone, operation):
+        """Energy a job takes when it starts where the robot's outstanding jobs leave it"""
+        return self.energy.job_cost(robot.distance_between(self._planned_position_locked(robot), zone), (operation,))
+
+    def _select_robot_locked(self, zone, operation):
+        """(robot, cost) for the best robot; robots that would need a recharge come last"""
+        active = [robot for robot in self.robots if robot.is_active] or self.robots
+        options = []
+        for robot in active:
+            cost = self._job_cost_locked(robot, zone, operation)
+            needs_charge = self._planned_battery_locked(robot) - cost < self.energy.reserve
+            distance = robot.distance_between(self._planned_position_locked(robot), zone)
+            options.append(((needs_charge, self._outstanding[robot.robot_id], distance), robot, cost))
+        _, robot, cost = min(options, key=lambda option: option[0])
+        return robot, cost
+
+    def submit(self, operation, zone, action, robot=None, cost=None, end_zone=None):
+        """Queue action(robot) on the given robot, or on the best robot for the zone.
+
+        action returns (success, message), or is a step generator (see sim_clock.run_steps)
+        that returns it, so the robot's work can advance with virtual time. cost is the battery
+        the job takes (estimated from the energy model when None) and end_zone where it leaves
+        the robot (default zone). A job the robot's battery cannot finish is queued behind a
+        recharge; one no charge could finish raises ValueError. Returns (job, robot).
+        """
+        with self._lock:
+            if robot is None:
+                robot, estimate = self._select_robot_locked(zone, operation)
+            elif zone is not None:
+                estimate = self._job_cost_locked(robot, zone, operation)
+            else:
+                estimate = 0.0
+            cost = estimate if cost is None else cost
+            if cost > self.energy.capacity - self.energy.reserve:
+                raise ValueError(f"{operation} needs {cost:.1f}% battery, more than a full charge allows")
+            if self._planned_battery_locked(robot) - cost < self.energy.reserve:
+                self._queue_charge(robot)
+            self._planned_battery[robot.robot_id] = self._planned_battery_locked(robot) - cost
+            self._planned_position[robot.robot_id] = end_zone or zone or self._planned_position_locked(robot)
+            self._outstanding[robot.robot_id] += 1
+            return self._submit_locked(operation, zone, action, robot), robot
+
+    def _submit_locked(self, operation, zone, action, robot):
+        def run():
+            try:
+                result = action(robot)
+                if inspect.isgenerator(result):
+                    result = yield from result
+                return result
+            finally:
+                with self._lock:
+                    self._outstanding[robot.robot_id] -= 1
+                    if self._outstanding[robot.robot_id] == 0:
+                        self._schedule_charge(robot)
+
+        return self.job_queues[robot.robot_id].submit(operation, zone, run)
+
+    def schedule_charges(self):
+        """Plan the next recharge of every idle robot, e.g. after battery levels were restored"""
+        with self._lock:
+            for robot in self.robots:
+                if self._outstanding[robot.robot_id] == 0:
+                    self._schedule_charge(robot)
+
+    def _queue_charge(self, robot):
+        """Queue a full recharge behind the robot's outstanding jobs; called with the lock held"""
+        self._planned_battery[robot.robot_id] = self.energy.capacity
+        self._planned_position[robot.robot_id] = self._planned_position_locked(robot)
+        self._outstanding[robot.robot_id] += 1
+        self._submit_locked("charge", None, _charge, robot)
+
+    def _schedule_charge(self, robot):
+        """Plan the next recharge of an idle robot; called with the lock held.
+
+        Below the threshold it charges now, in this idle gap. Otherwise a timer wakes it when
+        idle drain would take it there; any job finishing in between re-plans the charge.
+        """
+        level = robot.estimated_battery()
+        if level < self.charge_threshold:
+            self._queue_charge(robot)
+        elif self.scheduler is not None:
+            delay = self.energy.idle_time_until(level, self.charge_threshold)
+            if delay is not None:
+                self.scheduler.schedule(("charge", robot.robot_id), delay, self._charge_timer)
+
+    def _charge_timer(self, key):
+        """An idle robot has drained to the threshold; a job finishing since would have re-armed this"""
+        robot = self._robots[key[1]]
+        with self._lock:
+            if self._outstanding[robot.robot_id] == 0:
+                self._queue_charge(robot)
+
+    def get_job(self, job_id):
+        """Find a job on any robot's queue"""
+        for job_queue in self.job_queues.values():
+            job = job_queue.get_job(job_id)
+            if job is not None:
+                return job
+        return None
+
+    def run_pending(self):
+        """Run every queued job on the calling thread, robot by robot; returns the count"""
+        return sum(job_queue.run_pending() for job_queue in self.job_queues.values())
+
+    def pending_count(self):
+        """Jobs waiting to run across the fleet"""
+        return sum(job_queue.pending_count() for job_queue in self.job_queues.values())
+
+    def get_status(self):
+        """Compact status of every robot in the fleet"""
+        statuses = [robot.get_status_record() for robot in self.robots]
+        return {
+            "robot_count": len(self.robots),
+            "robots": [
+                {
+                    "robot_id": status.robot_id,
+                    "current_position": status.current_position,
+                    "state": status.state.value,
+                    "battery_level": round(status.battery_level, 1),
+                    "planned_battery": round(self._planned_battery.get(status.robot_id, status.battery_level)
+                                             if self._outstanding[status.robot_id] else status.battery_level, 1),
+                    "is_active": status.is_active,
+                    "outstanding_jobs": self._outstanding[status.robot_id]
+                }
+                for status in statuses
+            ]
+        }
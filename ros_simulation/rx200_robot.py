@@ -1,40 +1,69 @@
 """
 RX200 Robot Simulation Module for Smart Greenhouse
-This module simulates the ROS interface for the RX200 robot
+This module simulates the ROS interface for the RX200 robot.
+State changes are made under the robot's lock and published as an immutable status
+snapshot, so status readers never block on (or see half of) an operation. Battery use
+comes from the energy model and is settled when operations start and finish. Every
+operation is also available as a step generator (move_steps(), water_steps(), ...) that
+yields the simulated seconds it takes instead of sleeping through them.
 """
-import time
+import math
 import threading
-from datetime import datetime
 from enum import Enum
 
+from metrics import Counter
+from records import RobotOperation, RobotStatus
+from ros_simulation.energy_model import DEFAULT_ENERGY_MODEL
+from sim_clock import SYSTEM_CLOCK, run_steps
+
+OPERATIONS = Counter("greenhouse_robot_operations_total", "Completed robot operations", ("robot_id", "operation"))
+
 class RobotState(Enum):
     IDLE = "idle"
     MOVING = "moving"
     WATERING = "watering"
     APPLYING_MANURE = "applying_manure"
     APPLYING_FERTILIZER = "applying_fertilizer"
+    CHARGING = "charging"
 
 class RX200Robot:
-    def __init__(self, robot_id="rx200_001"):
+    # Simulated travel speed (coordinate units per second) and operation durations (seconds)
+    MOVE_SPEED = 10.0
+    OPERATION_TIMES = {
+        "water": 3,
+        "manure": 4,
+        "fertilizer": 3
+    }
+    
+    def __init__(self, robot_id="rx200_001", zone_coordinates=None, clock=SYSTEM_CLOCK, time_scale=0.1,
+                 energy_model=DEFAULT_ENERGY_MODEL):
         self.robot_id = robot_id
-        self.current_position = "A"  # Default position
+        self.clock = clock
+        self.time_scale = time_scale  # Fraction of each operation's duration actually waited
+        self.energy = energy_model
         self.state = RobotState.IDLE
-        self.zone_coordinates = {
+        self.zone_coordinates = dict(zone_coordinates) if zone_coordinates else {
             "A": (10, 10),
             "B": (10, 30),
             "C": (30, 10),
             "D": (30, 30)
         }
-        self.battery_level = 100.0  # Percentage
-        self.last_operation = None
+        self.current_position = next(iter(self.zone_coordinates))  # Default position
+        self.battery_level = energy_model.capacity  # Percentage, as of the last settlement
+        self.battery_consumed = 0.0  # Percentage points drained since start, across charges
+        self._idle_since = clock.monotonic()  # Idle drain since then is not yet in battery_level
+        self.last_operation = None  # RobotOperation
         self.is_active = True
-        
-        # Start background thread for battery drain simulation
-        self.battery_thread = threading.Thread(target=self._simulate_battery_drain, daemon=True)
-        self.battery_thread.start()
+        self._lock = threading.Lock()
+        self._status = None
+        self._publish_status()
         
     def move_to_zone(self, zone):
         """Move robot to specified zone"""
+        return run_steps(self.move_steps(zone), self.clock)
+    
+    def move_steps(self, zone):
+        """Steps of move_to_zone(): yields the seconds the move takes, returns whether it succeeded"""
         if zone not in self.zone_coordinates:
             raise ValueError(f"Invalid zone: {zone}. Valid zones are: {list(self.zone_coordinates.keys())}")
             
@@ -42,22 +71,27 @@ class RX200Robot:
             return False
             
         # Simulate movement time
-        self.state = RobotState.MOVING
-        movement_time = 2  # seconds
-        time.sleep(movement_time * 0.1)  # Simulated time
+        distance = self.distance_between(self.current_position, zone)
+        cost = self.energy.move_cost(distance)
+        if not self._begin(RobotState.MOVING, cost):
+            return False
+        movement_time = distance / self.MOVE_SPEED  # seconds
+        yield movement_time * self.time_scale  # Simulated time
         
-        self.current_position = zone
-        self.state = RobotState.IDLE
-        self.last_operation = {
-            "operation": "move",
-            "zone": zone,
-            "timestamp": datetime.now().isoformat()
-        }
+        self._complete("move", zone, cost, current_position=zone)
         
         return True
     
+    def distance_between(self, from_zone, to_zone):
+        """Straight-line distance between two zones"""
+        return math.dist(self.zone_coordinates[from_zone], self.zone_coordinates[to_zone])
+    
     def water_zone(self, zone):
         """Water the specified zone"""
+        return run_steps(self.water_steps(zone), self.clock)
+    
+    def water_steps(self, zone):
+        """Steps of water_zone()"""
         if zone not in self.zone_coordinates:
             raise ValueError(f"Invalid zone: {zone}")
             
@@ -65,25 +99,26 @@ class RX200Robot:
             return False
             
         # Move to zone if not already there
-        if self.current_position != zone:
-            self.move_to_zone(zone)
+        if self.current_position != zone and not (yield from self.move_steps(zone)):
+            return False
             
         # Perform watering
-        self.state = RobotState.WATERING
-        watering_time = 3  # seconds
-        time.sleep(watering_time * 0.1)  # Simulated time
+        cost = self.energy.operation_cost("water")
+        if not self._begin(RobotState.WATERING, cost):
+            return False
+        watering_time = self.OPERATION_TIMES["water"]  # seconds
+        yield watering_time * self.time_scale  # Simulated time
         
-        self.state = RobotState.IDLE
-        self.last_operation = {
-            "operation": "watering",
-            "zone": zone,
-            "timestamp": datetime.now().isoformat()
-        }
+        self._complete("watering", zone, cost)
         
         return True
     
     def apply_manure(self, zone):
         """Apply manure to the specified zone"""
+        return run_steps(self.manure_steps(zone), self.clock)
+    
+    def manure_steps(self, zone):
+        """Steps of apply_manure()"""
         if zone not in self.zone_coordinates:
             raise ValueError(f"Invalid zone: {zone}")
             
@@ -91,25 +126,26 @@ class RX200Robot:
             return False
             
         # Move to zone if not already there
-        if self.current_position != zone:
-            self.move_to_zone(zone)
+        if self.current_position != zone and not (yield from self.move_steps(zone)):
+            return False
             
         # Apply manure
-        self.state = RobotState.APPLYING_MANURE
-        manure_time = 4  # seconds
-        time.sleep(manure_time * 0.1)  # Simulated time
+        cost = self.energy.operation_cost("manure")
+        if not self._begin(RobotState.APPLYING_MANURE, cost):
+            return False
+        manure_time = self.OPERATION_TIMES["manure"]  # seconds
+        yield manure_time * self.time_scale  # Simulated time
         
-        self.state = RobotState.IDLE
-        self.last_operation = {
-            "operation": "manure",
-            "zone": zone,
-            "timestamp": datetime.now().isoformat()
-        }
+        self._complete("manure", zone, cost)
         
         return True
     
     def apply_fertilizer(self, zone):
         """Apply fertilizer to the specified zone"""
+        return run_steps(self.fertilizer_steps(zone), self.clock)
+    
+    def fertilizer_steps(self, zone):
+        """Steps of apply_fertilizer()"""
         if zone not in self.zone_coordinates:
             raise ValueError(f"Invalid zone: {zone}")
             
@@ -117,60 +153,137 @@ class RX200Robot:
             return False
             
         # Move to zone if not already there
-        if self.current_position != zone:
-            self.move_to_zone(zone)
+        if self.current_position != zone and not (yield from self.move_steps(zone)):
+            return False
             
         # Apply fertilizer
-        self.state = RobotState.APPLYING_FERTILIZER
-        fertilizer_time = 3  # seconds
-        time.sleep(fertilizer_time * 0.1)  # Simulated time
+        cost = self.energy.operation_cost("fertilizer")
+        if not self._begin(RobotState.APPLYING_FERTILIZER, cost):
+            return False
+        fertilizer_time = self.OPERATION_TIMES["fertilizer"]  # seconds
+        yield fertilizer_time * self.time_scale  # Simulated time
         
-        self.state = RobotState.IDLE
-        self.last_operation = {
-            "operation": "fertilizer",
-            "zone": zone,
-            "timestamp": datetime.now().isoformat()
-        }
+        self._complete("fertilizer", zone, cost)
         
         return True
     
-    def _simulate_battery_drain(self):
-        """Background thread to simulate battery drain"""
-        while self.is_active:
-            time.sleep(10)  # Check every 10 seconds
-            if self.state != RobotState.IDLE:
-                self.battery_level -= 0.1  # Drain during operation
-            else:
-                self.battery_level -= 0.05  # Slow drain when idle
-            self.battery_level = max(0, self.battery_level)
+    def drain_battery(self, amount):
+        """Drain the battery by amount percentage points (never below zero)"""
+        with self._lock:
+            self._drain(amount)
+            self._publish_status()
+    
+    def _drain(self, amount):
+        """Called with the lock held"""
+        drained = min(self.battery_level, amount)
+        self.battery_level -= drained
+        self.battery_consumed += drained
+    
+    def _settle_idle(self):
+        """Charge idle time since the last settlement to the battery; called with the lock held"""
+        if self._idle_since is not None:
+            now = self.clock.monotonic()
+            self._drain(self.energy.idle_cost(now - self._idle_since))
+            self._idle_since = now
+    
+    def settle_battery(self):
+        """Bring the published battery level up to date with the idle drain so far"""
+        with self._lock:
+            self._settle_idle()
+            self._publish_status()
+    
+    def estimated_battery(self):
+        """Battery level now, including idle drain not yet settled"""
+        idle_since = self._idle_since
+        if idle_since is None:
+            return self.battery_level
+        return max(self.battery_level - self.energy.idle_cost(self.clock.monotonic() - idle_since), 0.0)
+    
+    def can_afford(self, cost):
+        """Whether the battery covers cost and still keeps the energy model's reserve"""
+        return self.estimated_battery() - cost >= self.energy.reserve
     
     def charge_battery(self):
-        """Charge the robot battery"""
-        charging_time = 5  # seconds
-        time.sleep(charging_time * 0.1)  # Simulated time
-        self.battery_level = 100.0
+        """Charge the robot battery to full; charging takes longer the emptier it is"""
+        return run_steps(self.charge_steps(), self.clock)
+    
+    def charge_steps(self):
+        """Steps of charge_battery()"""
+        with self._lock:
+            self._settle_idle()
+            self._idle_since = None
+            self.state = RobotState.CHARGING
+            self._publish_status()
+            charging_time = self.energy.charge_time(self.battery_level)  # seconds
+        yield charging_time * self.time_scale  # Simulated time
+        self._update(battery_level=self.energy.capacity, state=RobotState.IDLE, _idle_since=self.clock.monotonic())
+        OPERATIONS.labels(self.robot_id, "charge").inc()
+        return True
+    
+    def restore_state(self, battery_level=None, current_position=None, last_operation=None):
+        """Restore persisted state (last_operation is a RobotOperation), e.g. after a restart; unknown positions are ignored"""
+        changes = {}
+        if battery_level is not None:
+            changes["battery_level"] = battery_level
+        if current_position in self.zone_coordinates:
+            changes["current_position"] = current_position
+        if last_operation is not None:
+            changes["last_operation"] = last_operation
+        self._update(**changes)
+    
+    def _update(self, **changes):
+        """Apply state changes atomically and publish a new status"""
+        with self._lock:
+            for name, value in changes.items():
+                setattr(self, name, value)
+            self._publish_status()
+    
+    def _begin(self, state, cost):
+        """Start an operation costing cost, unless the battery cannot cover it"""
+        with self._lock:
+            self._settle_idle()
+            if self.battery_level < cost:
+                return False
+            self._idle_since = None
+            self.state = state
+            self._publish_status()
         return True
     
+    def _complete(self, operation, zone, cost, **changes):
+        """Record a finished operation: its energy is drawn and the robot is idle again"""
+        with self._lock:
+            self._drain(cost)
+            self._idle_since = self.clock.monotonic()
+            self.state = RobotState.IDLE
+            self.last_operation = RobotOperation(operation, zone, self.clock.time())
+            for name, value in changes.items():
+                setattr(self, name, value)
+            self._publish_status()
+        OPERATIONS.labels(self.robot_id, operation).inc()
+    
+    def _publish_status(self):
+        """Replace the published status; called with the lock held (or before any thread starts)"""
+        self._status = RobotStatus(self.robot_id, self.current_position, self.state, self.zone_coordinates,
+                                   self.battery_level, self.last_operation, self.is_active)
+    
+    def get_status_record(self):
+        """Latest published status as a RobotStatus record"""
+        return self._status
+    
     def get_status(self):
-        """Get robot status"""
-        return {
-            "robot_id": self.robot_id,
-            "current_position": self.current_position,
-            "state": self.state.value,
-            "zone_coordinates": self.zone_coordinates,
-            "battery_level": round(self.battery_level, 1),
-            "last_operation": self.last_operation,
-            "is_active": self.is_active
-        }
+        """Get robot status as a dict, built once per published status.
+        
+        The status is replaced, never modified, so callers must treat it as read-only.
+        """
+        return self._status.to_dict()
     
     def activate(self):
         """Activate the robot"""
-        self.is_active = True
+        self._update(is_active=True)
         
     def deactivate(self):
         """Deactivate the robot"""
-        self.is_active = False
-        self.state = RobotState.IDLE
+        self._update(is_active=False, state=RobotState.IDLE)
 
 if __name__ == "__main__":
     # Test the RX200 robot
@@ -0,0 +1,150 @@
+"""
+Treatment Route Planner for the RX200 Robot
+Merges a batch of (zone, operation) tasks into one visit per zone and orders the
+visits to minimize travel, using nearest-neighbour construction plus 2-opt. Given the
+robot's battery, the energy model decides where along the route it has to recharge.
+"""
+import numpy as np
+
+from ros_simulation.energy_model import DEFAULT_ENERGY_MODEL
+from ros_simulation.rx200_robot import RX200Robot
+
+OPERATIONS = tuple(RX200Robot.OPERATION_TIMES)
+
+
+class TreatmentPlan:
+    def __init__(self, start_zone, visits, distance, estimated_time, estimated_battery, charge_stops=(),
+                 final_battery=None):
+        self.start_zone = start_zone
+        self.visits = visits  # [(zone, [operations])] in visiting order
+        self.distance = distance
+        self.estimated_time = estimated_time  # seconds, including recharges
+        self.estimated_battery = estimated_battery  # percentage points used
+        self.charge_stops = list(charge_stops)  # Zones to recharge before visiting
+        self.final_battery = final_battery  # Expected level at the end, when the start level was given
+
+    def to_dict(self):
+        return {
+            "start_zone": self.start_zone,
+            "visits": [{"zone": zone, "operations": list(operations)} for zone, operations in self.visits],
+            "distance": round(self.distance, 2),
+            "estimated_time": round(self.estimated_time, 2),
+            "estimated_battery": round(self.estimated_battery, 2),
+            "charge_stops": list(self.charge_stops),
+            "final_battery": None if self.final_battery is None else round(self.final_battery, 2)
+        }
+
+
+def merge_tasks(tasks, zone_coordinates):
+    """Group tasks by zone, keeping first-seen zone order and per-zone operation order"""
+    merged = {}
+    for task in tasks:
+        zone, operation = task["zone"], task["operation"]
+        if zone not in zone_coordinates:
+            raise ValueError(f"Invalid zone: {zone}")
+        if operation not in OPERATIONS:
+            raise ValueError(f"Invalid operation: {operation}. Valid operations are: {list(OPERATIONS)}")
+        merged.setdefault(zone, []).append(operation)
+    return merged
+
+
+def _nearest_neighbour(distances):
+    """Greedy open path from node 0 through every node"""
+    count = len(distances)
+    unvisited = np.ones(count, dtype=bool)
+    unvisited[0] = False
+    route = [0]
+    for _ in range(count - 1):
+        candidates = np.where(unvisited, distances[route[-1]], np.inf)
+        nearest = int(np.argmin(candidates))
+        unvisited[nearest] = False
+        route.append(nearest)
+    return route
+
+
+def _two_opt(route, distances, max_passes=50):
+    """Improve a route whose first and last nodes are fixed by reversing segments.
+
+    Each candidate move for a given segment start is scored for every segment end
+    at once with NumPy, so a pass costs O(n) array operations.
+    """
+    route = np.array(route)
+    last = len(route) - 1
+    for _ in range(max_passes):
+        improved = False
+        for i in range(1, last - 1):
+            a, b = route[i - 1], route[i]
+            ends = route[i + 1:last]
+            nexts = route[i + 2:last + 1]
+            gain = (distances[a, ends] + distances[b, nexts]
+                    - distances[a, b] - distances[ends, nexts])
+            best = int(np.argmin(gain))
+            if gain[best] < -1e-9:
+                j = i + 1 + best
+                route[i:j + 1] = route[i:j + 1][::-1].copy()
+                improved = True
+        if not improved:
+            break
+    return route.tolist()
+
+
+def plan_charge_stops(visit_costs, battery_level, energy_model=DEFAULT_ENERGY_MODEL):
+    """Indexes of the visits to recharge before, so the level never drops below the reserve.
+
+    Returns (indexes, seconds spent charging, final level); raises ValueError for a visit
+    that even a full charge cannot cover.
+    """
+    stops = []
+    charge_time = 0.0
+    level = battery_level
+    for i, cost in enumerate(visit_costs):
+        if level - cost < energy_model.reserve:
+            if cost > energy_model.capacity - energy_model.reserve:
+                raise ValueError(f"Visit {i + 1} needs {cost:.1f}% battery, more than a full charge allows")
+            stops.append(i)
+            charge_time += energy_model.charge_time(level)
+            level = energy_model.capacity
+        level -= cost
+    return stops, charge_time, level
+
+
+def plan_treatments(tasks, zone_coordinates, start_zone, move_speed=RX200Robot.MOVE_SPEED,
+                    operation_times=RX200Robot.OPERATION_TIMES, energy_model=DEFAULT_ENERGY_MODEL,
+                    battery_level=None):
+    """Plan one robot round for a batch of {"zone", "operation"} tasks starting at start_zone.
+    
+    With battery_level, recharges are planned in wherever the route would run the battery down.
+    """
+    merged = merge_tasks(tasks, zone_coordinates)
+    zones = list(merged)
+    if not zones:
+        return TreatmentPlan(start_zone, [], 0.0, 0.0, 0.0, final_battery=battery_level)
+
+    # Node 0 is the start, then one node per zone, then a free "end" node so the path is open
+    points = np.array([zone_coordinates[start_zone]] + [zone_coordinates[zone] for zone in zones], dtype=float)
+    distances = np.zeros((len(points) + 1, len(points) + 1))
+    distances[:-1, :-1] = np.linalg.norm(points[:, None, :] - points[None, :, :], axis=-1)
+
+    route = _nearest_neighbour(distances[:-1, :-1])
+    route = _two_opt(route + [len(points)], distances)[:-1]
+
+    legs = [float(distances[a, b]) for a, b in zip(route, route[1:])]
+    distance = sum(legs)
+    visits = [(zones[node - 1], merged[zones[node - 1]]) for node in route[1:]]
+    operation_time = sum(operation_times[operation] for _, operations in visits for operation in operations)
+    visit_costs = [energy_model.job_cost(leg, operations) for leg, (_, operations) in zip(legs, visits)]
+
+    charge_stops, charge_time, final_battery = [], 0.0, None
+    if battery_level is not None:
+        stops, charge_time, final_battery = plan_charge_stops(visit_costs, battery_level, energy_model)
+        charge_stops = [visits[i][0] for i in stops]
+
+    return TreatmentPlan(
+        start_zone,
+        visits,
+        distance,
+        estimated_time=distance / move_speed + operation_time + charge_time,
+        estimated_battery=sum(visit_costs),
+        charge_stops=charge_stops,
+        final_battery=final_battery
+    )
@@ -0,0 +1,149 @@
+"""
+Scenario sweep for the Smart Greenhouse
+Grid-searches setpoints, day/night schedules, treatment amounts and robot counts by running
+every scenario as an independent simulation in a process pool, and writes one KPI row per
+scenario to a CSV table.
+
+Example:
+    python scenario_sweep.py --days 2 --robots 1 2 --day-start 5 6 --watering 10 20 \\
+        --temperature-band 20,26 22,28 --output sweep.csv
+"""
+import argparse
+import csv
+import itertools
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
+from simulation import GreenhouseSimulation
+from zone_state import grid_zone_coordinates
+
+# Scenario parameters swept by the grid, in column order
+PARAMETERS = ("seed", "robot_count", "day_start", "day_end", "watering", "manure", "fertilizer",
+              "temperature_band", "humidity_band", "soil_moisture_band")
+
+
+def build_scenarios(grid):
+    """Cartesian product of {parameter: [values]}; returns one dict per scenario"""
+    names = [name for name in PARAMETERS if name in grid]
+    return [dict(zip(names, values)) for values in itertools.product(*(grid[name] for name in names))]
+
+
+def run_scenario(scenario, days=1.0, zone_count=4, treatment_interval=6 * 3600):
+    """Run one scenario headless and return its KPIs; only plain data crosses the process boundary"""
+    started = time.perf_counter()
+    sim = GreenhouseSimulation(seed=scenario.get("seed", 0), zone_coordinates=grid_zone_coordinates(zone_count),
+                               robot_count=scenario.get("robot_count", 1))
+    controller = sim.controller
+    controller.day_start = scenario.get("day_start", controller.day_start)
+    controller.day_end = scenario.get("day_end", controller.day_end)
+    for effect_type in controller.treatment_amounts:
+        controller.treatment_amounts[effect_type] = scenario.get(effect_type, controller.treatment_amounts[effect_type])
+    for loop in ("temperature", "humidity", "soil_moisture"):
+        band = scenario.get(f"{loop}_band")
+        if band is not None:
+            controller.climate.configure(loop, day_band=band)
+
+    treatment_jobs = []
+
+    def treat_all_zones(controller):
+        job, _ = controller.submit_treatment_plan([
+            {"zone": zone, "operation": operation}
+            for zone in controller.zone_state.zones for operation in ("water", "fertilizer")
+        ])
+        treatment_jobs.append(job)
+
+    sim.every(treatment_interval, treat_all_zones)
+    events = sim.run(days * 24 * 3600)
+    # Exact on-time, accumulated by the controller at every switch
+    on_seconds = controller.get_actuator_on_seconds()
+    finished = [job for job in treatment_jobs if job.finished_at is not None]
+    treatment_minutes = [
+        (datetime.fromisoformat(job.finished_at) - datetime.fromisoformat(job.submitted_at)).total_seconds() / 60
+        for job in finished
+    ]
+
+    row = {name: _format(scenario.get(name)) for name in PARAMETERS}
+    for loop, fraction in controller.climate.in_band_fraction().items():
+        row[f"in_range_{loop}"] = round(fraction, 4)
+    row["actuator_on_hours"] = round(sum(on_seconds.values()) / 3600, 3)
+    for name, seconds in on_seconds.items():
+        row[f"on_hours_{name}"] = round(seconds / 3600, 3)
+    row["battery_consumed"] = round(sum(robot.battery_consumed for robot in controller.fleet.robots), 3)
+    row["treatment_rounds"] = len(finished)
+    row["treatment_round_minutes"] = round(sum(treatment_minutes) / len(treatment_minutes), 2) if finished else None
+    row["events"] = events
+    row["runtime_seconds"] = round(time.perf_counter() - started, 3)
+    return row
+
+
+def _format(value):
+    if isinstance(value, tuple):
+        return "-".join(f"{item:g}" for item in value)
+    return value
+
+
+def run_sweep(scenarios, workers=None, **options):
+    """Run scenarios across a process pool (one per core by default); returns rows in scenario order"""
+    workers = workers or os.cpu_count()
+    if workers == 1:
+        return [run_scenario(scenario, **options) for scenario in scenarios]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(run_scenario, scenario, **options) for scenario in scenarios]
+        return [future.result() for future in futures]
+
+
+def write_table(rows, path):
+    with open(path, "w", newline="") as table:
+        writer = csv.DictWriter(table, fieldnames=list(rows[0]))
+        writer.writeheader()
+        writer.writerows(rows)
+
+
+def _band(text):
+    low, high = (float(value) for value in text.split(","))
+    return low, high
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--seeds", type=int, nargs="+", default=[0])
+    parser.add_argument("--robots", type=int, nargs="+", default=[1])
+    parser.add_argument("--day-start", type=int, nargs="+", default=[6])
+    parser.add_argument("--day-end", type=int, nargs="+", default=[18])
+    parser.add_argument("--watering", type=float, nargs="+", default=[20.0])
+    parser.add_argument("--manure", type=float, nargs="+", default=[15.0])
+    parser.add_argument("--fertilizer", type=float, nargs="+", default=[25.0])
+    parser.add_argument("--temperature-band", type=_band, nargs="+", default=[None], metavar="LOW,HIGH")
+    parser.add_argument("--humidity-band", type=_band, nargs="+", default=[None], metavar="LOW,HIGH")
+    parser.add_argument("--soil-moisture-band", type=_band, nargs="+", default=[None], metavar="LOW,HIGH")
+    parser.add_argument("--days", type=float, default=1.0, help="Simulated days per scenario")
+    parser.add_argument("--zones", type=int, default=4)
+    parser.add_argument("--workers", type=int, default=None, help="Processes (default: one per core)")
+    parser.add_argument("--output", default="sweep_results.csv")
+    args = parser.parse_args()
+
+    scenarios = build_scenarios({
+        "seed": args.seeds,
+        "robot_count": args.robots,
+        "day_start": args.day_start,
+        "day_end": args.day_end,
+        "watering": args.watering,
+        "manure": args.manure,
+        "fertilizer": args.fertilizer,
+        "temperature_band": args.temperature_band,
+        "humidity_band": args.humidity_band,
+        "soil_moisture_band": args.soil_moisture_band,
+    })
+    started = time.perf_counter()
+    rows = run_sweep(scenarios, args.workers, days=args.days, zone_count=args.zones)
+    elapsed = time.perf_counter() - started
+    write_table(rows, args.output)
+    print(f"{len(rows)} scenarios in {elapsed:.1f}s ({len(rows) / elapsed:.2f}/s) -> {args.output}",
+          file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
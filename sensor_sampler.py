@@ -0,0 +1,119 @@
+"""
+Adaptive sensor sampling for the Smart Greenhouse
+Each sensor has its own sampling period. The period backs off towards the sensor's calm
+refresh interval while readings are steady, and snaps back to its fastest interval when a
+reading moves quickly or gets close to a setpoint bound. Callers that need a reading
+which is due share one in-flight read (single-flight) instead of each polling the device.
+"""
+import threading
+
+from metrics import Counter
+
+SENSOR_READS = Counter("greenhouse_sensor_reads_total", "Sensor device reads", ("sensor",))
+SENSOR_READS_SAVED = Counter("greenhouse_sensor_reads_saved_total",
+                             "Sensor requests served without a device read", ("sensor", "reason"))
+
+
+class _Flight:
+    """One in-flight read that other callers wait on"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.value = None
+        self.error = None
+
+    def wait(self):
+        self.done.wait()
+        if self.error is not None:
+            raise self.error
+        return self.value
+
+
+class _SensorState:
+    def __init__(self, period):
+        # (value, read_at) replaced as one tuple, so lock-free readers never see half an update
+        self.reading = None
+        self.period = period  # Current sampling period, between min_refresh_seconds and refresh_seconds
+
+
+class SensorSampler:
+    def __init__(self, specs, clock, bands=None):
+        self.specs = {spec.name: spec for spec in specs}
+        self.clock = clock
+        self.bands = bands  # Callable returning {sensor: (low, high)} for the active setpoints
+        self._states = {spec.name: _SensorState(spec.min_refresh_seconds) for spec in specs}
+        self._inflight = {}
+        self._lock = threading.Lock()
+
+    def read(self, name, read_fn):
+        """The sensor's reading: the cached one while it is fresh, otherwise one shared device read"""
+        state = self._states[name]
+        reading = self._fresh_reading(state)
+        if reading is not None:
+            SENSOR_READS_SAVED.labels(name, "fresh").inc()
+            return reading[0]
+
+        with self._lock:
+            reading = self._fresh_reading(state)
+            if reading is not None:
+                SENSOR_READS_SAVED.labels(name, "fresh").inc()
+                return reading[0]
+            flight = self._inflight.get(name)
+            leader = flight is None
+            if leader:
+                flight = self._inflight[name] = _Flight()
+
+        if not leader:
+            SENSOR_READS_SAVED.labels(name, "coalesced").inc()
+            return flight.wait()
+
+        try:
+            flight.value = read_fn()
+            SENSOR_READS.labels(name).inc()
+            self._record(name, state, flight.value)
+            return flight.value
+        except Exception as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._inflight[name]
+            flight.done.set()
+
+    def _fresh_reading(self, state):
+        """The cached (value, read_at) while it is younger than the sensor's period, else None"""
+        reading = state.reading
+        if reading is not None and self.clock.monotonic() - reading[1] < state.period:
+            return reading
+        return None
+
+    def _record(self, name, state, value):
+        """Store a new reading and pick the period until the next one"""
+        spec = self.specs[name]
+        now = self.clock.monotonic()
+        previous = state.reading
+        state.reading = (value, now)
+
+        if previous is None or self._needs_attention(name, spec, value, previous[0], now - previous[1]):
+            state.period = spec.min_refresh_seconds
+        else:
+            # Steady: back off gradually towards the calm interval
+            state.period = min(spec.refresh_seconds, max(state.period * 2, spec.min_refresh_seconds, 1.0))
+
+    def _needs_attention(self, name, spec, value, previous, elapsed):
+        """Whether a reading is moving fast or sits near a setpoint bound"""
+        if not isinstance(value, (int, float)) or not isinstance(previous, (int, float)):
+            return value != previous
+        tolerance = spec.change_tolerance
+        # Projected change over the calm interval at the current rate
+        if elapsed > 0 and abs(value - previous) / elapsed * spec.refresh_seconds >= tolerance:
+            return True
+        band = self.bands().get(name) if self.bands else None
+        if band is not None:
+            low, high = band
+            return value - low <= tolerance or high - value <= tolerance
+        return False
+
+    def get_status(self):
+        """Current sampling period of every sensor"""
+        return {name: round(state.period, 2) for name, state in self._states.items()}
@@ -0,0 +1,746 @@
+"""
+Zone-sharded controller for the Smart Greenhouse
+Zones are partitioned across worker processes. The coordinator owns everything site-wide: it
+reads the sensors once for the whole greenhouse, switches the actuators, keeps the day/night
+setting and runs the climate loops. Each worker runs a GreenhouseController without devices
+for its shard (zone effects, decay, per-zone history, alerts and robots), ticking on the
+readings the coordinator pushes, and reports per-zone climate demand back in its status.
+Workers send their zone sections as encoded JSON fragments that the coordinator splices
+into /api/data without decoding them. Commands go to the shard that owns the zone. Shards
+never wait on each other: a slow or stuck shard only makes its own part of the status older
+and its own commands time out.
+"""
+import itertools
+import json
+import logging
+import multiprocessing
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from alert_engine import SEVERITY_ORDER
+from climate_control import ClimateController
+from device_registry import DEFAULT_DEVICES, DeviceRegistry, load_device_config
+from greenhouse_controller import ACTUATOR_SWITCHES, ZONE_METRICS
+from metrics import REGISTRY
+from records import EncodedZones, SensorReadings, json_default
+from ros_simulation.job_queue import JobStatus
+from sensor_sampler import SensorSampler
+from sim_clock import SYSTEM_CLOCK
+from status_broadcaster import StatusBroadcaster
+from status_payload import StatusPayload
+from telemetry_log import TelemetryLog
+
+logger = logging.getLogger(__name__)
+
+# Controller methods a coordinator may call on a shard
+SHARD_COMMANDS = (
+    "set_climate_control", "submit_robot_job", "get_robot_job", "plan_treatments", "submit_treatment_plan",
+    "get_history", "get_alerts"
+)
+
+# Shards own no devices: the coordinator reads the site-wide sensors and switches the actuators
+NO_DEVICES = {"devices": {spec.name: {"enabled": False} for spec in DEFAULT_DEVICES}}
+
+# Status sections with one entry per zone, sent by the shards as JSON fragments
+ZONE_SECTIONS = ("zone_sensors", "zone_effects")
+
+
+def partition_zones(zone_coordinates, shard_count):
+    """Split zones into shard_count contiguous groups (neighbouring zones share a shard and its robots)"""
+    zones = list(zone_coordinates.items())
+    shard_count = max(1, min(shard_count, len(zones)))
+    size, extra = divmod(len(zones), shard_count)
+    shards = []
+    start = 0
+    for i in range(shard_count):
+        end = start + size + (1 if i < extra else 0)
+        shards.append(dict(zones[start:end]))
+        start = end
+    return shards
+
+
+def split_robots(robot_count, shard_count):
+    """Robots per shard, as even as possible with at least one each"""
+    size, extra = divmod(max(robot_count, shard_count), shard_count)
+    return [size + (1 if i < extra else 0) for i in range(shard_count)]
+
+
+def _to_wire(value):
+    """Convert command results (jobs, plans, tuples) to picklable plain data"""
+    if isinstance(value, tuple):
+        return tuple(_to_wire(item) for item in value)
+    if hasattr(value, "to_dict"):
+        return value.to_dict()
+    return value
+
+
+class _ShardPublisher:
+    """Stands in for a shard controller's broadcaster: flags new snapshots for the push thread"""
+
+    def __init__(self):
+        self.updated = threading.Event()
+
+    def publish(self, snapshot, version):
+        self.updated.set()
+
+
+def _encode_zones(table):
+    """A zone section as a JSON fragment: the inside of its {zone: {...}} object"""
+    return json.dumps(table, separators=(",", ":"), default=json_default).encode("utf-8")[1:-1]
+
+
+def _push_snapshots(controller, publisher, updates):
+    """Worker thread: send each new status to the coordinator as (summary, {section: fragment}).
+
+    The summary holds the small sections as plain data; the zone sections are encoded here,
+    once, so the coordinator never decodes them to serve /api/data. Sending happens here
+    rather than in publish(), so a coordinator that is slow to read never holds up the
+    shard's own sampling.
+    """
+    sent = None
+    while True:
+        publisher.updated.wait()
+        publisher.updated.clear()
+        snapshot = controller.get_status_snapshot()
+        if snapshot is not sent:
+            sent = snapshot
+            summary = {key: value for key, value in snapshot.items() if key not in ZONE_SECTIONS}
+            updates.send((summary, {key: _encode_zones(snapshot[key]) for key in ZONE_SECTIONS}))
+
+
+def _receive_site(controller, site):
+    """Worker thread: tick on the latest site-wide readings and day/night setting the coordinator pushed"""
+    while True:
+        try:
+            values, is_day = site.recv()
+        except (EOFError, OSError):
+            return
+        readings = SensorReadings()
+        for name, value in values.items():
+            readings[name] = value
+        controller.site_readings = readings
+        controller.is_day = is_day
+
+
+def _run_ticks(controller, count):
+    """Run count sampling ticks back to back; returns the seconds taken"""
+    started = time.perf_counter()
+    for _ in range(count):
+        controller._refresh_snapshot(tick=True)
+    return time.perf_counter() - started
+
+
+def _run_shard(shard_id, zone_coordinates, options, commands, updates, site):
+    """Worker process: one controller for one shard, serving commands until the pipe closes"""
+    from greenhouse_controller import GreenhouseController
+    from logging_setup import configure_logging
+
+    configure_logging()
+    controller = GreenhouseController(zone_coordinates=zone_coordinates, device_config=NO_DEVICES, **options)
+    controller.compress_payload = False  # The coordinator serves the merged status; nobody fetches this one
+    publisher = _ShardPublisher()
+    controller.broadcaster = publisher
+    threading.Thread(target=_receive_site, args=(controller, site), daemon=True).start()
+    threading.Thread(target=_push_snapshots, args=(controller, publisher, updates), daemon=True).start()
+    publisher.updated.set()  # Send the initial status
+
+    while True:
+        try:
+            request_id, method, args, kwargs = commands.recv()
+        except EOFError:
+            return
+        if method == "stop":
+            commands.send((request_id, "ok", None))
+            return
+        try:
+            if method == "run_ticks":
+                result = _run_ticks(controller, *args)
+            elif method in SHARD_COMMANDS:
+                result = _to_wire(getattr(controller, method)(*args, **kwargs))
+            else:
+                raise ValueError(f"Unknown shard command: {method}")
+            commands.send((request_id, "ok", result))
+        except Exception as e:
+            logger.exception("Shard command failed", extra={"shard": shard_id, "command": method})
+            commands.send((request_id, "error", (type(e).__name__, str(e))))
+
+
+class ShardError(RuntimeError):
+    """A shard is down or did not answer in time"""
+
+
+class RemoteJob:
+    """A robot job as reported by the shard that runs it"""
+
+    def __init__(self, data):
+        self.data = data
+        self.job_id = data["job_id"]
+        self.status = JobStatus(data["status"])
+
+    def to_dict(self):
+        return self.data
+
+
+class RemotePlan:
+    """A treatment plan as reported by the shard that made it"""
+
+    def __init__(self, data):
+        self.data = data
+
+    def to_dict(self):
+        return self.data
+
+
+class _Shard:
+    """Coordinator side of one worker process"""
+
+    def __init__(self, shard_id, zone_coordinates, options, context):
+        self.shard_id = shard_id
+        self.zones = list(zone_coordinates)
+        self.summary = None  # Latest status without its zone sections, as plain data
+        self.fragments = None  # {section: JSON fragment} of the latest status
+        self.received_at = None  # monotonic time of the latest status
+        self.alive = True
+        self.stopping = False  # Set by close(), so the worker exiting is not reported as a failure
+        self._commands, worker_commands = context.Pipe()
+        self._updates, worker_updates = context.Pipe(duplex=False)
+        worker_site, self._site = context.Pipe(duplex=False)
+        self._site_lock = threading.Lock()
+        self._request_ids = itertools.count()
+        self._lock = threading.Lock()  # One command in flight per shard
+        self.process = context.Process(
+            target=_run_shard, name=f"greenhouse-shard-{shard_id}", daemon=True,
+            args=(shard_id, zone_coordinates, options, worker_commands, worker_updates, worker_site)
+        )
+        self.process.start()
+        worker_commands.close()
+        worker_updates.close()
+        worker_site.close()
+
+    def call(self, method, *args, timeout=5.0, **kwargs):
+        """Run a command on the shard and return its result; raises ShardError on timeout or exit"""
+        if not self.alive:
+            raise ShardError(f"Shard {self.shard_id} is not running")
+        with self._lock:
+            request_id = next(self._request_ids)
+            deadline = time.monotonic() + timeout
+            try:
+                self._commands.send((request_id, method, args, kwargs))
+                while True:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0 or not self._commands.poll(remaining):
+                        raise ShardError(f"Shard {self.shard_id} did not answer {method} within {timeout}s")
+                    response_id, status, result = self._commands.recv()
+                    if response_id == request_id:
+                        break  # Anything else answers an earlier request that timed out
+            except (EOFError, OSError) as e:
+                self.alive = False
+                raise ShardError(f"Shard {self.shard_id} is not running") from e
+        if status == "error":
+            name, message = result
+            raise (ValueError if name in ("ValueError", "KeyError", "TypeError") else ShardError)(message)
+        return result
+
+    def send_site(self, readings, is_day):
+        """Hand the shard the latest site-wide readings ({sensor: value}) and day/night setting.
+
+        The worker reads them on a thread of its own, so this only waits if a stuck shard has
+        let the pipe fill up.
+        """
+        if not self.alive:
+            return
+        with self._site_lock:
+            try:
+                self._site.send((readings, is_day))
+            except OSError:
+                self.alive = False
+
+    def receive_snapshots(self, on_update):
+        """Receiver thread: keep the latest status the shard pushed"""
+        while True:
+            try:
+                summary, fragments = self._updates.recv()
+            except (EOFError, OSError):
+                self.alive = False
+                if not self.stopping:
+                    logger.error("Shard stopped", extra={"shard": self.shard_id})
+                on_update()
+                return
+            self.summary, self.fragments = summary, fragments
+            self.received_at = time.monotonic()
+            on_update()
+
+
+class SiteController:
+    """Coordinator side of the site-wide devices: the sensors read once for the whole greenhouse,
+    the actuators, the day/night setting and the climate loops that switch the actuators.
+
+    Loops over per-zone readings (soil moisture) are evaluated on the shards, which own the
+    zones; their demand is passed to run_climate_control().
+    """
+
+    def __init__(self, device_config=None, telemetry_dir=None, clock=SYSTEM_CLOCK):
+        self.clock = clock
+        if isinstance(device_config, str):
+            device_config = load_device_config(device_config)
+        self.devices = DeviceRegistry(config=device_config)
+        self.is_day = True
+        self.day_start = 6
+        self.day_end = 18
+        self.climate = ClimateController(1, clock=clock.monotonic)
+        self.sampler = SensorSampler(self.devices.sensors, clock, bands=lambda: self.climate.active_bands(self.is_day))
+
+        # Serializes actuator and setting changes; every actuator starts off, its driver created when first switched
+        self._state_lock = threading.Lock()
+        self._actuator_on_seconds = dict.fromkeys(self.devices.actuator_names, 0.0)
+        self._actuator_on_since = dict.fromkeys(self.devices.actuator_names)
+
+        # Actuator states and settings are logged here; zones, samples and robots are logged by each shard
+        self.telemetry = None
+        if telemetry_dir:
+            self.telemetry = TelemetryLog(telemetry_dir, zones=(), metrics=(), effect_types=(),
+                                          actuators=self.devices.actuator_names, robot_ids=(), clock=clock)
+            state = self.telemetry.replay()
+            for actuator_name, is_on in state["actuators"].items():
+                self.toggle_actuator(actuator_name, is_on, manual=False)
+            self.is_day = state["settings"].get("is_day", self.is_day)
+
+        REGISTRY.register_callback("greenhouse_actuator_on", "Whether an actuator is on", lambda: {
+            (name,): float(status["is_on"]) for name, status in self.get_all_actuator_status().items()
+        }, labelnames=("actuator",))
+        REGISTRY.register_callback("greenhouse_actuator_on_seconds_total", "Time actuators have spent on", lambda: {
+            (name,): seconds for name, seconds in self.get_actuator_on_seconds().items()
+        }, kind="counter", labelnames=("actuator",))
+
+    def read_sensors(self):
+        """One sweep of the site-wide sensors as a SensorReadings record; each is read when its period is up.
+
+        A sensor that fails is left out of the sweep, so the other readings still reach the shards.
+        """
+        data = SensorReadings()
+        for spec in self.devices.sensors:
+            try:
+                data[spec.name] = self.sampler.read(
+                    spec.name, lambda spec=spec: spec.read(self.devices.get(spec.name), self, data))
+            except Exception:
+                logger.exception("Site sensor read failed", extra={"sensor": spec.name})
+        return data
+
+    def actuator_on(self, actuator_name):
+        """Whether an actuator is on; actuators that are not in use, or never switched, count as off"""
+        actuator = self.devices.created(actuator_name)
+        return actuator is not None and actuator.is_on
+
+    def get_all_actuator_status(self):
+        return {name: self.devices.actuator_status(name) for name in self.devices.actuator_names}
+
+    def get_actuator_on_seconds(self):
+        """{actuator: seconds on so far}, including the current on period"""
+        now = self.clock.monotonic()
+        return {
+            name: total + (now - self._actuator_on_since[name] if self._actuator_on_since[name] is not None else 0.0)
+            for name, total in self._actuator_on_seconds.items()
+        }
+
+    def toggle_actuator(self, actuator_name, state=None, manual=True):
+        """Toggle or set an actuator; a manual switch pauses automatic control of it"""
+        actuator = self.devices.actuator(actuator_name)
+        if actuator is None:
+            return False, f"Invalid actuator: {actuator_name}"
+
+        with self._state_lock:
+            if state is None:
+                state = not actuator.is_on
+            if state:
+                actuator.turn_on()
+            else:
+                actuator.turn_off()
+            is_on = actuator.is_on
+            now = self.clock.monotonic()
+            since = self._actuator_on_since[actuator_name]
+            if is_on and since is None:
+                self._actuator_on_since[actuator_name] = now
+            elif not is_on and since is not None:
+                self._actuator_on_seconds[actuator_name] += now - since
+                self._actuator_on_since[actuator_name] = None
+            ACTUATOR_SWITCHES.labels(actuator_name, "manual" if manual else "auto").inc()
+
+            if manual:
+                self.climate.note_manual_switch(actuator_name)
+            if self.telemetry is not None:
+                self.telemetry.log_actuator(self.clock.time(), actuator_name, is_on)
+        return True, f"{actuator_name} {'turned on' if is_on else 'turned off'}"
+
+    def toggle_day_night(self):
+        with self._state_lock:
+            self.is_day = is_day = not self.is_day
+            if self.telemetry is not None:
+                self.telemetry.log_setting(self.clock.time(), "is_day", is_day)
+        return is_day, f"Switched to {'day' if is_day else 'night'} mode"
+
+    def run_climate_control(self, readings, zone_demand):
+        """Evaluate the loops on the site-wide readings plus the shards' per-zone demand and switch actuators"""
+        values = {
+            loop.metric: np.nan if loop.metric in ZONE_METRICS else readings.get(loop.metric, np.nan)
+            for loop in self.climate.loops
+        }
+        actuator_states = {name: status["is_on"] for name, status in self.get_all_actuator_status().items()}
+        for actuator_name, state in self.climate.evaluate(values, self.is_day, actuator_states, zone_demand).items():
+            try:
+                self.toggle_actuator(actuator_name, state, manual=False)
+            except Exception:
+                logger.exception("Site actuator switch failed", extra={"actuator": actuator_name})
+        if self.telemetry is not None:
+            self.telemetry.flush()
+
+
+class ShardedController:
+    def __init__(self, zone_coordinates, shard_count=None, robot_count=1, telemetry_dir=None,
+                 device_config=None, command_timeout=5.0, startup_timeout=60.0):
+        """Start one worker process per shard and wait (up to startup_timeout) for their first status"""
+        shard_count = shard_count or os.cpu_count() or 1
+        self.command_timeout = command_timeout  # seconds a command waits for its shard
+        self.broadcaster = StatusBroadcaster()
+        self.compress_payload = True
+        self.sampling_interval = 2  # seconds between site-wide sensor sweeps
+        self.site = SiteController(device_config, os.path.join(telemetry_dir, "site") if telemetry_dir else None)
+        self._site_readings = {}  # {sensor: value} of the latest site-wide sweep
+        self._snapshot = None
+        self._payload = None
+        self._changed = threading.Event()
+        self._closed = threading.Event()
+        self._merge_lock = threading.Lock()
+        self._job_shards = OrderedDict()  # job_id -> shard, for the most recent jobs
+        self._max_tracked_jobs = 10000
+        self.shards = []
+        self._pool = None
+        self._tick_thread = None
+
+        # Spawned rather than forked: the parent is typically a threaded web server
+        context = multiprocessing.get_context("spawn")
+        partitions = partition_zones(zone_coordinates, shard_count)
+        robot_counts = split_robots(robot_count, len(partitions))
+        try:
+            for shard_id, (zones, robots) in enumerate(zip(partitions, robot_counts)):
+                options = {
+                    "robot_count": robots,
+                    "robot_id_start": 1 + sum(robot_counts[:shard_id]),
+                    "telemetry_dir": os.path.join(telemetry_dir, f"shard_{shard_id}") if telemetry_dir else None
+                }
+                self.shards.append(_Shard(shard_id, zones, options, context))
+            self.zone_owner = {zone: shard for shard in self.shards for zone in shard.zones}
+            self._pool = ThreadPoolExecutor(max_workers=len(self.shards), thread_name_prefix="shard-command")
+
+            for shard in self.shards:
+                threading.Thread(target=shard.receive_snapshots, args=(self._changed.set,),
+                                 name=f"shard-{shard.shard_id}-updates", daemon=True).start()
+            self._site_tick()
+            deadline = time.monotonic() + startup_timeout
+            while any(shard.summary is None and shard.alive for shard in self.shards):
+                if time.monotonic() > deadline:
+                    raise ShardError("Shards did not start within the startup timeout")
+                self._changed.wait(0.1)
+            self._publish_merged()
+            threading.Thread(target=self._merge_continuously, name="shard-merge", daemon=True).start()
+            self._tick_thread = threading.Thread(target=self._tick_continuously, name="site-tick", daemon=True)
+            self._tick_thread.start()
+        except BaseException:
+            # Nothing else would ever stop the worker processes that did start
+            self.close()
+            raise
+
+    def _tick_continuously(self):
+        """Background thread that runs a site-wide sweep every sampling interval until close()"""
+        while not self._closed.wait(self.sampling_interval):
+            try:
+                self._site_tick()
+            except Exception:
+                logger.exception("Error in site-wide sampling tick")
+
+    def _site_tick(self):
+        """Read the site-wide sensors, hand the readings to every shard and run the climate loops"""
+        readings = self.site.read_sensors()
+        self._site_readings = readings.to_dict()
+        self._push_site()
+        self.site.run_climate_control(readings, self._zone_demand())
+        self._changed.set()
+
+    def _push_site(self):
+        for shard in self.shards:
+            shard.send_site(self._site_readings, self.site.is_day)
+
+    def _zone_demand(self):
+        """({loop: bool}, {loop: bool}): low and high demand of the per-zone loops, as the live shards last reported"""
+        low, high = {}, {}
+        for shard in self.shards:
+            if shard.summary is None or not shard.alive:
+                continue
+            for loop in shard.summary["climate_control"]["loops"]:
+                if loop["metric"] in ZONE_METRICS:
+                    low[loop["name"]] = low.get(loop["name"], False) or loop["low_demand_zones"] > 0
+                    high[loop["name"]] = high.get(loop["name"], False) or loop["high_demand_zones"] > 0
+        return low, high
+
+    def _merge_continuously(self):
+        """Merge whenever any shard has pushed; updates arriving during a merge are folded into the next"""
+        while True:
+            self._changed.wait()
+            self._changed.clear()
+            try:
+                self._publish_merged()
+            except Exception:
+                logger.exception("Error merging shard snapshots")
+
+    def _publish_merged(self):
+        with self._merge_lock:
+            snapshot = self._merge()
+            previous = self._payload
+            self._payload = StatusPayload.from_body(self._encode(snapshot), previous, compress=self.compress_payload)
+            self._snapshot = snapshot
+            if self._payload is not previous:
+                self.broadcaster.publish(snapshot, self._payload.version)
+
+    @staticmethod
+    def _encode(snapshot):
+        """JSON body of a merged status; zone sections are spliced from the shards' fragments as they are"""
+        parts = []
+        for key, value in snapshot.items():
+            encoded = value.encoded() if isinstance(value, EncodedZones) else \
+                json.dumps(value, separators=(",", ":"), default=json_default).encode("utf-8")
+            parts.append(json.dumps(key).encode("utf-8") + b":" + encoded)
+        return b"{" + b",".join(parts) + b"}"
+
+    def _merge(self):
+        """One site-wide status: the coordinator's devices and settings plus the latest status of every shard.
+
+        The primary robot and its zone's readings come from the first shard that has reported;
+        per-zone sections, robots, queues and alerts are combined.
+        """
+        now = time.monotonic()
+        site = self.site
+        reported = [shard for shard in self.shards if shard.summary is not None]
+        robots = []
+        pending = pending_timers = decaying = 0
+        alerts = {"active": 0, "warning": 0, "critical": 0, "last_latency_ms": 0.0}
+        for shard in reported:
+            summary = shard.summary
+            robots.extend(summary["fleet"]["robots"])
+            pending += summary["robot_jobs"]["pending"]
+            pending_timers += summary["scheduler"]["pending_timers"]
+            decaying += summary["scheduler"]["decaying_effects"]
+            for key, value in summary.get("alerts", {}).items():
+                alerts[key] = max(alerts.get(key, 0), value) if key == "last_latency_ms" else alerts.get(key, 0) + value
+
+        def zone_section(key, shared=None):
+            return EncodedZones([shard.fragments[key] if shard.fragments else b"" for shard in self.shards], shared)
+
+        # Every zone carries the site-wide readings; zone effects give each zone its own value of the rest
+        shared = {name: value for name, value in self._site_readings.items() if name not in ZONE_METRICS}
+        return {
+            "sensors": reported[0].summary["sensors"] if reported else self._site_readings,
+            "zone_sensors": zone_section("zone_sensors", shared),
+            "actuators": site.get_all_actuator_status(),
+            "robot": reported[0].summary["robot"] if reported else None,
+            "robot_jobs": {"pending": pending},
+            "fleet": {"robot_count": len(robots), "robots": robots},
+            "settings": {
+                "is_day": site.is_day,
+                "day_start": site.day_start,
+                "day_end": site.day_end
+            },
+            "zone_effects": zone_section("zone_effects"),
+            "scheduler": {"pending_timers": pending_timers, "decaying_effects": decaying},
+            "climate_control": self._climate_status(reported),
+            "sampling_periods": site.sampler.get_status(),
+            "alerts": alerts,
+            "shards": self._shard_summaries(now)
+        }
+
+    def _climate_status(self, reported):
+        """The coordinator's loop settings, with demand counted over the zones of every shard"""
+        status = self.site.climate.get_status()
+        shard_loops = [{loop["name"]: loop for loop in shard.summary["climate_control"]["loops"]} for shard in reported]
+        for loop in status["loops"]:
+            for key in ("low_demand_zones", "high_demand_zones"):
+                loop[key] = sum(loops[loop["name"]][key] for loops in shard_loops if loop["name"] in loops)
+        return status
+
+    def _shard_summaries(self, now):
+        return [
+            {
+                "shard": shard.shard_id,
+                "alive": shard.alive,
+                "zone_count": len(shard.zones),
+                "age": None if shard.received_at is None else round(now - shard.received_at, 1)
+            }
+            for shard in self.shards
+        ]
+
+    def get_status_snapshot(self):
+        """Latest merged status; replaced, never modified"""
+        return self._snapshot
+
+    def get_status_payload(self):
+        """Latest merged status pre-serialized as JSON, with its version and ETag"""
+        return self._payload
+
+    def get_complete_status(self):
+        return self._snapshot
+
+    def _broadcast(self, method, *args, **kwargs):
+        """Run a command on every shard at once; returns [(shard, result or ShardError/ValueError)]"""
+        def call(shard):
+            try:
+                return shard, shard.call(method, *args, timeout=self.command_timeout, **kwargs)
+            except (ShardError, ValueError) as e:
+                return shard, e
+        return list(self._pool.map(call, self.shards))
+
+    def _owner(self, zone):
+        shard = self.zone_owner.get(zone)
+        if shard is None:
+            raise ValueError(f"Invalid zone: {zone}")
+        return shard
+
+    def toggle_actuator(self, actuator_name, state=None):
+        """Toggle or set a site-wide actuator"""
+        result = self.site.toggle_actuator(actuator_name, state)
+        self._changed.set()
+        return result
+
+    def toggle_day_night(self):
+        """Toggle day/night mode; shards get it with the next readings, sent right away"""
+        is_day, message = self.site.toggle_day_night()
+        self._push_site()
+        self._changed.set()
+        return is_day, message
+
+    def get_climate_control(self):
+        return self._climate_status([shard for shard in self.shards if shard.summary is not None])
+
+    def set_climate_control(self, enabled=None, loops=None):
+        """Change climate control here and the loop settings on every shard, whose per-zone demand uses them"""
+        if enabled is not None:
+            self.site.climate.enabled = bool(enabled)
+        for name, settings in (loops or {}).items():
+            self.site.climate.configure(name, **settings)
+        if loops:
+            for _, result in self._broadcast("set_climate_control", None, loops):
+                if isinstance(result, Exception):
+                    raise result
+        self._changed.set()
+        return self.get_climate_control()
+
+    def get_history(self, metric, zone, start=None, end=None, resolution=None):
+        return self._owner(zone).call("get_history", metric, zone, start, end, resolution,
+                                      timeout=self.command_timeout)
+
+    def get_alerts(self, zone=None, severity=None, limit=50):
+        """Alerts of the shard that owns zone, or of every shard (each alert tagged with its shard)"""
+        if severity is not None and severity not in SEVERITY_ORDER:
+            return False, f"Invalid severity: {severity}"
+        if zone is not None:
+            shard = self.zone_owner.get(zone)
+            if shard is None:
+                return False, f"Invalid zone: {zone}"
+            results = [(shard, shard.call("get_alerts", zone, severity, limit, timeout=self.command_timeout))]
+        else:
+            results = self._broadcast("get_alerts", None, severity, limit)
+        merged = {"active": [], "events": [], "rules": None, "summary": {}}
+        for shard, result in results:
+            if isinstance(result, Exception):
+                continue
+            alerts = result[1]
+            merged["active"].extend(dict(alert, shard=shard.shard_id) for alert in alerts["active"])
+            merged["events"].extend(dict(event, shard=shard.shard_id) for event in alerts["events"])
+            merged["rules"] = merged["rules"] or alerts["rules"]
+            for key, value in alerts["summary"].items():
+                merged["summary"][key] = max(merged["summary"].get(key, 0), value) if key == "last_latency_ms" \
+                    else merged["summary"].get(key, 0) + value
+        merged["active"].sort(key=lambda alert: (alert["severity"] != "critical", alert["raised_at"]))
+        merged["events"].sort(key=lambda event: event.get("cleared_at", event["raised_at"]), reverse=True)
+        del merged["events"][max(limit, 0):]
+        return True, merged
+
+    def submit_robot_job(self, operation, zone):
+        """Queue a robot operation on the shard that owns the zone; returns (job, message)"""
+        shard = self.zone_owner.get(zone)
+        if shard is None:
+            return None, f"Invalid zone: {zone}"
+        try:
+            job, message = shard.call("submit_robot_job", operation, zone, timeout=self.command_timeout)
+        except ShardError as e:
+            return None, str(e)
+        if job is None:
+            return None, message
+        self._track_job(job["job_id"], shard)
+        return RemoteJob(job), message
+
+    def _batch_owner(self, tasks):
+        owners = {self._owner(task["zone"]) for task in tasks}
+        if len(owners) > 1:
+            raise ValueError("Tasks span zones of several shards; submit one batch per shard")
+        return owners.pop() if owners else self.shards[0]
+
+    def plan_treatments(self, tasks):
+        shard = self._batch_owner(tasks)
+        return RemotePlan(shard.call("plan_treatments", tasks, timeout=self.command_timeout))
+
+    def submit_treatment_plan(self, tasks):
+        """Plan and queue a batch on the shard that owns its zones; returns (job, plan)"""
+        shard = self._batch_owner(tasks)
+        job, plan = shard.call("submit_treatment_plan", tasks, timeout=self.command_timeout)
+        self._track_job(job["job_id"], shard)
+        return RemoteJob(job), RemotePlan(plan)
+
+    def _track_job(self, job_id, shard):
+        with self._merge_lock:
+            self._job_shards[job_id] = shard
+            while len(self._job_shards) > self._max_tracked_jobs:
+                self._job_shards.popitem(last=False)
+
+    def get_robot_job(self, job_id):
+        """Get a robot job from the shard running it (asking every shard for jobs not tracked here)"""
+        shard = self._job_shards.get(job_id)
+        if shard is not None:
+            job = shard.call("get_robot_job", job_id, timeout=self.command_timeout)
+            return RemoteJob(job) if job is not None else None
+        for _, job in self._broadcast("get_robot_job", job_id):
+            if job is not None and not isinstance(job, Exception):
+                return RemoteJob(job)
+        return None
+
+    def measure_tick_rate(self, ticks=100):
+        """Run ticks sampling ticks on every shard at once; returns aggregate zone-ticks per second"""
+        started = time.perf_counter()
+        results = self._broadcast("run_ticks", ticks)
+        elapsed = time.perf_counter() - started
+        for _, result in results:
+            if isinstance(result, Exception):
+                raise result
+        zone_ticks = sum(len(shard.zones) for shard in self.shards) * ticks
+        return zone_ticks / elapsed
+
+    def close(self):
+        """Stop the site-wide sampling and every shard process, also after a failed start"""
+        self._closed.set()
+        if self._tick_thread is not None:
+            self._tick_thread.join()
+        for shard in self.shards:
+            shard.stopping = True
+        if self._pool is not None:
+            self._broadcast("stop")
+            for shard in self.shards:
+                shard.process.join(timeout=5)
+            self._pool.shutdown(wait=False)
+        for shard in self.shards:
+            if shard.process.is_alive():
+                shard.process.terminate()
+                shard.process.join()
+        if self.site.telemetry is not None:
+            self.site.telemetry.close()
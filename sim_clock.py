@@ -0,0 +1,58 @@
+"""
+Clocks for the Smart Greenhouse
+Components take a clock instead of calling the time module, so the same logic runs on
+wall-clock time in production and on virtual time in simulation. Long operations are
+written as step generators that yield the seconds they wait, so a thread can sleep through
+them (run_steps) or a scheduler can resume them when virtual time gets there.
+"""
+import threading
+import time
+
+
+class SystemClock:
+    """Wall-clock time"""
+
+    def monotonic(self):
+        return time.monotonic()
+
+    def time(self):
+        return time.time()
+
+    def sleep(self, seconds):
+        time.sleep(seconds)
+
+
+class VirtualClock:
+    """Simulated time that only moves when advanced; sleeping advances it instantly"""
+
+    def __init__(self, start=0.0, epoch=1700000000.0):
+        self._now = float(start)
+        self.epoch = epoch  # Unix time that virtual time 0 maps to
+        self._lock = threading.Lock()
+
+    def monotonic(self):
+        return self._now
+
+    def time(self):
+        return self.epoch + self._now
+
+    def sleep(self, seconds):
+        with self._lock:
+            self._now += max(0.0, seconds)
+
+    def advance_to(self, moment):
+        """Move time forward to moment; time never goes backwards"""
+        with self._lock:
+            self._now = max(self._now, moment)
+
+
+SYSTEM_CLOCK = SystemClock()
+
+
+def run_steps(steps, clock=SYSTEM_CLOCK):
+    """Run a step generator on the calling thread, sleeping through every delay it yields; returns its result"""
+    try:
+        while True:
+            clock.sleep(next(steps))
+    except StopIteration as stop:
+        return stop.value
@@ -1,10 +1,205 @@
 // Smart Greenhouse Web Application
+
+// Sensor panel entries, in display order
+const SENSOR_DISPLAY = [
+    { key: 'temperature', name: 'Temperature', icon: 'fa-thermometer-half', unit: '°C' },
+    { key: 'humidity', name: 'Humidity', icon: 'fa-tint', unit: '%' },
+    { key: 'soil_moisture', name: 'Soil Moisture', icon: 'fa-ruler-vertical', unit: '%' },
+    { key: 'light_intensity', name: 'Light Intensity', icon: 'fa-sun', unit: '' },
+    { key: 'co2_level', name: 'CO2 Level', icon: 'fa-wind', unit: ' ppm' },
+    { key: 'ph_level', name: 'pH Level', icon: 'fa-flask', unit: '' },
+    { key: 'nutrient_level', name: 'Nutrient Level', icon: 'fa-seedling', unit: '%' }
+];
+
+// Actuator cards; actuators not listed here get a generic card
+const ACTUATOR_DISPLAY = {
+    heater: { name: 'Heater', icon: 'fa-fire' },
+    cooling_fan: { name: 'Cooling Fan', icon: 'fa-fan' },
+    humidifier: { name: 'Humidifier', icon: 'fa-cloud-rain' },
+    dehumidifier: { name: 'Dehumidifier', icon: 'fa-compress-alt' },
+    irrigation: { name: 'Irrigation', icon: 'fa-shower' },
+    lights: { name: 'Grow Lights', icon: 'fa-lightbulb' },
+    co2_injector: { name: 'CO2 Injector', icon: 'fa-smog' },
+    nutrient_pump: { name: 'Nutrient Pump', icon: 'fa-vial' }
+};
+
+// Optimal soil moisture range (%), used to colour zone cells
+const MOISTURE_RANGE = { low: 40, high: 60 };
+
+// Greenhouse layout as a virtualized grid: only the rows in view (plus a few either side)
+// have DOM cells, and cells are recycled as the grid scrolls. Cells are patched only when
+// the zone they show changed, so a tick costs the same with 4 zones or 1000.
+class ZoneGrid {
+    constructor(container, requestRender, onSelect) {
+        this.container = container;
+        this.spacer = container.querySelector('.zone-grid-spacer');
+        this.requestRender = requestRender;
+        this.cellWidth = 120; // minimum, px
+        this.rowHeight = 80; // px
+        this.overscan = 2; // rows rendered beyond each edge of the viewport
+        this.zones = [];
+        this.zoneIndex = new Map(); // zone -> index in this.zones
+        this.columns = 0;
+        this.visible = new Map(); // zone index -> cell
+        this.free = []; // recycled cells
+        this.layoutChanged = true;
+
+        // Scrolling and resizing only mark the layout; the next frame renders it
+        container.addEventListener('scroll', () => this.requestRender(), { passive: true });
+        window.addEventListener('resize', () => {
+            this.layoutChanged = true;
+            this.requestRender();
+        });
+        container.addEventListener('click', (event) => {
+            const cell = event.target.closest('.zone-cell');
+            if (cell && cell.state.zone !== null) {
+                onSelect(cell.state.zone);
+            }
+        });
+    }
+
+    setZones(zones) {
+        // Zones only change with a full snapshot; keep the cells if the list is the same
+        if (zones.length === this.zones.length && zones.every((zone, i) => zone === this.zones[i])) return;
+        this.zones = zones;
+        this.zoneIndex = new Map(zones.map((zone, i) => [zone, i]));
+        this.layoutChanged = true;
+    }
+
+    render(zoneSensors, robotZones, dirtyZones) {
+        // Read layout before writing anything so the frame triggers at most one reflow
+        const width = this.container.clientWidth;
+        const height = this.container.clientHeight;
+        const scrollTop = this.container.scrollTop;
+
+        const columns = Math.max(1, Math.floor(width / this.cellWidth));
+        const relayout = this.layoutChanged || columns !== this.columns;
+        if (relayout) {
+            this.columns = columns;
+            this.cellPixels = width / columns;
+            this.spacer.style.height = `${Math.ceil(this.zones.length / columns) * this.rowHeight}px`;
+            this.layoutChanged = false;
+        }
+
+        const rows = Math.ceil(this.zones.length / columns);
+        const firstRow = Math.max(0, Math.floor(scrollTop / this.rowHeight) - this.overscan);
+        const lastRow = Math.min(rows, Math.ceil((scrollTop + height) / this.rowHeight) + this.overscan);
+        const first = firstRow * columns;
+        const last = Math.min(this.zones.length, lastRow * columns);
+
+        // Recycle the cells that left the range
+        for (const [index, cell] of this.visible) {
+            if (relayout || index < first || index >= last) {
+                this.visible.delete(index);
+                this.free.push(cell);
+            }
+        }
+
+        for (let index = first; index < last; index++) {
+            let cell = this.visible.get(index);
+            const zone = this.zones[index];
+            if (cell === undefined) {
+                cell = this.free.pop() || this.createCell();
+                this.visible.set(index, cell);
+                this.placeCell(cell, index, zone);
+            } else if (!dirtyZones.has(zone)) {
+                continue;
+            }
+            this.patchCell(cell, zone, zoneSensors[zone], robotZones.has(zone));
+        }
+
+        this.free.forEach(cell => {
+            if (!cell.hidden) {
+                cell.hidden = true;
+                cell.state.zone = null;
+            }
+        });
+    }
+
+    createCell() {
+        const cell = document.createElement('div');
+        cell.className = 'zone-cell';
+        cell.innerHTML = '<div class="zone-cell-label"></div><div class="zone-cell-value"></div><div class="zone-cell-robot">🤖</div>';
+        cell.labelElement = cell.children[0];
+        cell.valueElement = cell.children[1];
+        cell.state = { zone: null, value: null, level: null, robot: null };
+        this.container.appendChild(cell);
+        return cell;
+    }
+
+    placeCell(cell, index, zone) {
+        const row = Math.floor(index / this.columns);
+        const column = index % this.columns;
+        cell.style.width = `${this.cellPixels}px`;
+        cell.style.transform = `translate(${column * this.cellPixels}px, ${row * this.rowHeight}px)`;
+        cell.hidden = false;
+        if (cell.state.zone !== zone) {
+            cell.state.zone = zone;
+            cell.labelElement.textContent = `Zone ${zone}`;
+            // Effects belong to the zone the cell showed before
+            cell.querySelectorAll('.zone-effect').forEach(effect => effect.remove());
+        }
+    }
+
+    patchCell(cell, zone, readings, hasRobot) {
+        const state = cell.state;
+        const moisture = readings ? readings.soil_moisture : undefined;
+        const value = moisture === undefined ? '—' : `${moisture}%`;
+        if (state.value !== value) {
+            state.value = value;
+            cell.valueElement.textContent = value;
+        }
+        let level = 'ok';
+        if (moisture === undefined) {
+            level = 'unknown';
+        } else if (moisture < MOISTURE_RANGE.low) {
+            level = 'dry';
+        } else if (moisture > MOISTURE_RANGE.high) {
+            level = 'wet';
+        }
+        if (state.level !== level) {
+            if (state.level) cell.classList.remove(`zone-${state.level}`);
+            cell.classList.add(`zone-${level}`);
+            state.level = level;
+        }
+        if (state.robot !== hasRobot) {
+            cell.classList.toggle('current-zone', hasRobot);
+            state.robot = hasRobot;
+        }
+    }
+
+    cellFor(zone) {
+        const cell = this.visible.get(this.zoneIndex.get(zone));
+        return cell && cell.state.zone === zone ? cell : null;
+    }
+
+    scrollToZone(zone) {
+        const index = this.zoneIndex.get(zone);
+        if (index === undefined) return false;
+        this.container.scrollTop = Math.floor(index / Math.max(this.columns, 1)) * this.rowHeight;
+        this.requestRender();
+        return true;
+    }
+}
+
 class GreenhouseApp {
     constructor() {
         this.isDay = true;
         this.voiceRecognitionActive = false;
         this.updateInterval = null;
+        this.eventSource = null;
+        this.status = null;
         this.currentZone = 'A';
+
+        // Updates only record what changed; one animation frame patches the DOM for all of them
+        this.dirtySections = new Set();
+        this.dirtyZones = new Set();
+        this.frameRequested = false;
+        this.renderedIsDay = null;
+        this.robotZones = new Set();
+        this.sensorElements = null; // {sensor: value element}, built on the first render
+        this.actuatorCards = null; // {actuator: card}, built on the first render
+        this.zoneGrid = null;
         this.init();
     }
 
@@ -13,8 +208,6 @@ class GreenhouseApp {
         this.setupEventListeners();
         this.startDataUpdates();
         this.setupVoiceRecognition();
-        // Apply initial night mode based on current settings
-        this.updateSensorData();
     }
 
     setupEventListeners() {
@@ -54,235 +247,245 @@ class GreenhouseApp {
             });
         }
 
+        // Actuator cards are created once; one listener serves all of them
+        const actuatorContainer = document.getElementById('actuatorControls');
+        if (actuatorContainer) {
+            actuatorContainer.addEventListener('click', (e) => {
+                const card = e.target.closest('.actuator-card');
+                if (card && card.dataset.actuator) {
+                    this.toggleActuator(card.dataset.actuator);
+                }
+            });
+        }
+
+        // Zone grid: clicking a zone moves the robot there
+        const zoneGrid = document.getElementById('zoneGrid');
+        if (zoneGrid) {
+            this.zoneGrid = new ZoneGrid(zoneGrid, () => this.scheduleRender(), (zone) => this.moveRobotToZone(zone));
+        }
+
+        // Zone search: jump to a zone in the grid
+        const zoneSearch = document.getElementById('zoneSearch');
+        if (zoneSearch) {
+            zoneSearch.addEventListener('keydown', (e) => {
+                if (e.key === 'Enter' && this.zoneGrid) {
+                    const query = zoneSearch.value.trim();
+                    const found = this.zoneGrid.scrollToZone(query) || this.zoneGrid.scrollToZone(query.toUpperCase());
+                    zoneSearch.classList.toggle('is-invalid', !found);
+                }
+            });
+        }
+
     }
 
     startDataUpdates() {
-        this.updateInterval = setInterval(() => {
-            this.updateSensorData();
-            this.updateActuatorControls();
-            this.updateRobotStatus();
-        }, 2000); // Update every 2 seconds
+        if (window.EventSource) {
+            // One connection per page: a full snapshot first, then one delta per controller tick.
+            // EventSource reconnects on its own and the server resends the snapshot.
+            this.eventSource = new EventSource('/api/stream');
+            this.eventSource.addEventListener('snapshot', (event) => {
+                this.applyStatus(JSON.parse(event.data), false);
+            });
+            this.eventSource.addEventListener('delta', (event) => {
+                this.applyStatus(JSON.parse(event.data), true);
+            });
+            this.eventSource.addEventListener('error', () => {
+                // A refused stream (503 at the server's stream limit) is closed for good rather than retried
+                if (this.eventSource.readyState === EventSource.CLOSED) {
+                    this.eventSource = null;
+                    this.startPolling();
+                }
+            });
+        } else {
+            // Fallback for browsers without Server-Sent Events
+            this.startPolling();
+        }
     }
 
-    async updateSensorData() {
+    startPolling() {
+        this.refreshStatus();
+        this.updateInterval = setInterval(() => this.refreshStatus(), 2000); // Update every 2 seconds
+    }
+
+    async refreshStatus() {
         try {
             const response = await fetch('/api/data');
             const data = await response.json();
-            
+
             if (data.error) {
                 console.error('Error fetching data:', data.error);
                 return;
             }
 
-            // Update day/night status
-            this.isDay = data.settings.is_day;
-            this.updateDayNightIcon();
-            this.applyNightMode();
-
-            // Update sensor values
-            this.updateSensors(data.sensors);
-            
-            // Update zone-specific data
-            this.updateZoneSensors(data.zone_sensors, data.robot.current_position);
+            this.applyStatus(data, false);
         } catch (error) {
-            console.error('Error updating sensor data:', error);
+            console.error('Error refreshing status:', error);
         }
     }
 
-    updateSensors(sensors) {
-        const sensorContainer = document.getElementById('sensorValues');
-        if (!sensorContainer) return;
+    applyStatus(update, isDelta) {
+        const full = !isDelta || !this.status;
+        // Site-wide readings that changed come once for all zones rather than inside every zone
+        const shared = update.zone_sensors_shared;
+        delete update.zone_sensors_shared;
+        this.status = full ? update : this.mergeStatus(this.status, update);
+        if (shared && !full) {
+            Object.values(this.status.zone_sensors || {}).forEach(readings => this.mergeStatus(readings, shared));
+        }
 
-        sensorContainer.innerHTML = `
-            <div class="sensor-card">
-                <div class="sensor-icon"><i class="fas fa-thermometer-half"></i></div>
-                <div class="sensor-details">
-                    <div class="sensor-name">Temperature</div>
-                    <div class="sensor-value">${sensors.temperature}°C</div>
-                </div>
-            </div>
-            <div class="sensor-card">
-                <div class="sensor-icon"><i class="fas fa-tint"></i></div>
-                <div class="sensor-details">
-                    <div class="sensor-name">Humidity</div>
-                    <div class="sensor-value">${sensors.humidity}%</div>
-                </div>
-            </div>
-            <div class="sensor-card">
-                <div class="sensor-icon"><i class="fas fa-ruler-vertical"></i></div>
-                <div class="sensor-details">
-                    <div class="sensor-name">Soil Moisture</div>
-                    <div class="sensor-value">${sensors.soil_moisture}%</div>
-                </div>
-            </div>
-            <div class="sensor-card">
-                <div class="sensor-icon"><i class="fas fa-sun"></i></div>
-                <div class="sensor-details">
-                    <div class="sensor-name">Light Intensity</div>
-                    <div class="sensor-value">${sensors.light_intensity}</div>
-                </div>
-            </div>
-            <div class="sensor-card">
-                <div class="sensor-icon"><i class="fas fa-wind"></i></div>
-                <div class="sensor-details">
-                    <div class="sensor-name">CO2 Level</div>
-                    <div class="sensor-value">${sensors.co2_level} ppm</div>
-                </div>
-            </div>
-            <div class="sensor-card">
-                <div class="sensor-icon"><i class="fas fa-flask"></i></div>
-                <div class="sensor-details">
-                    <div class="sensor-name">pH Level</div>
-                    <div class="sensor-value">${sensors.ph_level}</div>
-                </div>
-            </div>
-            <div class="sensor-card">
-                <div class="sensor-icon"><i class="fas fa-seedling"></i></div>
-                <div class="sensor-details">
-                    <div class="sensor-name">Nutrient Level</div>
-                    <div class.style.display='none'="sensor-value">${sensors.nutrient_level}%</div>
-                </div>
-            </div>
-        `;
+        // Record which sections and zones changed; the next frame patches only those
+        Object.keys(full ? this.status : update).forEach(section => this.dirtySections.add(section));
+        if (full) {
+            this.dirtySections.add('zones');
+            if (this.zoneGrid) {
+                this.zoneGrid.setZones(Object.keys(this.status.zone_sensors || {}));
+            }
+        } else if (update.zone_sensors) {
+            Object.keys(update.zone_sensors).forEach(zone => this.dirtyZones.add(zone));
+        }
+        this.scheduleRender();
     }
 
-
-    updateZoneSensors(zoneSensors, currentZone) {
-        // Highlight the current zone in the UI
-        Object.keys(zoneSensors).forEach(zone => {
-            const zoneElement = document.getElementById(`zone-${zone}`);
-            if (zoneElement) {
-                if (zone === currentZone) {
-                    zoneElement.classList.add('current-zone');
-                } else {
-                    zoneElement.classList.remove('current-zone');
-                }
+    mergeStatus(target, delta) {
+        Object.entries(delta).forEach(([key, value]) => {
+            const current = target[key];
+            if (value && typeof value === 'object' && !Array.isArray(value) &&
+                current && typeof current === 'object' && !Array.isArray(current)) {
+                this.mergeStatus(current, value);
+            } else {
+                target[key] = value;
             }
         });
+        return target;
     }
 
-    async updateActuatorControls() {
-        try {
-            const response = await fetch('/api/data');
-            const data = await response.json();
-            
-            if (data.error) {
-                console.error('Error fetching actuator data:', data.error);
-                return;
-            }
+    scheduleRender() {
+        if (this.frameRequested) return;
+        this.frameRequested = true;
+        requestAnimationFrame(() => this.render());
+    }
 
-            this.renderActuatorControls(data.actuators);
-        } catch (error) {
-            console.error('Error updating actuator controls:', error);
+    render() {
+        this.frameRequested = false;
+        const status = this.status;
+        if (!status) {
+            if (this.zoneGrid) this.zoneGrid.render({}, this.robotZones, this.dirtyZones);
+            return;
         }
-    }
+        const sections = this.dirtySections;
+        const fullRender = sections.has('zones');
+        this.dirtySections = new Set();
 
-    renderActuatorControls(actuators) {
-        const actuatorContainer = document.getElementById('actuatorControls');
-        if (!actuatorContainer) return;
+        // Dispatch the shared data model to the sections that changed
+        if (sections.has('sensors')) {
+            this.updateSensors(status.sensors);
+        }
+        if (sections.has('actuators')) {
+            this.updateActuatorControls(status.actuators);
+        }
+        if (sections.has('robot') || sections.has('fleet')) {
+            this.updateRobotStatus(status);
+        }
+        if (sections.has('settings')) {
+            this.setDayNight(status.settings.is_day);
+        }
 
-        actuatorContainer.innerHTML = `
-            <div class="actuator-card ${actuators.heater.is_on ? 'on' : 'off'}" data-actuator="heater">
-                <div class="actuator-icon"><i class="fas fa-fire"></i></div>
-                <div class="actuator-name">Heater</div>
-            </div>
-            <div class="actuator-card ${actuators.cooling_fan.is_on ? 'on' : 'off'}" data-actuator="cooling_fan">
-                <div class="actuator-icon"><i class="fas fa-fan"></i></div>
-                <div class="actuator-name">Cooling Fan</div>
-            </div>
-            <div class="actuator-card ${actuators.humidifier.is_on ? 'on' : 'off'}" data-actuator="humidifier">
-                <div class="actuator-icon"><i class="fas fa-cloud-rain"></i></div>
-                <div class="actuator-name">Humidifier</div>
-            </div>
-            <div class="actuator-card ${actuators.dehumidifier.is_on ? 'on' : 'off'}" data-actuator="dehumidifier">
-                <div class="actuator-icon"><i class="fas fa-compress-alt"></i></div>
-                <div class="actuator-name">Dehumidifier</div>
-            </div>
-            <div class="actuator-card ${actuators.irrigation.is_on ? 'on' : 'off'}" data-actuator="irrigation">
-                <div class="actuator-icon"><i class="fas fa-shower"></i></div>
-                <div class="actuator-name">Irrigation</div>
-            </div>
-            <div class="actuator-card ${actuators.lights.is_on ? 'on' : 'off'}" data-actuator="lights">
-                <div class="actuator-icon"><i class="fas fa-lightbulb"></i></div>
-                <div class="actuator-name">Grow Lights</div>
-            </div>
-            <div class="actuator-card ${actuators.co2_injector.is_on ? 'on' : 'off'}" data-actuator="co2_injector">
-                <div class="actuator-icon"><i class="fas fa-smog"></i></div>
-                <div class="actuator-name">CO2 Injector</div>
-            </div>
-            <div class="actuator-card ${actuators.nutrient_pump.is_on ? 'on' : 'off'}" data-actuator="nutrient_pump">
-                <div class="actuator-icon"><i class="fas fa-vial"></i></div>
-                <div class="actuator-name">Nutrient Pump</div>
-            </div>
-        `;
-
-        // Add event listeners to actuator cards
-        document.querySelectorAll('.actuator-card').forEach(card => {
-            card.addEventListener('click', (e) => {
-                const actuator = e.currentTarget.dataset.actuator;
-                if (actuator) {
-                    this.toggleActuator(actuator);
-                }
-            });
-        });
+        if (this.zoneGrid) {
+            const dirtyZones = fullRender ? new Set(this.zoneGrid.zones) : this.dirtyZones;
+            this.zoneGrid.render(status.zone_sensors || {}, this.robotZones, dirtyZones);
+            const zoneCount = document.getElementById('zoneCount');
+            if (zoneCount && fullRender) {
+                zoneCount.textContent = `${this.zoneGrid.zones.length} zones`;
+            }
+        }
+        this.dirtyZones = new Set();
     }
 
+    updateSensors(sensors) {
+        const sensorContainer = document.getElementById('sensorValues');
+        if (!sensorContainer) return;
 
-    async updateRobotStatus() {
-        try {
-            const response = await fetch('/api/data');
-            const data = await response.json();
-            
-            if (data.error) {
-                console.error('Error fetching robot data:', data.error);
-                return;
-            }
+        if (this.sensorElements === null) {
+            sensorContainer.innerHTML = SENSOR_DISPLAY.map(sensor => `
+            <div class="sensor-card${this.isDay ? '' : ' night-mode'}">
+                <div class="sensor-icon"><i class="fas ${sensor.icon}"></i></div>
+                <div class="sensor-details">
+                    <div class="sensor-name">${sensor.name}</div>
+                    <div class="sensor-value" data-sensor="${sensor.key}"></div>
+                </div>
+            </div>`).join('');
+            this.sensorElements = {};
+            sensorContainer.querySelectorAll('.sensor-value').forEach(element => {
+                this.sensorElements[element.dataset.sensor] = element;
+            });
+        }
 
-            this.currentZone = data.robot.current_position;
+        // Patch only the values that changed
+        SENSOR_DISPLAY.forEach(sensor => {
+            const element = this.sensorElements[sensor.key];
+            const value = sensors[sensor.key] === undefined ? '—' : `${sensors[sensor.key]}${sensor.unit}`;
+            if (element.textContent !== value) {
+                element.textContent = value;
+            }
+        });
+    }
 
-            // Update robot position in UI
-            const robotPosition = document.getElementById('robotPosition');
+    updateActuatorControls(actuators) {
+        const actuatorContainer = document.getElementById('actuatorControls');
+        if (!actuatorContainer) return;
 
-            if (robotPosition) {
-                robotPosition.textContent = `Zone ${data.robot.current_position}`;
-            }
+        if (this.actuatorCards === null) {
+            actuatorContainer.innerHTML = Object.keys(actuators).map(actuator => {
+                const display = ACTUATOR_DISPLAY[actuator] || { name: actuator.replace(/_/g, ' '), icon: 'fa-power-off' };
+                return `
+            <div class="actuator-card" data-actuator="${actuator}">
+                <div class="actuator-icon"><i class="fas ${display.icon}"></i></div>
+                <div class="actuator-name">${display.name}</div>
+            </div>`;
+            }).join('');
+            this.actuatorCards = {};
+            actuatorContainer.querySelectorAll('.actuator-card').forEach(card => {
+                this.actuatorCards[card.dataset.actuator] = card;
+            });
+        }
 
-            // Update robot state
-            const robotState = document.getElementById('robotState');
-            if (robotState) {
-                robotState.textContent = data.robot.state;
+        Object.entries(actuators).forEach(([actuator, status]) => {
+            const card = this.actuatorCards[actuator];
+            if (card && card.isOn !== status.is_on) {
+                card.isOn = status.is_on;
+                card.classList.toggle('on', status.is_on);
+                card.classList.toggle('off', !status.is_on);
             }
-            
-            // Update robot position indicator on greenhouse layout
-            this.updateRobotPositionIndicator(data.robot.current_position);
-        } catch (error) {
-            console.error('Error updating robot status:', error);
-        }
+        });
     }
-    
-    updateRobotPositionIndicator(zone) {
-        // Get the robot indicator element
-        const robotIndicator = document.getElementById('robot-indicator');
-        if (!robotIndicator) return;
 
-        // Define positions for each zone
-        const zonePositions = {
-            'A': { top: '20%', left: '20%' },
-            'B': { top: '20%', left: '80%' },
-            'C': { top: '80%', left: '20%' },
-            'D': { top: '80%', left: '80%' }
-        };
 
-        // Update position with animation if zone is valid
-        if (zonePositions[zone]) {
-            // Add transition for smooth movement
-            robotIndicator.style.transition = 'top 1s ease, left 1s ease';
-            robotIndicator.style.top = zonePositions[zone].top;
-            robotIndicator.style.left = zonePositions[zone].left;
+    updateRobotStatus(data) {
+        this.currentZone = data.robot.current_position;
 
-            // Add tractor animation effect
-            robotIndicator.innerHTML = '<i class="fas fa-tractor"></i>';
+        // Update robot position in UI
+        const robotPosition = document.getElementById('robotPosition');
+        const position = `Zone ${data.robot.current_position}`;
+        if (robotPosition && robotPosition.textContent !== position) {
+            robotPosition.textContent = position;
         }
+
+        // Update robot state
+        const robotState = document.getElementById('robotState');
+        if (robotState && robotState.textContent !== data.robot.state) {
+            robotState.textContent = data.robot.state;
+        }
+        
+        // Mark the zones robots are in; only zones that gained or lost a robot are repainted
+        const robots = data.fleet && data.fleet.robots ? data.fleet.robots : [data.robot];
+        const robotZones = new Set(robots.map(robot => robot.current_position));
+        robotZones.forEach(zone => {
+            if (!this.robotZones.has(zone)) this.dirtyZones.add(zone);
+        });
+        this.robotZones.forEach(zone => {
+            if (!robotZones.has(zone)) this.dirtyZones.add(zone);
+        });
+        this.robotZones = robotZones;
     }
 
 
@@ -293,6 +496,15 @@ class GreenhouseApp {
         }
     }
 
+    setDayNight(isDay) {
+        // Restyling touches every card, so only do it when the mode actually changes
+        this.isDay = isDay;
+        if (this.renderedIsDay === isDay) return;
+        this.renderedIsDay = isDay;
+        this.updateDayNightIcon();
+        this.applyNightMode();
+    }
+
     async toggleDayNight() {
         try {
             const response = await fetch('/api/toggle_day_night', {
@@ -301,9 +513,7 @@ class GreenhouseApp {
             const result = await response.json();
             
             if (result.success) {
-                this.isDay = result.is_day;
-                this.updateDayNightIcon();
-                this.applyNightMode();
+                this.setDayNight(result.is_day);
             } else {
                 console.error('Error toggling day/night:', result.error);
             }
@@ -336,31 +546,17 @@ class GreenhouseApp {
             button.classList.toggle('night-mode', !this.isDay);
         });
         
-        // Toggle night mode class on zone labels
-        document.querySelectorAll('.zone-label').forEach(label => {
-            label.classList.toggle('night-mode', !this.isDay);
-        });
-        
-        // Toggle night mode class on current zones
-        document.querySelectorAll('.current-zone').forEach(zone => {
-            zone.classList.toggle('night-mode', !this.isDay);
-        });
+        // Toggle night mode class on the zone grid; its cells are styled through it, recycled or not
+        const zoneGrid = document.getElementById('zoneGrid');
+        if (zoneGrid) {
+            zoneGrid.classList.toggle('night-mode', !this.isDay);
+        }
         
         // Toggle night mode class on alerts
         document.querySelectorAll('.alert').forEach(alert => {
             alert.classList.toggle('night-mode', !this.isDay);
         });
         
-        // Toggle night mode class on outline buttons
-        document.querySelectorAll('.btn-outline-primary').forEach(button => {
-            button.classList.toggle('night-mode', !this.isDay);
-        });
-        
-        // Toggle night mode class on zone views
-        document.querySelectorAll('.zone-view').forEach(view => {
-            view.classList.toggle('night-mode', !this.isDay);
-        });
-        
         // Toggle night mode class on greenhouse view
         document.querySelectorAll('.greenhouse-view').forEach(view => {
             view.classList.toggle('night-mode', !this.isDay);
@@ -396,7 +592,7 @@ class GreenhouseApp {
             
             if (result.success) {
                 // Update the UI to reflect the new state
-                await this.updateActuatorControls();
+                await this.refreshStatus();
             } else {
                 console.error('Error toggling actuator:', result.error);
             }
@@ -419,7 +615,7 @@ class GreenhouseApp {
             if (result.success) {
                 console.log(result.message);
                 // Update UI
-                await this.updateRobotStatus();
+                await this.refreshStatus();
             } else {
                 console.error('Error moving robot:', result.error);
             }
@@ -498,19 +694,9 @@ class GreenhouseApp {
     }
 
     showZoneEffect(zone, effectType) {
-        // Show visual effect for operations
-        const greenhouseView = document.querySelector('.greenhouse-view .position-relative');
-        if (!greenhouseView) return;
-        
-        // Get zone position
-        const zonePositions = {
-            'A': { top: '20%', left: '20%' },
-            'B': { top: '20%', left: '80%' },
-            'C': { top: '80%', left: '20%' },
-            'D': { top: '80%', left: '80%' }
-        };
-        
-        if (!zonePositions[zone]) return;
+        // Show visual effect for operations on the zone's cell, if it is in view
+        const cell = this.zoneGrid ? this.zoneGrid.cellFor(zone) : null;
+        if (!cell) return;
         
         // Create effect element
         const effectElement = document.createElement('div');
@@ -536,12 +722,11 @@ class GreenhouseApp {
                 effectElement.innerHTML = '●';
         }
         
-        // Position the effect
-        effectElement.style.top = zonePositions[zone].top;
-        effectElement.style.left = zonePositions[zone].left;
+        // Centre the effect on the cell
+        effectElement.style.top = '50%';
+        effectElement.style.left = '50%';
         
-        // Add to greenhouse view
-        greenhouseView.appendChild(effectElement);
+        cell.appendChild(effectElement);
         
         // Remove after animation completes
         setTimeout(() => {
@@ -576,10 +761,10 @@ class GreenhouseApp {
     setupVoiceRecognition() {
         // Voice command processing with synonyms
         this.voiceCommands = {
-            'move to zone': (zone) => this.moveRobotToZone(zone.toUpperCase()),
-            'water zone': (zone) => this.waterZone(zone.toUpperCase()),
-            'apply manure to zone': (zone) => this.applyManureToZone(zone.toUpperCase()),
-            'fertilize zone': (zone) => this.applyFertilizerToZone(zone.toUpperCase()),
+            'move to zone': (zone) => this.moveRobotToZone(zone),
+            'water zone': (zone) => this.waterZone(zone),
+            'apply manure to zone': (zone) => this.applyManureToZone(zone),
+            'fertilize zone': (zone) => this.applyFertilizerToZone(zone),
             'toggle day night': () => this.toggleDayNight(),
             'turn on heater': () => this.toggleActuator('heater'),
             'turn off heater': () => this.toggleActuator('heater'),
@@ -701,9 +886,15 @@ class GreenhouseApp {
 
         for (const [key, func] of Object.entries(this.voiceCommands)) {
             if (command.includes(key)) {
-                // Extract zone if needed
-                const zoneMatch = command.match(/zone ([a-d])/);
-                const zone = zoneMatch ? zoneMatch[1] : null;
+                // Extract zone if needed, as one of the zone IDs the controller reports
+                const zoneMatch = command.match(/zone (\w+)/);
+                const zone = zoneMatch ? this.resolveZone(zoneMatch[1]) : null;
+                if (key.endsWith('zone') && !zone) {
+                    const unknownMessage = zoneMatch ? `Sorry, there is no zone ${zoneMatch[1]}` : "Please say which zone";
+                    this.showVoiceFeedback(command, unknownMessage);
+                    this.speakResponse(unknownMessage);
+                    return false;
+                }
 
                 // Get response message
                 let responseMessage = "";
@@ -738,6 +929,14 @@ class GreenhouseApp {
         return false;
     }
 
+    resolveZone(spoken) {
+        // Speech comes lower-case and may drop leading zeros ("zone z12" for Z00012)
+        const normalize = (zone) => zone.toUpperCase().replace(/^(\D*)0+(?=\d)/, '$1');
+        const wanted = normalize(spoken);
+        const zones = this.zoneGrid ? this.zoneGrid.zones : Object.keys((this.status && this.status.zone_sensors) || {});
+        return zones.find(zone => normalize(zone) === wanted) || null;
+    }
+
     showVoiceFeedback(command, response) {
         const feedbackElement = document.getElementById('voiceFeedback');
         const commandElement = document.getElementById('voiceCommandText');
@@ -0,0 +1,129 @@
+"""
+Server-Sent Events broadcaster for the Smart Greenhouse
+Pushes one status delta per controller tick to every connected dashboard. Each stream holds
+a server thread for as long as it is open, so the number of streams is capped; dashboards
+turned away poll /api/data instead.
+"""
+import json
+import queue
+import threading
+
+from records import json_default
+
+
+def diff_status(old, new):
+    """Return the parts of new that differ from old; keys missing from new map to None"""
+    delta = {}
+    for key, value in new.items():
+        if key not in old:
+            delta[key] = value
+        elif isinstance(value, dict) and isinstance(old[key], dict):
+            nested = diff_status(old[key], value)
+            if nested:
+                delta[key] = nested
+        elif hasattr(value, "diff"):
+            # Zone tables compare their arrays instead of per-zone dicts
+            nested = value.diff(old[key])
+            if nested:
+                delta[key] = nested
+            if hasattr(value, "shared_diff"):
+                # Readings every zone shares go once, next to the table, instead of into each zone
+                shared = value.shared_diff(old[key])
+                if shared:
+                    delta[f"{key}_shared"] = shared
+        elif old[key] != value:
+            delta[key] = value
+    for key in old.keys() - new.keys():
+        delta[key] = None
+    return delta
+
+
+def _encode_event(event, version, data):
+    """Encode one SSE message; done once per publish and shared by all clients"""
+    body = json.dumps(data, separators=(",", ":"), default=json_default)
+    return f"event: {event}\nid: {version}\ndata: {body}\n\n".encode("utf-8")
+
+
+class StatusBroadcaster:
+    def __init__(self, queue_size=8, heartbeat_interval=15, max_clients=48):
+        self.queue_size = queue_size  # Messages buffered per client before it is resynced
+        self.heartbeat_interval = heartbeat_interval  # seconds
+        self.max_clients = max_clients  # Streams open at once; None for no limit
+        self._clients = set()
+        self._lock = threading.Lock()
+        self._snapshot = None
+        self._version = 0
+        self._snapshot_message = None
+
+    def publish(self, snapshot, version):
+        """Send the delta between the previous and the new snapshot to every client"""
+        with self._lock:
+            previous = self._snapshot
+            self._snapshot = snapshot
+            self._version = version
+            self._snapshot_message = None
+            clients = list(self._clients)
+
+        if previous is None or not clients:
+            return
+        delta = diff_status(previous, snapshot)
+        if not delta:
+            return
+
+        message = _encode_event("delta", version, delta)
+        for client in clients:
+            self._offer(client, message)
+
+    def _offer(self, client, message):
+        """Queue a message without blocking; a client that fell behind is resynced with a full snapshot"""
+        try:
+            client.put_nowait(message)
+        except queue.Full:
+            # Deltas are only valid in sequence, so drop the backlog rather than skip one
+            while True:
+                try:
+                    client.get_nowait()
+                except queue.Empty:
+                    break
+            with self._lock:
+                client.put_nowait(self._snapshot_message_locked())
+
+    def _snapshot_message_locked(self):
+        """Get the full-snapshot message for the current version, encoding it at most once"""
+        if self._snapshot_message is None and self._snapshot is not None:
+            self._snapshot_message = _encode_event("snapshot", self._version, self._snapshot)
+        return self._snapshot_message
+
+    def subscribe(self):
+        """Register a client queue, primed with the current full snapshot; None if max_clients are connected"""
+        client = queue.Queue(maxsize=self.queue_size)
+        with self._lock:
+            if self.max_clients is not None and len(self._clients) >= self.max_clients:
+                return None
+            # Priming and registering under one lock so no delta falls in between
+            message = self._snapshot_message_locked()
+            if message is not None:
+                client.put_nowait(message)
+            self._clients.add(client)
+        return client
+
+    def unsubscribe(self, client):
+        """Remove a client queue"""
+        with self._lock:
+            self._clients.discard(client)
+
+    def client_count(self):
+        """Number of connected clients"""
+        return len(self._clients)
+
+    def stream(self, client):
+        """Generator of SSE messages for a subscribed client, for use as a streaming response body"""
+        try:
+            while True:
+                try:
+                    yield client.get(timeout=self.heartbeat_interval)
+                except queue.Empty:
+                    # Comment line keeps proxies from closing an idle connection
+                    yield b": keepalive\n\n"
+        finally:
+            self.unsubscribe(client)
@@ -0,0 +1,58 @@
+"""
+Pre-serialized status payload for the Smart Greenhouse API
+Each status snapshot is encoded to JSON (and gzip) once, so HTTP handlers only serve cached bytes
+"""
+import gzip
+import json
+import time
+
+from records import json_default
+
+# Distinguishes ETags issued by this process from those of an earlier run
+_EPOCH = "%x" % int(time.time())
+
+
+class StatusPayload:
+    def __init__(self, body, version, compress=True, previous_modified=None):
+        self.body = body
+        self.version = version
+        self.gzip_body = gzip.compress(body, compresslevel=6) if compress else None
+        self.etag = f"{_EPOCH}-{version}"
+        self.gzip_etag = f"{self.etag}-gz"  # The gzip body is a different representation, so it gets its own tag
+        # HTTP dates only have one-second resolution and must not lie in the future. Versions within the
+        # same second share a date, so a date from that second cannot tell them apart; the ETag does
+        self.last_modified = float(int(time.time()))
+        if previous_modified is not None:
+            self.last_modified = max(self.last_modified, previous_modified)
+        self.shares_second = self.last_modified == previous_modified
+
+    @classmethod
+    def encode(cls, snapshot, previous=None, compress=True):
+        """Encode a snapshot, reusing the previous payload if nothing changed"""
+        body = json.dumps(snapshot, separators=(",", ":"), default=json_default).encode("utf-8")
+        return cls.from_body(body, previous, compress)
+
+    @classmethod
+    def from_body(cls, body, previous=None, compress=True):
+        """Wrap an already encoded JSON body, reusing the previous payload if the body is the same"""
+        if previous is not None and previous.body == body:
+            return previous
+        if previous is None:
+            return cls(body, 1, compress=compress)
+        return cls(body, previous.version + 1, compress=compress, previous_modified=previous.last_modified)
+
+    def etag_for(self, gzipped=False):
+        return self.gzip_etag if gzipped else self.etag
+
+    def is_fresh(self, etags=None, modified_since=None, gzipped=False):
+        """Check a client's cached copy of one representation against this payload
+
+        If-Modified-Since is only consulted when there is no If-None-Match (RFC 9110, 13.1.3). A copy
+        dated in the second this version was made may be an earlier version, so it is never fresh.
+        """
+        if etags:
+            return etags.contains_weak(self.etag_for(gzipped))
+        if modified_since is not None:
+            since = modified_since.timestamp()
+            return self.last_modified < since or (self.last_modified == since and not self.shares_second)
+        return False
@@ -0,0 +1,373 @@
+"""
+Persistent telemetry log for the Smart Greenhouse
+An append-only binary log of fixed-width records (sensor samples, zone effects, actuator,
+robot and setting events) split into rotating segments. Segments are replayed through
+mmap as NumPy record arrays, so restoring state needs no per-record parsing. Every segment
+starts with a checkpoint (the latest effect, actuator, robot and setting records), so state
+survives the deletion of older segments.
+"""
+import glob
+import json
+import mmap
+import os
+import threading
+import time
+
+import numpy as np
+
+from records import RobotOperation
+from sim_clock import SYSTEM_CLOCK
+
+# 24-byte little-endian record; "code" and "zone" index into the segment's manifest
+RECORD_DTYPE = np.dtype([
+    ("timestamp", "<f8"),
+    ("kind", "<u2"),
+    ("code", "<u2"),
+    ("zone", "<u4"),
+    ("value", "<f8"),
+])
+
+# Record kinds
+SAMPLE = 0  # code: metric, zone: zone (SITE_ZONE for a site-wide reading), value: reading
+EFFECT = 1  # code: effect type, zone: zone, value: effect level
+ACTUATOR = 2  # code: actuator, value: 1 on / 0 off
+ROBOT_BATTERY = 3  # code: robot, value: battery level
+ROBOT_OPERATION = 4  # code: robot, zone: zone, value: operation
+SETTING = 5  # code: setting, value: setting value
+
+ROBOT_OPERATIONS = ("move", "watering", "manure", "fertilizer")
+SETTINGS = ("is_day",)
+
+SITE_ZONE = 0xFFFFFFFF  # Zone of a sample that holds for every zone
+
+
+class TelemetryWriter:
+    """Buffers records in memory, writes them per flush and fsyncs at most every fsync_interval.
+
+    This run's first segment is opened by open(), or by the first flush.
+    """
+
+    def __init__(self, directory, manifest, segment_bytes=64 * 1024 * 1024, fsync_interval=5.0, max_segments=48,
+                 checkpoint=None):
+        self.directory = directory
+        self.manifest = manifest
+        self.checkpoint = checkpoint  # Callable returning the records that open each segment
+        self.segment_bytes = segment_bytes
+        self.fsync_interval = fsync_interval
+        self.max_segments = max_segments
+        self._pending = []
+        self._lock = threading.Lock()
+        self._file = None
+        self._last_fsync = time.monotonic()
+
+        os.makedirs(directory, exist_ok=True)
+        existing = segment_paths(directory)
+        self._segment_number = int(os.path.basename(existing[-1])[10:16]) if existing else 0
+
+    def open(self):
+        """Start this run's first segment, unless it is already open"""
+        with self._lock:
+            if self._file is None:
+                self._open_segment()
+
+    def is_open(self):
+        return self._file is not None
+
+    def _open_segment(self):
+        """Start a new segment file with its own manifest"""
+        if self._file is not None:
+            self._file.close()
+        self._segment_number += 1
+        base = os.path.join(self.directory, f"telemetry-{self._segment_number:06d}")
+        with open(base + ".json", "w") as manifest_file:
+            json.dump(self.manifest, manifest_file)
+        self._file = open(base + ".log", "ab")
+        self._segment_size = 0
+        if self.checkpoint is not None:
+            data = self.checkpoint().tobytes()
+            self._file.write(data)
+            self._segment_size += len(data)
+
+        # Older segments are only deleted once the new one holds the state they carried
+        if self.max_segments:
+            for old in segment_paths(self.directory)[:-self.max_segments]:
+                os.remove(old)
+                os.remove(old[:-4] + ".json")
+
+    def append(self, records):
+        """Queue a record array for the next flush"""
+        with self._lock:
+            self._pending.append(records.tobytes())
+
+    def flush(self, force_fsync=False):
+        """Write queued records; fsync only when the interval has passed (or when forced)"""
+        with self._lock:
+            if self._file is None:
+                self._open_segment()
+            data, self._pending = b"".join(self._pending), []
+            if data:
+                if self._segment_size and self._segment_size + len(data) > self.segment_bytes:
+                    self._open_segment()
+                self._file.write(data)
+                self._segment_size += len(data)
+            now = time.monotonic()
+            if force_fsync or now - self._last_fsync >= self.fsync_interval:
+                self._file.flush()
+                os.fsync(self._file.fileno())
+                self._last_fsync = now
+
+    def close(self):
+        self.flush(force_fsync=True)
+        with self._lock:
+            self._file.close()
+
+
+def segment_paths(directory):
+    """Segment log files in write order"""
+    return sorted(glob.glob(os.path.join(directory, "telemetry-[0-9][0-9][0-9][0-9][0-9][0-9].log")))
+
+
+def read_segments(directory):
+    """Yield (manifest, records) per segment; records is a zero-copy view of the mmapped file"""
+    for path in segment_paths(directory):
+        with open(path[:-4] + ".json") as manifest_file:
+            manifest = json.load(manifest_file)
+        with open(path, "rb") as log_file:
+            size = os.fstat(log_file.fileno()).st_size
+            # A crash can leave a partial record at the end; it is ignored
+            count = size // RECORD_DTYPE.itemsize
+            if count == 0:
+                continue
+            mapped = mmap.mmap(log_file.fileno(), 0, access=mmap.ACCESS_READ)
+        yield manifest, np.frombuffer(mapped, dtype=RECORD_DTYPE, count=count)
+
+
+def _last_per_key(records, key):
+    """Indices of the last record for each distinct key"""
+    reversed_keys = key[::-1]
+    _, first_in_reversed = np.unique(reversed_keys, return_index=True)
+    return len(key) - 1 - first_in_reversed
+
+
+class TelemetryLog:
+    """Encodes controller events as telemetry records and restores controller state from them"""
+
+    def __init__(self, directory, zones, metrics, effect_types, actuators, robot_ids, clock=SYSTEM_CLOCK,
+                 **writer_options):
+        self.directory = directory
+        self.clock = clock
+        self.manifest = {
+            "zones": list(zones),
+            "metrics": list(metrics),
+            "effect_types": list(effect_types),
+            "actuators": list(actuators),
+            "robots": list(robot_ids),
+            "robot_operations": list(ROBOT_OPERATIONS),
+            "settings": list(SETTINGS),
+        }
+        self._index = {name: {item: i for i, item in enumerate(items)} for name, items in self.manifest.items()}
+
+        # Latest state records, written as the checkpoint at the start of each segment
+        self._state_lock = threading.Lock()
+        effect_count = len(self.manifest["effect_types"])
+        self._effects = self._records(len(self.manifest["zones"]) * effect_count, 0.0, EFFECT)
+        self._effects["zone"] = np.repeat(np.arange(len(self.manifest["zones"])), effect_count)
+        self._effects["code"] = np.tile(np.arange(effect_count), len(self.manifest["zones"]))
+        self._effects_logged = np.zeros(len(self._effects), dtype=bool)
+        self._latest = {}  # (kind, code) -> record, for actuator, robot and setting records
+        self.writer = TelemetryWriter(directory, self.manifest, checkpoint=self.checkpoint_records, **writer_options)
+
+    def _records(self, count, timestamp, kind):
+        records = np.zeros(count, dtype=RECORD_DTYPE)
+        records["timestamp"] = timestamp
+        records["kind"] = kind
+        return records
+
+    def _remember(self, records):
+        """Keep the latest state records for the next checkpoint"""
+        is_effect = records["kind"] == EFFECT
+        effects = records[is_effect]
+        cells = effects["zone"].astype(np.int64) * len(self.manifest["effect_types"]) + effects["code"]
+        with self._state_lock:
+            self._effects[cells] = effects
+            self._effects_logged[cells] = True
+            for record in records[~is_effect]:
+                self._latest[(int(record["kind"]), int(record["code"]))] = record.copy()
+
+    def checkpoint_records(self):
+        """The latest record of every effect cell, actuator, robot and setting"""
+        with self._state_lock:
+            latest = np.array(list(self._latest.values()), dtype=RECORD_DTYPE)
+            return np.concatenate([self._effects[self._effects_logged], latest])
+
+    def log_samples(self, timestamp, readings):
+        """Log one tick of readings: {metric: scalar or per-zone array}; scalars are logged once, not per zone"""
+        zone_count = len(self.manifest["zones"])
+        metrics = self.manifest["metrics"]
+        site_codes = [code for code, metric in enumerate(metrics) if np.ndim(readings[metric]) == 0]
+        zone_codes = [code for code, metric in enumerate(metrics) if np.ndim(readings[metric]) != 0]
+        records = self._records(len(site_codes) + len(zone_codes) * zone_count, timestamp, SAMPLE)
+        site, zones = records[:len(site_codes)], records[len(site_codes):]
+        site["code"] = site_codes
+        site["zone"] = SITE_ZONE
+        site["value"] = [readings[metrics[code]] for code in site_codes]
+        zones["code"] = np.repeat(zone_codes, zone_count)
+        zones["zone"] = np.tile(np.arange(zone_count), len(zone_codes))
+        if zone_codes:
+            zones["value"] = np.concatenate([readings[metrics[code]] for code in zone_codes])
+        self.writer.append(records)
+
+    def log_effects(self, timestamp, zone_rows, effect_columns, values):
+        """Log zone effect levels for the given (zone row, effect column) cells"""
+        records = self._records(len(values), timestamp, EFFECT)
+        records["zone"] = zone_rows
+        records["code"] = effect_columns
+        records["value"] = values
+        if len(records):
+            self._remember(records)
+        self.writer.append(records)
+
+    def log_actuator(self, timestamp, actuator, is_on):
+        records = self._records(1, timestamp, ACTUATOR)
+        records["code"] = self._index["actuators"][actuator]
+        records["value"] = 1.0 if is_on else 0.0
+        self._remember(records)
+        self.writer.append(records)
+
+    def log_robot(self, timestamp, robot_id, battery_level, operation=None, zone=None):
+        """Log a robot's battery level, and the operation it just completed if any"""
+        code = self._index["robots"][robot_id]
+        records = self._records(2 if operation else 1, timestamp, ROBOT_BATTERY)
+        records["code"] = code
+        records["value"][0] = battery_level
+        if operation:
+            records["kind"][1] = ROBOT_OPERATION
+            records["zone"][1] = self._index["zones"][zone]
+            records["value"][1] = self._index["robot_operations"][operation]
+        self._remember(records)
+        self.writer.append(records)
+
+    def log_setting(self, timestamp, setting, value):
+        records = self._records(1, timestamp, SETTING)
+        records["code"] = self._index["settings"][setting]
+        records["value"] = float(value)
+        self._remember(records)
+        self.writer.append(records)
+
+    def flush(self, force_fsync=False):
+        self.writer.flush(force_fsync)
+
+    def close(self):
+        self.writer.close()
+
+    def replay(self, history=None):
+        """Restore the last known state from every segment, feeding samples into history if given.
+
+        This run's segment is only opened afterwards, so its rotation never deletes a segment
+        before it has been read. Returns {"zone_effects", "actuators", "robots", "settings"} keyed by name.
+        """
+        state = {"zone_effects": {}, "actuators": {}, "robots": {}, "settings": {}}
+        for manifest, records in read_segments(self.directory):
+            if len(records) == 0:
+                continue
+            kinds = records["kind"]
+            self._restore_effects(state, manifest, records[kinds == EFFECT])
+            self._restore_simple(state["actuators"], manifest["actuators"], records[kinds == ACTUATOR], bool)
+            self._restore_simple(state["settings"], manifest["settings"], records[kinds == SETTING], bool)
+            self._restore_robots(state, manifest, records[kinds == ROBOT_BATTERY], records[kinds == ROBOT_OPERATION])
+            if history is not None:
+                self._replay_samples(history, manifest, records[kinds == SAMPLE])
+        self._checkpoint_state(state)
+        self.writer.open()
+        return state
+
+    def _checkpoint_state(self, state):
+        """Carry replayed state into this run's checkpoints and the current segment"""
+        rows = []  # (timestamp, kind, code, zone, value), indexed by this log's manifest
+        now = self.clock.time()
+        zones, effect_types = self._index["zones"], self._index["effect_types"]
+        for zone, effects in state["zone_effects"].items():
+            for effect_type, value in effects.items():
+                if zone in zones and effect_type in effect_types:
+                    rows.append((now, EFFECT, effect_types[effect_type], zones[zone], value))
+        for kind, name in ((ACTUATOR, "actuators"), (SETTING, "settings")):
+            for item, value in state[name].items():
+                if item in self._index[name]:
+                    rows.append((now, kind, self._index[name][item], 0, float(value)))
+        for robot_id, robot in state["robots"].items():
+            code = self._index["robots"].get(robot_id)
+            if code is None:
+                continue
+            if "battery_level" in robot:
+                rows.append((now, ROBOT_BATTERY, code, 0, robot["battery_level"]))
+            operation = robot.get("last_operation")
+            if operation is not None and operation.zone in zones:
+                rows.append((operation.timestamp, ROBOT_OPERATION, code, zones[operation.zone],
+                             self._index["robot_operations"][operation.operation]))
+        if rows:
+            records = np.array(rows, dtype=RECORD_DTYPE)
+            self._remember(records)
+            if self.writer.is_open():
+                self.writer.append(records)  # Otherwise they open the new segment as its checkpoint
+
+    @staticmethod
+    def _restore_simple(target, names, records, convert):
+        if len(records) == 0:
+            return
+        for i in _last_per_key(records, records["code"].astype(np.int64)):
+            target[names[records["code"][i]]] = convert(records["value"][i])
+
+    @staticmethod
+    def _restore_effects(state, manifest, records):
+        if len(records) == 0:
+            return
+        key = records["zone"].astype(np.int64) * len(manifest["effect_types"]) + records["code"]
+        for i in _last_per_key(records, key):
+            zone = manifest["zones"][records["zone"][i]]
+            effect_type = manifest["effect_types"][records["code"][i]]
+            state["zone_effects"].setdefault(zone, {})[effect_type] = float(records["value"][i])
+
+    @staticmethod
+    def _restore_robots(state, manifest, battery_records, operation_records):
+        for i in (_last_per_key(battery_records, battery_records["code"].astype(np.int64))
+                  if len(battery_records) else []):
+            robot = state["robots"].setdefault(manifest["robots"][battery_records["code"][i]], {})
+            robot["battery_level"] = float(battery_records["value"][i])
+        for i in (_last_per_key(operation_records, operation_records["code"].astype(np.int64))
+                  if len(operation_records) else []):
+            record = operation_records[i]
+            robot = state["robots"].setdefault(manifest["robots"][record["code"]], {})
+            zone = manifest["zones"][record["zone"]]
+            robot["current_position"] = zone
+            robot["last_operation"] = RobotOperation(manifest["robot_operations"][int(record["value"])], zone,
+                                                     float(record["timestamp"]))
+
+    @staticmethod
+    def _replay_samples(history, manifest, records):
+        """Feed logged ticks into the history store, one vectorized row per tick"""
+        if len(records) == 0:
+            return
+        metric_rows = {metric: i for i, metric in enumerate(manifest["metrics"])}
+        zone_rows = np.array([history.zone_index.get(zone, -1) for zone in manifest["zones"]])
+        row = np.full((len(manifest["metrics"]) + 1, len(history.zones)), np.nan)  # Last row: missing metric
+        site_row = np.full(len(manifest["metrics"]) + 1, np.nan)
+
+        # Samples of one tick are written together, so each run of equal timestamps is a tick
+        timestamps = records["timestamp"]
+        bounds = [0] + (np.flatnonzero(np.diff(timestamps)) + 1).tolist() + [len(records)]
+        for first, last in zip(bounds, bounds[1:]):
+            # A metric or zone missing from this tick is NaN, not the previous tick's value
+            row.fill(np.nan)
+            site_row.fill(np.nan)
+            tick_records = records[first:last]
+            site = tick_records["zone"] == SITE_ZONE
+            site_records = tick_records[site]
+            row[site_records["code"]] = site_records["value"][:, None]
+            zone_records = tick_records[~site]
+            zones = zone_rows[zone_records["zone"]]
+            known = zones >= 0
+            row[zone_records["code"][known], zones[known]] = zone_records["value"][known]
+            site_row[site_records["code"]] = site_records["value"]
+            readings = {metric: row[metric_rows.get(metric, -1)] for metric in history.zone_metrics}
+            readings.update({metric: site_row[metric_rows.get(metric, -1)] for metric in history.site_metrics})
+            history.record(float(timestamps[first]), readings)
@@ -0,0 +1,112 @@
+"""
+Timer scheduler for the Smart Greenhouse
+A single heap-backed thread that runs every delayed job (such as zone effect decay)
+"""
+import heapq
+import itertools
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class TimerScheduler:
+    def __init__(self, clock=time.monotonic, start_thread=True):
+        self._clock = clock
+        self._heap = []  # (due, seq, key) entries; at most one live entry per key
+        self._timers = {}  # key -> [due, callback, seq of its live heap entry]
+        self._counter = itertools.count()
+        self._condition = threading.Condition()
+
+        self.thread = None
+        if start_thread:
+            self.thread = threading.Thread(target=self._run, daemon=True)
+            self.thread.start()
+
+    def schedule(self, key, delay, callback):
+        """Arm the timer for key, replacing any pending one.
+
+        callback(key) runs after delay seconds and returns the delay until it should
+        run again, or None to finish. Re-arming a pending key costs no extra heap entry
+        when the new due time is later, which is the usual case.
+        """
+        due = self._clock() + delay
+        with self._condition:
+            timer = self._timers.get(key)
+            if timer is not None and timer[0] <= due:
+                # The existing heap entry fires first and is pushed back to the new due time
+                timer[0] = due
+                timer[1] = callback
+                return
+            seq = next(self._counter)
+            self._timers[key] = [due, callback, seq]
+            heapq.heappush(self._heap, (due, seq, key))
+            self._condition.notify()
+
+    def cancel(self, key):
+        """Cancel the pending timer for key, if any"""
+        with self._condition:
+            return self._timers.pop(key, None) is not None
+
+    def pending_count(self):
+        """Number of armed timers"""
+        return len(self._timers)
+
+    def heap_size(self):
+        """Number of heap entries, including ones left behind by cancelled timers"""
+        return len(self._heap)
+
+    def run_due(self, now=None):
+        """Run every timer that is due; returns the number of callbacks run"""
+        if now is None:
+            now = self._clock()
+
+        due_timers = []
+        with self._condition:
+            while self._heap and self._heap[0][0] <= now:
+                _, seq, key = heapq.heappop(self._heap)
+                timer = self._timers.get(key)
+                if timer is None or timer[2] != seq:
+                    continue  # Cancelled or superseded
+                if timer[0] > now:
+                    # Re-armed to a later time since this entry was pushed
+                    timer[2] = next(self._counter)
+                    heapq.heappush(self._heap, (timer[0], timer[2], key))
+                    continue
+                del self._timers[key]
+                due_timers.append((key, timer[1]))
+
+        for key, callback in due_timers:
+            try:
+                next_delay = callback(key)
+            except Exception:
+                logger.exception("Error in timer", extra={"timer": str(key)})
+                continue
+            if next_delay is not None:
+                with self._condition:
+                    # Leave it alone if the key was re-armed while the callback ran
+                    if key in self._timers:
+                        continue
+                self.schedule(key, next_delay, callback)
+
+        return len(due_timers)
+
+    def next_due(self):
+        """Due time of the earliest heap entry, or None when idle"""
+        with self._condition:
+            return self._heap[0][0] if self._heap else None
+
+    def _run(self):
+        """Background thread that sleeps until the earliest timer is due"""
+        while True:
+            with self._condition:
+                while True:
+                    if self._heap:
+                        delay = self._heap[0][0] - self._clock()
+                        if delay <= 0:
+                            break
+                        self._condition.wait(delay)
+                    else:
+                        self._condition.wait()
+            self.run_due()
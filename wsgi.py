@@ -0,0 +1,12 @@
+"""
+Production entry point for the Smart Greenhouse
+Serve with: gunicorn -c gunicorn.conf.py wsgi:app
+"""
+from logging_setup import configure_logging
+
+# Logging is configured before the app is imported so controller start-up is logged too
+configure_logging()
+
+from app import app  # noqa: E402
+
+application = app
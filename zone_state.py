@@ -0,0 +1,165 @@
+"""
+Vectorized zone state for the Smart Greenhouse
+Zone effects are stored in contiguous NumPy arrays so boosts, clamps and decay
+run as whole-array operations, whether there are four zones or ten thousand.
+Writes are serialized by one lock and published copy-on-write, so readers never block.
+"""
+import math
+import string
+import threading
+from collections.abc import Mapping, MutableMapping
+
+import numpy as np
+
+from records import EffectsTable
+
+EFFECT_TYPES = ("watering", "manure", "fertilizer")
+EFFECT_INDEX = {effect_type: i for i, effect_type in enumerate(EFFECT_TYPES)}
+WATERING, MANURE, FERTILIZER = range(len(EFFECT_TYPES))
+
+
+def grid_zone_coordinates(count, spacing=20, origin=10):
+    """Lay out count zones on a square grid; four zones give the classic A-D layout"""
+    columns = max(1, math.ceil(math.sqrt(count)))
+    if count <= len(string.ascii_uppercase):
+        names = string.ascii_uppercase[:count]
+    else:
+        names = [f"Z{i:05d}" for i in range(count)]
+    return {
+        name: (origin + (i // columns) * spacing, origin + (i % columns) * spacing)
+        for i, name in enumerate(names)
+    }
+
+
+class ZoneStateEngine:
+    def __init__(self, zones):
+        self.zones = list(zones)
+        self.index = {zone: i for i, zone in enumerate(self.zones)}
+
+        # One row per zone, one column per effect type. effects is never modified in place:
+        # writers build a new array under the lock and swap it in, so a reader that grabbed
+        # the old array keeps a consistent view.
+        self.effects = np.zeros((len(self.zones), len(EFFECT_TYPES)))
+        self.decay_start = np.zeros((len(self.zones), len(EFFECT_TYPES)))  # Only touched by writers
+        self.lock = threading.RLock()  # Held by writers; callers may hold it to pair a write with logging
+
+    def __len__(self):
+        return len(self.zones)
+
+    def apply(self, zone, effect_type, amount, decay_start):
+        """Add a treatment effect to a zone (capped at 100) and postpone its decay"""
+        i, j = self.index[zone], EFFECT_INDEX[effect_type]
+        with self.lock:
+            effects = self.effects.copy()
+            effects[i, j] = min(100.0, effects[i, j] + amount)
+            self.decay_start[i, j] = decay_start
+            self.effects = effects
+            return effects[i, j]
+
+    def restore(self, zone, effect_type, value, decay_start):
+        """Set a zone effect to a known level, e.g. when replaying persisted state"""
+        i, j = self.index[zone], EFFECT_INDEX[effect_type]
+        self.set(i, j, value, decay_start)
+
+    def set(self, row, column, value, decay_start=None):
+        """Set one effect cell by position, optionally restarting its hold period"""
+        with self.lock:
+            effects = self.effects.copy()
+            effects[row, column] = value
+            if decay_start is not None:
+                self.decay_start[row, column] = decay_start
+            self.effects = effects
+
+    def decay(self, now, step):
+        """Decay every effect whose hold period is over by one step; returns the mask of decayed cells"""
+        with self.lock:
+            effects = self.effects
+            due = (self.decay_start <= now) & (effects > 0)
+            if due.any():
+                self.effects = np.maximum(np.where(due, effects - step, effects), 0.0)
+            return due
+
+    def active_count(self):
+        """Number of zone effects that are still above zero"""
+        return int(np.count_nonzero(self.effects))
+
+    def compute_readings(self, soil_moisture, nutrient_level, ph_level, rows=slice(None)):
+        """Apply treatment effects to base readings for all zones (or the selected rows).
+
+        Base readings may be scalars (one sweep shared by all zones) or per-zone arrays.
+        Returns soil moisture, nutrient level and pH arrays.
+        """
+        effects = self.effects[rows]  # One read of the published array keeps all three columns consistent
+        watering = effects[:, WATERING]
+        manure = effects[:, MANURE]
+        fertilizer = effects[:, FERTILIZER]
+
+        # Watering boosts soil moisture by up to 20%, kept within the optimal 40-60% range
+        moisture = np.where(watering > 0, np.minimum(60.0, soil_moisture + watering * 0.20), soil_moisture)
+
+        # Fertilizer (up to 20%) and manure (up to 15%) boost nutrients, capped at 95%
+        nutrients = np.where(
+            (fertilizer > 0) | (manure > 0),
+            np.minimum(95.0, nutrient_level + fertilizer * 0.20 + manure * 0.15),
+            nutrient_level,
+        )
+
+        # Manure raises pH by up to 0.8, kept within the optimal 6.0-6.8 range
+        ph = np.where(manure > 0, np.clip(ph_level + manure * 0.008, 6.0, 6.8), ph_level)
+
+        return moisture, nutrients, ph
+
+    def effects_table(self):
+        """All zone effects as a compact record referencing the current (never modified) array"""
+        return EffectsTable(self.zones, EFFECT_TYPES, self.effects)
+
+    def effects_as_dict(self):
+        """Plain-dict copy of all zone effects, for JSON"""
+        return self.effects_table().to_dict()
+
+
+class ZoneEffects(MutableMapping):
+    """Dict-like view of one zone's effects, backed by the engine arrays"""
+
+    def __init__(self, engine, zone):
+        self._engine = engine
+        self._row = engine.index[zone]
+
+    def __getitem__(self, effect_type):
+        return float(self._engine.effects[self._row, EFFECT_INDEX[effect_type]])
+
+    def __setitem__(self, effect_type, value):
+        self._engine.set(self._row, EFFECT_INDEX[effect_type], value)
+
+    def __delitem__(self, effect_type):
+        raise TypeError("Zone effects cannot be removed")
+
+    def __iter__(self):
+        return iter(EFFECT_TYPES)
+
+    def __len__(self):
+        return len(EFFECT_TYPES)
+
+    def __repr__(self):
+        return repr(dict(self))
+
+
+class ZoneEffectsView(Mapping):
+    """Dict-like view of every zone's effects, keyed by zone"""
+
+    def __init__(self, engine):
+        self._engine = engine
+
+    def __getitem__(self, zone):
+        if zone not in self._engine.index:
+            raise KeyError(zone)
+        return ZoneEffects(self._engine, zone)
+
+    def __iter__(self):
+        return iter(self._engine.zones)
+
+    def __len__(self):
+        return len(self._engine.zones)
+
+    def __repr__(self):
+        return repr(self._engine.effects_as_dict())